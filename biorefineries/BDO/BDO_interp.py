@@ -6,9 +6,17 @@ Created on Sun Sep 26 22:17:26 2021
 """
 import numpy as np
 from scipy import interpolate
-from scipy.interpolate import RBFInterpolator
+from scipy.interpolate import RBFInterpolator, RectBivariateSpline
+from warnings import warn
 import os
 
+__all__ = (
+    'get_data',
+    'get_rbf',
+    'get_Ks_surrogate',
+    'KsSurrogate',
+)
+
 def get_data(load=True, save=False):
     if load:
         try:
@@ -74,26 +82,138 @@ def get_data(load=True, save=False):
     
     if save:
         prefix = os.path.dirname(__file__)
-        np.save(os.path.join(prefix, 'oleyl_alcohol_ratio_mass_water'), oleyl_alcohol_ratio_mass_water)
-        np.save(os.path.join(prefix, 'glycerol_mf'), glycerol_mf)
-        np.save(os.path.join(prefix, 'compositions'), compositions)
-        np.save(os.path.join(prefix, 'Ks'), Ks)
+        try:
+            np.save(os.path.join(prefix, 'oleyl_alcohol_ratio_mass_water'), oleyl_alcohol_ratio_mass_water)
+            np.save(os.path.join(prefix, 'glycerol_mf'), glycerol_mf)
+            np.save(os.path.join(prefix, 'compositions'), compositions)
+            np.save(os.path.join(prefix, 'Ks'), Ks)
+        except OSError as error:
+            warn(f'could not save partition coefficient grid; {error}', RuntimeWarning)
     return oleyl_alcohol_ratio_mass_water, glycerol_mf, compositions, Ks
 
-oleyl_alcohol_ratio_mass_water, glycerol_mf, compositions, Ks = get_data()
-X, Y = np.meshgrid(oleyl_alcohol_ratio_mass_water, glycerol_mf)
-A = len(oleyl_alcohol_ratio_mass_water)
-B = len(glycerol_mf)
-Ks_flattened = np.array([Ks[i,j,:] for i in range(A) for j in range(B)], dtype=float)
-x_flattened = np.array([*zip(X.flatten(), Y.flatten())])
-rbf = RBFInterpolator(x_flattened, Ks_flattened)
-z = rbf([[8, 0.001]])
-# znew = interpolate.bisplev(xnew[:,0], ynew[0,:], tck)
+class KsSurrogate:
+    """
+    Create a KsSurrogate object that estimates the partition coefficients of
+    ('Water', 'Glycerol', 'BDO', 'OleylAlcohol') at a given oleyl alcohol to
+    water mass ratio and glycerol mass fraction. Each partition coefficient is
+    interpolated with a tensor-product (bicubic) spline over the tabulated
+    grid, so the cost of each query does not depend on the number of points
+    in the grid. Splines are constant (clamped) outside the grid, so points
+    out of range are evaluated with a radial basis function interpolator of
+    the grid (as originally done for all points), which is only built the
+    first time it is needed.
+    
+    Parameters
+    ----------
+    oleyl_alcohol_ratio_mass_water : 1d array
+        Oleyl alcohol to water mass ratios of the grid.
+    glycerol_mf : 1d array
+        Glycerol mass fractions of the grid.
+    Ks : 3d array
+        Partition coefficients with shape (glycerol_mf, oleyl_alcohol_ratio_mass_water, chemical).
+    
+    Examples
+    --------
+    >>> from biorefineries.BDO.BDO_interp import get_Ks_surrogate
+    >>> Ks_surrogate = get_Ks_surrogate() # doctest: +SKIP
+    >>> Ks_surrogate(8, 0.001) # doctest: +SKIP
+    >>> Ks_surrogate([[8, 0.001], [10, 0.01]]) # Same as RBF interpolator; doctest: +SKIP
+    
+    """
+    __slots__ = ('splines', 'grid', 'Ks', '_rbf')
+    
+    def __init__(self, oleyl_alcohol_ratio_mass_water, glycerol_mf, Ks):
+        self.grid = (np.asarray(oleyl_alcohol_ratio_mass_water, float),
+                     np.asarray(glycerol_mf, float))
+        self.Ks = Ks = np.asarray(Ks, float)
+        self.splines = [
+            RectBivariateSpline(glycerol_mf, oleyl_alcohol_ratio_mass_water, Ks[:, :, i])
+            for i in range(Ks.shape[-1])
+        ]
+        self._rbf = None
+    
+    @property
+    def rbf(self):
+        """[RBFInterpolator] Radial basis function interpolator of the grid used for points out of range."""
+        rbf = self._rbf
+        if rbf is None:
+            X, Y = np.meshgrid(*self.grid)
+            Ks = self.Ks
+            self._rbf = rbf = RBFInterpolator(
+                np.stack([X.ravel(), Y.ravel()], -1), Ks.reshape([-1, Ks.shape[-1]])
+            )
+        return rbf
+    
+    def out_of_range(self, oleyl_alcohol_ratio_mass_water, glycerol_mf):
+        """Return a boolean array of whether points are outside the grid."""
+        x_grid, y_grid = self.grid
+        x = np.asarray(oleyl_alcohol_ratio_mass_water, float)
+        y = np.asarray(glycerol_mf, float)
+        return (x < x_grid[0]) | (x > x_grid[-1]) | (y < y_grid[0]) | (y > y_grid[-1])
+    
+    def evaluate(self, oleyl_alcohol_ratio_mass_water, glycerol_mf):
+        """Return partition coefficients with shape (..., chemical) given arrays of points."""
+        x, y = np.broadcast_arrays(
+            np.asarray(oleyl_alcohol_ratio_mass_water, float),
+            np.asarray(glycerol_mf, float),
+        )
+        Ks = np.stack([f.ev(y, x) for f in self.splines], axis=-1)
+        mask = self.out_of_range(x, y)
+        if mask.any(): # Extrapolate as the RBF interpolator
+            Ks[mask] = self.rbf(np.stack([x[mask], y[mask]], -1))
+        return Ks
+    
+    def __call__(self, x, y=None):
+        if y is None: # Same signature as the RBF interpolator
+            x = np.asarray(x, float)
+            return self.evaluate(x[..., 0], x[..., 1])
+        else:
+            return self.evaluate(x, y)
+    
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
 
-# y = np.sin(x)
+_rbf = _Ks_surrogate = None
 
-# tck = interpolate.splrep(x, y, s=0)
+def get_rbf():
+    """
+    Return a radial basis function interpolator of the partition coefficients
+    over the full tabulated grid. This is a dense interpolator kept as a
+    reference to validate the spline surrogate; it is slow to build.
+    
+    """
+    global _rbf
+    if _rbf is None:
+        oleyl_alcohol_ratio_mass_water, glycerol_mf, compositions, Ks = get_data(save=True)
+        X, Y = np.meshgrid(oleyl_alcohol_ratio_mass_water, glycerol_mf)
+        x_flattened = np.array([*zip(X.flatten(), Y.flatten())])
+        Ks_flattened = Ks.reshape([-1, Ks.shape[-1]])
+        _rbf = RBFInterpolator(x_flattened, Ks_flattened)
+    return _rbf
 
-# xnew = np.arange(0, 2*np.pi, np.pi/50)
+def get_Ks_surrogate():
+    """
+    Return a KsSurrogate object of the tabulated partition coefficients. The
+    grid is loaded from the saved .npy files (or computed and saved if not
+    available) the first time this function is called.
+    
+    """
+    global _Ks_surrogate
+    if _Ks_surrogate is None:
+        oleyl_alcohol_ratio_mass_water, glycerol_mf, compositions, Ks = get_data(save=True)
+        _Ks_surrogate = KsSurrogate(oleyl_alcohol_ratio_mass_water, glycerol_mf, Ks)
+    return _Ks_surrogate
 
-# ynew = interpolate.splev(xnew, tck, der=0)
\ No newline at end of file
+def __getattr__(name):
+    # Tabulated data and the RBF interpolator used to be created at import;
+    # they are now created on first access
+    if name == 'rbf':
+        return get_rbf()
+    elif name in ('oleyl_alcohol_ratio_mass_water', 'glycerol_mf', 'compositions', 'Ks'):
+        data = dict(zip(
+            ('oleyl_alcohol_ratio_mass_water', 'glycerol_mf', 'compositions', 'Ks'),
+            get_data(save=True)
+        ))
+        return data[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -373,8 +373,23 @@ spec_1, spec_2 = np.meshgrid(spec_1, spec_2)
 
 # %% Run TRY analysis 
 
-data_1 = BDO_data = spec.evaluate_across_specs(
-        BDO_sys, spec_1, spec_2, BDO_metrics, spec_3)
+# Set to True to only simulate points near the MPSP contour levels and the 
+# infeasible (sugar concentration) region; all other points are interpolated
+adaptive = False
+adaptive_levels = [np.arange(0, 10001, 500), None, None] # Levels of each metric (None to ignore)
+
+if adaptive:
+    from biorefineries.process_tools import AdaptiveGridEvaluation
+    from biorefineries.BDO._process_specification import last_infeasible_simulation
+    adaptive_evaluation = AdaptiveGridEvaluation(
+        spec, BDO_sys, spec_1, spec_2, BDO_metrics, spec_3, levels=adaptive_levels,
+        infeasible_simulations=last_infeasible_simulation,
+    )
+    data_1 = BDO_data = adaptive_evaluation.evaluate()
+    print(adaptive_evaluation.report())
+else:
+    data_1 = BDO_data = spec.evaluate_across_specs(
+            BDO_sys, spec_1, spec_2, BDO_metrics, spec_3)
 
 # spec.load_spec_1 = spec.load_dehydration_conversion
 # spec.load_spec_2 = spec.load_titer
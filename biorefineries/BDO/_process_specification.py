@@ -8,6 +8,7 @@ Created on Fri Jul 31 12:00:51 2020
 import biosteam as bst
 import flexsolve as flx
 import numpy as np
+from biorefineries.process_tools import GridEvaluation, ConvergenceRecovery
 from biosteam.exceptions import InfeasibleRegion
 # from biorefineries.BDO.units import compute_BDO_titer, compute_BDO_mass
 from winsound import Beep
@@ -26,6 +27,7 @@ def get_IDs(units_list):
 # Bugfix barrage is not needed anymore because hexane recycle is not emptied anymore
 # and Wegstein and Aitken converge much better.
 bugfix = True
+convergence_recovery = ConvergenceRecovery()
 
 error = False
 
@@ -40,44 +42,16 @@ def evaluate_across_specs(spec, system,
         if spec_1 <= yield_ and spec_2 >= titer:
             return np.nan*np.ones([len(metrics), len(spec_3)])
     if bugfix:
-        def reset_and_reload():
-            print('Resetting cache and emptying recycles ...')
-            system.reset_cache()
-            system.empty_recycles()
-            print('Loading and simulating with baseline specifications ...')
+        def load_specifications():
+            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
+        
+        def load_baseline_specifications():
             spec.load_yield(0.49)
             spec.load_titer(109.9)
-            system.simulate()
-            print('Loading and simulating with required specifications ...')
-            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-            system.simulate()
         
-        def reset_and_switch_solver(solver_ID):
-            system.reset_cache()
-            system.empty_recycles()
-            system.converge_method = solver_ID
-            print(f"Trying {solver_ID} ...")
-            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-            system.simulate()
-            
         def run_bugfix_barrage():
-            try:
-                reset_and_reload()
-            except Exception as e:
-                print(str(e))
-                try:
-                    reset_and_switch_solver('fixedpoint')
-                except Exception as e:
-                    print(str(e))
-                    try:
-                        reset_and_switch_solver('aitken')
-                    except Exception as e:
-                        print(str(e))
-                        print(_yellow_text+"Bugfix barrage failed."+_reset_text)
-                        raise e
-            finally:
-                system.converge_method = 'wegstein'
-                print('\n')
+            convergence_recovery.recover(system, load_specifications, (spec_1, spec_2, spec_3),
+                                         load_baseline_specifications)
     
     def HXN_Q_bal_OK():
         HXN = spec.HXN
@@ -186,7 +160,8 @@ class ProcessSpecification(bst.process_tools.ReactorSpecification):
                  'HXN_new_HXs',
                  'HXN_new_HX_utils',
                  'HXN_Q_bal_percent_error_dict',
-                 'TRY_analysis')
+                 'TRY_analysis',
+                 'grid_evaluation',)
     
     def __init__(self, evaporator, evaporator_pump, pump, mixer, heat_exchanger, seed_train_system, 
                  reactor, reaction_name, substrates, products,
@@ -228,6 +203,7 @@ class ProcessSpecification(bst.process_tools.ReactorSpecification):
         self.total_iterations = 0
         self.average_HXN_energy_balance_percent_error = 0.
         self.exceptions_dict = {}
+        self.grid_evaluation = None
         self.TRY_analysis = TRY_analysis
         
         # self._maximum_inhibitor_concentration = maximum_inhibitor_concentration
@@ -312,7 +288,8 @@ class ProcessSpecification(bst.process_tools.ReactorSpecification):
         return data
 
     def evaluate_across_specs(self, system, 
-            spec_1, spec_2, metrics, spec_3):
+            spec_1, spec_2, metrics, spec_3,
+            path=None, processes=None, loader=None):
         
         """
         Evaluate metrics at given titer and yield across a set of 
@@ -328,6 +305,15 @@ class ProcessSpecification(bst.process_tools.ReactorSpecification):
             Should return a number given no parameters.
         productivities : array_like[P elements]
             Productivities to evaluate.
+        path : str, optional
+            If given, results and per-point telemetry are saved to memory-mapped 
+            files as each point is completed and interrupted evaluations resume
+            from these files. See :class:`~biorefineries.process_tools.GridEvaluation`.
+        processes : int, optional
+            Number of worker processes to distribute points over.
+        loader : Callable, optional
+            Should return a (spec, system, metrics) tuple. Required for 
+            parallel evaluation.
         
         Returns
         -------
@@ -353,12 +339,24 @@ class ProcessSpecification(bst.process_tools.ReactorSpecification):
         self.exceptions_dict = {}
         
         self.total_iterations = len(spec_1) * len(spec_2) * len(spec_3)
-        results = evaluate_across_specs(self, system, 
-                                   spec_1, spec_2, 
-                                   metrics, spec_3)
+        if path is None and processes is None:
+            results = evaluate_across_specs(self, system, 
+                                       spec_1, spec_2, 
+                                       metrics, spec_3)
+        else:
+            self.grid_evaluation = GridEvaluation(self, system, spec_1, spec_2, 
+                                                  metrics, spec_3, path, loader)
+            results = self.grid_evaluation.evaluate(processes)
         self.average_HXN_energy_balance_percent_error /= self.total_iterations
         return results
     
+    def evaluate_at_point(self, system, spec_1, spec_2, metrics, spec_3):
+        """
+        Evaluate metrics at a single spec_1 and spec_2 across a set of 
+        spec_3 values. Return an array [M x P] with the all metric results.
+        """
+        return evaluate_across_specs.pyfunc(self, system, spec_1, spec_2, metrics, spec_3)
+    
     @property
     def feed(self):
         """[Stream] Reactor feed."""
@@ -44,6 +44,7 @@ from biorefineries.BDO.system_MS3 import (
     spec, BDO_sys, get_MEK_MPSP, get_GWP, get_FEC, flowsheet, BDO_tea
 )
 from biorefineries.BDO.analyses import models
+from biorefineries.process_tools import ConvergenceRecovery
 from datetime import datetime
 
 
@@ -82,42 +83,19 @@ baseline_spec = {'spec_1': spec.spec_1,
                  'spec_2': spec.spec_2,
                  'spec_3': spec.spec_3,}
 
-def reset_and_reload():
-    print('Resetting cache and emptying recycles ...')
-    system.reset_cache()
-    system.empty_recycles()
-    print('Loading and simulating with baseline specifications ...')
-    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+convergence_recovery = ConvergenceRecovery()
+
+def load_baseline_specifications():
     spec.load_specifications(**baseline_spec)
-    system.simulate()
-    print('Loading and simulating with required specifications ...')
-    spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-    system.simulate()
-    
-def reset_and_switch_solver(solver_ID):
-    system.reset_cache()
-    system.empty_recycles()
-    system.converge_method = solver_ID
-    print(f"Trying {solver_ID} ...")
-    spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
-    system.simulate()
     
 def run_bugfix_barrage():
-    try:
-        reset_and_reload()
-    except Exception as e:
-        print(str(e))
-        try:
-            reset_and_switch_solver('fixedpoint')
-        except Exception as e:
-            print(str(e))
-            try:
-                reset_and_switch_solver('aitken')
-            except Exception as e:
-                print(str(e))
-                # print(_yellow_text+"Bugfix barrage failed.\n"+_reset_text)
-                print("Bugfix barrage failed.\n")
-                raise e
+    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+    convergence_recovery.recover(
+        system,
+        lambda: spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3),
+        (spec_1, spec_2, spec_3),
+        load_baseline_specifications,
+    )
 ###############################
 
 spec.load_spec_1 = spec.load_yield
@@ -570,9 +570,10 @@ def create_separation_system_oleyl_alcohol_3(ins, outs):
     def get_K(chem_ID, stream, phase_1, phase_2):
         return (stream[phase_1].imol[chem_ID]/stream[phase_1].F_mol)/(stream[phase_2].imol[chem_ID]/stream[phase_2].F_mol)
     
-    from biorefineries.BDO.BDO_interp import rbf
+    from biorefineries.BDO.BDO_interp import get_Ks_surrogate
+    Ks_surrogate = get_Ks_surrogate()
     def get_S402_Ks_interp(required_solvent_factor, feed, mixedstream=None):
-        return rbf([[required_solvent_factor, feed.imass['Glycerol']/feed.imass[S402.relevant_IDs].sum()]])[0]
+        return Ks_surrogate(required_solvent_factor, feed.imass['Glycerol']/feed.imass[S402.relevant_IDs].sum())
     
     def get_S402_Ks_rigor(required_solvent_factor, feed, mixedstream):
         try:
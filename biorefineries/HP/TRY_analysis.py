@@ -18,6 +18,7 @@ from biosteam.utils import colors
 from matplotlib.ticker import AutoMinorLocator as AML
 
 import biorefineries.HP.analyses.models as HP_models
+from biorefineries.process_tools import ConvergenceRecovery
 
 
 # # Comment this out to run feedstock sugar content-price analysis
@@ -167,44 +168,21 @@ system = HP_sys
 # Bugfix barrage
 ##############################
 
-def reset_and_reload():
-    print('Resetting cache and emptying recycles ...')
-    system.reset_cache()
-    system.empty_recycles()
-    print('Loading and simulating with baseline specifications ...')
-    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+convergence_recovery = ConvergenceRecovery()
+
+def load_baseline_specifications():
     spec.load_yield(0.49)
     spec.load_titer(54.8)
     spec.load_productivity(0.76)
-    system.simulate()
-    print('Loading and simulating with required specifications ...')
-    spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-    system.simulate()
-    
-def reset_and_switch_solver(solver_ID):
-    system.reset_cache()
-    system.empty_recycles()
-    system.converge_method = solver_ID
-    print(f"Trying {solver_ID} ...")
-    spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
-    system.simulate()
     
 def run_bugfix_barrage():
-    try:
-        reset_and_reload()
-    except Exception as e:
-        print(str(e))
-        try:
-            reset_and_switch_solver('fixedpoint')
-        except Exception as e:
-            print(str(e))
-            try:
-                reset_and_switch_solver('aitken')
-            except Exception as e:
-                print(str(e))
-                # print(_yellow_text+"Bugfix barrage failed.\n"+_reset_text)
-                print("Bugfix barrage failed.\n")
-                raise e
+    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+    convergence_recovery.recover(
+        system,
+        lambda: spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3),
+        (spec_1, spec_2, spec_3),
+        load_baseline_specifications,
+    )
                 
                 
 
@@ -360,8 +338,23 @@ spec_1, spec_2 = np.meshgrid(spec_1, spec_2)
 
 # %% Run TRY analysis 
 
-data_1 = HP_data = spec.evaluate_across_specs(
-        HP_sys, spec_1, spec_2, HP_metrics, spec_3)
+# Set to True to only simulate points near the MPSP contour levels and the 
+# infeasible (sugar concentration) region; all other points are interpolated
+adaptive = False
+adaptive_levels = [np.arange(0, 10001, 500), None, None] # Levels of each metric (None to ignore)
+
+if adaptive:
+    from biorefineries.process_tools import AdaptiveGridEvaluation
+    from biorefineries.HP._process_specification import last_infeasible_simulation
+    adaptive_evaluation = AdaptiveGridEvaluation(
+        spec, HP_sys, spec_1, spec_2, HP_metrics, spec_3, levels=adaptive_levels,
+        infeasible_simulations=last_infeasible_simulation,
+    )
+    data_1 = HP_data = adaptive_evaluation.evaluate()
+    print(adaptive_evaluation.report())
+else:
+    data_1 = HP_data = spec.evaluate_across_specs(
+            HP_sys, spec_1, spec_2, HP_metrics, spec_3)
 
 
 # %% Save generated data as .npy
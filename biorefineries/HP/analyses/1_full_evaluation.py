@@ -44,6 +44,7 @@ from biosteam.plots import plot_montecarlo_across_coordinate
 from biorefineries.HP.system_light_lle_vacuum_distillation import spec, HP_sys, get_AA_MPSP, get_GWP, get_FEC, R301
 
 from biorefineries.HP.analyses import models # for the baseline biorefinery
+from biorefineries.process_tools import DirtyUnitTracker, ConvergenceRecovery
 # from biorefineries.HP.analyses import models_targeted_improvements as models # for a biorefinery with targeted improvements over the baseline biorefinery
 
 from datetime import datetime
@@ -80,44 +81,21 @@ model.load_samples(samples)
 
 system = HP_sys
 
-def reset_and_reload():
-    print('Resetting cache and emptying recycles ...')
-    system.reset_cache()
-    system.empty_recycles()
-    print('Loading and simulating with baseline specifications ...')
-    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+convergence_recovery = ConvergenceRecovery()
+
+def load_baseline_specifications():
     spec.load_yield(0.49)
     spec.load_titer(54.8)
     spec.load_productivity(0.76)
-    system.simulate()
-    print('Loading and simulating with required specifications ...')
-    spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-    system.simulate()
-    
-def reset_and_switch_solver(solver_ID):
-    system.reset_cache()
-    system.empty_recycles()
-    system.converge_method = solver_ID
-    print(f"Trying {solver_ID} ...")
-    spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
-    system.simulate()
     
 def run_bugfix_barrage():
-    try:
-        reset_and_reload()
-    except Exception as e:
-        print(str(e))
-        try:
-            reset_and_switch_solver('fixedpoint')
-        except Exception as e:
-            print(str(e))
-            try:
-                reset_and_switch_solver('aitken')
-            except Exception as e:
-                print(str(e))
-                # print(_yellow_text+"Bugfix barrage failed.\n"+_reset_text)
-                print("Bugfix barrage failed.\n")
-                raise e
+    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+    convergence_recovery.recover(
+        system,
+        lambda: spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3),
+        (spec_1, spec_2, spec_3),
+        load_baseline_specifications,
+    )
 ###############################
 
 spec.load_spec_1 = spec.load_yield
@@ -127,13 +105,15 @@ spec.load_spec_3 = spec.load_productivity
 full_path = HP_sys.path
 evaporator_index = full_path.index(spec.titer_inhibitor_specification.evaporator)
 pre_evaporator_units_path = full_path[0:evaporator_index]
+# Only run pre-evaporator units affected by parameters that changed
+pre_evaporator_units_tracker = DirtyUnitTracker(model, pre_evaporator_units_path,
+                                                run=bst.Unit._run)
 
 def model_specification():
     try:
         # model._system._converge()
         spec.pre_conversion_units.simulate()
-        for unit in pre_evaporator_units_path:
-            unit._run()
+        pre_evaporator_units_tracker.simulate_dirty_units()
         spec.titer_inhibitor_specification.run_units()
         
         spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
@@ -142,6 +122,7 @@ def model_specification():
             model._system.simulate()
         
     except Exception as e:
+        pre_evaporator_units_tracker.mark_all_dirty()
         str_e = str(e).lower()
         print('Error in model spec: %s'%str_e)
         # raise e
@@ -14,6 +14,7 @@ from math import floor
 from warnings import warn
 import thermosteam as tmo
 from thermosteam import Stream
+from biosteam._system import SystemSpecification
 
 
 def get_unit_atomic_balance(unit, atom='C'):
@@ -30,6 +31,27 @@ def get_TEA_products(main_sys, BT_sys=None):
         [i for i in BT_sys.products if i.price]) if BT_sys else \
         set([i for i in main_sys.products if i.price])
 
+def memoized_property(f):
+    """
+    Return a property which caches its value until the simulation version of
+    the LCA object changes (i.e., until the system is simulated again).
+    Copies of mutable values are returned so that the cache is not modified.
+    """
+    name = f.__name__
+    def get(self):
+        cache = self._get_cache()
+        if name in cache:
+            self.cache_hits += 1
+            value = cache[name]
+        else:
+            self.cache_misses += 1
+            cache[name] = value = f(self)
+        if isinstance(value, (dict, list, set, np.ndarray)): value = value.copy()
+        return value
+    get.__name__ = name
+    get.__doc__ = f.__doc__
+    return property(get)
+
 
 class LCA:
     """
@@ -119,6 +141,7 @@ class LCA:
         self.feeds = system.feeds
         self.products = system.products
         system._TEA = self
+        self._setup_cache(system)
         return self
 
     def __init__(self, system, system_chemicals, CFs, feedstock, feedstock_ID, main_product,
@@ -156,23 +179,59 @@ class LCA:
         self.cooling_and_chilled_water_production_units = cooling_and_chilled_water_production_units
         
         system._LCA = self
+        self._setup_cache(system)
+
+    def _setup_cache(self, system):
+        #: [int] Number of times the system has been simulated.
+        self.simulation_version = 0
+        #: [int] Number of cached LCA quantities reused.
+        self.cache_hits = 0
+        #: [int] Number of LCA quantities computed.
+        self.cache_misses = 0
+        self._cache = {}
+        self._cache_version = 0
+        # Specifications run at the start of every simulation
+        if system.specifications:
+            system.specifications.insert(0, SystemSpecification(self._new_simulation_version, ()))
+        else:
+            system.add_specification(self._new_simulation_version, simulate=True)
+    
+    def _new_simulation_version(self):
+        self.simulation_version += 1
+    
+    def _get_cache(self):
+        cache = self._cache
+        if self._cache_version != self.simulation_version:
+            cache.clear()
+            self._cache_version = self.simulation_version
+        return cache
+    
+    def invalidate(self):
+        """Clear all cached LCA quantities (e.g., after changing characterization factors)."""
+        self._cache.clear()
+    
+    def cache_info(self):
+        """Return a dictionary with the number of cached LCA quantities reused and computed."""
+        return {'Simulation version': self.simulation_version,
+                'Hits': self.cache_hits,
+                'Misses': self.cache_misses}
 
-    @property
+    @memoized_property
     def LCA_streams(self):
         """[float] Number of operating days per year."""
         return get_TEA_feeds(self.system, self.BT_sys)
     
-    @property
+    @memoized_property
     def TEA_products(self):
         """[float] Number of operating days per year."""
         return get_TEA_products(self.system, self.BT_sys)
     
-    @property
+    @memoized_property
     def emissions(self):
         TEA_products = self.TEA_products
         return [i for i in self.streams if i.source and not i.sink and not i in TEA_products]
     
-    @property
+    @memoized_property
     def carbon_balance_percent_error(self):
         total_C_in = sum([feed.get_atomic_flow('C') for feed in self.feeds])
         total_C_out = self.main_product.get_atomic_flow('C') + sum([emission.get_atomic_flow('C') for emission in self.emissions])
@@ -181,28 +240,30 @@ class LCA:
 
     # 100-year global warming potential (GWP100)
     
-    @property
-    def material_GWP_array(self):
-        # self.LCA_stream.mass = sum(i.mass for i in self.LCA_streams)
+    @memoized_property
+    def material_mass_array(self):
+        """[1d array] Mass flow rates of chemicals in LCA streams (in the order of chem_IDs)."""
         self.LCA_stream.mix_from(self.LCA_streams)
+        return self.LCA_stream.imass[self.chem_IDs]
+    
+    @memoized_property
+    def material_GWP_array(self):
         # chemical_GWP = self.LCA_stream.mass*CFs['self.GWP_CF_stream'].mass
-        chemical_GWP = [self.LCA_stream.imass[ID] * self.GWP_CF_stream.imass[ID] for ID in self.chem_IDs]
+        chemical_GWP = self.material_mass_array * self.GWP_CF_stream.imass[self.chem_IDs]
         return chemical_GWP
     
-    @property
+    @memoized_property
     def material_GWP(self): # does not include natural gas as it is an invisible BT stream BT.natural_gas with price BT.natural_gas_price
-        chemical_GWP = self.material_GWP_array
-        return sum(chemical_GWP)/self.main_product.F_mass
+        return self.material_mass_array @ self.GWP_CF_stream.imass[self.chem_IDs] / self.main_product.F_mass
 
-    @property
+    @memoized_property
     def material_GWP_breakdown(self):
-        # self.LCA_stream.mass = sum(i.mass for i in self.LCA_streams)
-        self.LCA_stream.mix_from(self.LCA_streams)
-        chemical_GWP_dict = {ID: self.LCA_stream.imass[ID] * self.GWP_CF_stream.imass[ID] / self.main_product.F_mass \
-                             for ID in self.chem_IDs if not self.LCA_stream.imass[ID] * self.GWP_CF_stream.imass[ID] == 0.}
+        chemical_GWP = self.material_GWP_array
+        F_mass = self.main_product.F_mass
+        chemical_GWP_dict = {ID: GWP / F_mass for ID, GWP in zip(self.chem_IDs, chemical_GWP) if not GWP == 0.}
         return chemical_GWP_dict
     
-    @property
+    @memoized_property
     def material_GWP_breakdown_fractional(self):
         chemical_GWP_dict = self.material_GWP_breakdown
         tot_material_GWP = self.material_GWP
@@ -210,7 +271,7 @@ class LCA:
             chemical_GWP_dict[k] /= tot_material_GWP
         return chemical_GWP_dict
     
-    @property
+    @memoized_property
     def material_GWP_breakdown_as_fraction_of_tot_GWP(self):
         chemical_GWP_dict = self.material_GWP_breakdown
         tot_material_GWP = self.GWP
@@ -220,138 +281,138 @@ class LCA:
     
     
     # GWP from combustion of non-biogenic carbons
-    @property
+    @memoized_property
     def ng_combustion_GWP(self):
         return (self.streams.natural_gas.get_atomic_flow('C')) * self.system_chemicals.CO2.MW / self.main_product.F_mass
                                # +ethanol_fresh.get_atomic_flow('C'))* system_chemicals.CO2.MW / self.main_product.F_mass
     
-    @property
+    @memoized_property
     def ng_GWP(self):
         return self.CFs['GWP_CFs']['CH4']*self.streams.natural_gas.F_mass/self.main_product.F_mass
     
-    @property
+    @memoized_property
     def FGHTP_GWP(self):
         return (self.feedstock.F_mass-self.feedstock.imass['Water']) \
  * self.CFs['GWP_CFs']['FGHTP %s'%self.feedstock_ID]/self.main_product.F_mass
     
-    @property
+    @memoized_property
     def feedstock_CO2_capture(self):
         return self.feedstock.get_atomic_flow('C')* self.system_chemicals.CO2.MW/self.main_product.F_mass
     
-    @property
+    @memoized_property
     def feedstock_GWP(self): 
         return self.FGHTP_GWP - self.feedstock_CO2_capture
     #  feedstock_GWP(self): return  FGHTP_GWP()
     
-    @property
+    @memoized_property
     def emissions_GWP(self): 
         return sum([stream.get_atomic_flow('C') for stream in self.emissions]) * self.system_chemicals.CO2.MW / self.main_product.F_mass
     
     # GWP from electricity acquisition
-    @property
+    @memoized_property
     def net_electricity(self):
         return sum(i.power_utility.rate for i in self.system.units)
     
-    @property
+    @memoized_property
     def net_electricity_GWP(self):
         return self.net_electricity*self.CFs['GWP_CFs']['Electricity'] \
         / self.main_product.F_mass
     
     
-    @property
+    @memoized_property
     def electricity_demand(self): 
         return -self.BT.power_utility.rate
-    @property
+    @memoized_property
     def electricity_use(self): # redundant
         return -self.BT.power_utility.rate
     
-    @property
+    @memoized_property
     def cooling_electricity_demand(self):
         return self.CT.power_utility.rate + self.CWP.power_utility.rate
     
-    @property
+    @memoized_property
     def BT_steam_kJph_heating(self):
         return sum([i.duty for i in self.BT.steam_utilities])
     
-    @property
+    @memoized_property
     def BT_steam_kJph_turbogen(self): 
         BT = self.BT
         return 3600.*BT.electricity_demand/BT.turbogenerator_efficiency
     
-    @property
+    @memoized_property
     def BT_steam_kJph_total(self): 
         return self.BT_steam_kJph_heating + self.BT_steam_kJph_turbogen
     
-    @property
+    @memoized_property
     def steam_frac_heating(self): 
         return self.BT_steam_kJph_heating/self.BT_steam_kJph_total
     
-    @property
+    @memoized_property
     def steam_frac_turbogen(self): 
         return  self.BT_steam_kJph_turbogen / self.BT_steam_kJph_total 
     
-    @property
+    @memoized_property
     def steam_frac_cooling(self): 
         return  self.steam_frac_turbogen * self.cooling_electricity_demand / self.electricity_demand 
     
-    @property
+    @memoized_property
     def steam_frac_electricity_non_cooling(self):
         return  self.steam_frac_turbogen * (1-(self.cooling_electricity_demand / self.electricity_demand))
     
-    @property
+    @memoized_property
     def non_cooling_electricity_demand(self): 
         return  self.electricity_demand  -  self.cooling_electricity_demand 
     
-    @property
+    @memoized_property
     def electricity_frac_cooling(self):
         return self.cooling_electricity_demand/(self.electricity_demand)
     
-    @property
+    @memoized_property
     def electricity_frac_non_cooling(self):
         return self.non_cooling_electricity_demand/(self.electricity_demand)
     
-    @property
+    @memoized_property
     def EOL_GWP(self): 
         return self.main_product.get_atomic_flow('C') * self.system_chemicals.CO2.MW/self.main_product.F_mass
     
-    @property
+    @memoized_property
     def direct_emissions_GWP(self): 
         return  self.emissions_GWP  - (self.feedstock_CO2_capture  - self.EOL_GWP )
     
-    @property
+    @memoized_property
     def BT_direct_emissions_GWP(self): 
         return ((sum([i.get_atomic_flow('C') for i in self.BT.outs])*self.system_chemicals['CO2'].MW / self.main_product.F_mass)\
         / self.emissions_GWP ) * self.direct_emissions_GWP 
     
-    @property
+    @memoized_property
     def non_BT_direct_emissions_GWP(self): 
         return  self.direct_emissions_GWP - self.BT_direct_emissions_GWP 
                             # - ( feedstock_CO2_capture  -  EOL_GWP )
     #  direct_emissions_GWP(self): return  non_BT_direct_emissions_GWP + BT_direct_emissions_GWP 
     
-    @property
+    @memoized_property
     def total_steam_GWP(self): 
         return self.ng_GWP + self.BT_direct_emissions_GWP 
     
-    @property
+    @memoized_property
     def heating_demand_GWP(self): 
         return  self.steam_frac_heating * self.total_steam_GWP 
     
-    @property
+    @memoized_property
     def cooling_demand_GWP(self): 
         return self.steam_frac_cooling * self.total_steam_GWP + self.electricity_frac_cooling * self.net_electricity_GWP
     
-    @property
+    @memoized_property
     def electricity_demand_non_cooling_GWP(self): 
         return  self.steam_frac_electricity_non_cooling * self.total_steam_GWP + self.electricity_frac_non_cooling * self.net_electricity_GWP
     
   
-    @property
+    @memoized_property
     def GWP(self): 
         return  self.FGHTP_GWP + self.material_GWP + self.ng_GWP +\
                        self.net_electricity_GWP + self.direct_emissions_GWP 
     
-    @property
+    @memoized_property
     def GWP_alternative(self): 
         return  self.FGHTP_GWP + self.material_GWP +\
                          self.non_BT_direct_emissions_GWP + self.heating_demand_GWP +\
@@ -359,39 +420,33 @@ class LCA:
                              self.electricity_demand_non_cooling_GWP 
                             
     def GWP_by_ID(self, ID):
+        self.material_mass_array # Makes sure LCA stream is up to date
         return self.LCA_stream.imass[ID] * self.GWP_CF_stream.imass[ID]/self.main_product.F_mass
 
 
     
     # fossil energy consumption (FEC)
     
-    @property
+    @memoized_property
     def material_FEC(self):
-        # chemical_FEC = self.LCA_stream.mass*CFs['FEC_CF_stream'].mass
-        chemical_FEC = self.material_FEC_array 
         # feedstock_FEC = self.feedstock.F_mass*CFs['FEC_CFs']['Corn stover']
-        # return chemical_FEC.sum /main_product.F_mass
-        return sum(chemical_FEC)/self.main_product.F_mass
+        return self.material_mass_array @ self.FEC_CF_stream.imass[self.chem_IDs] / self.main_product.F_mass
     
-    @property
+    @memoized_property
     def material_FEC_array(self):
-        # self.LCA_stream.mass = sum(i.mass for i in self.LCA_streams)
-        self.LCA_stream.mix_from(self.LCA_streams)
         # chemical_FEC = self.LCA_stream.mass*CFs['FEC_CF_stream'].mass
-        chemical_FEC = [self.LCA_stream.imass[ID] * self.FEC_CF_stream.imass[ID] for ID in self.chem_IDs]
+        chemical_FEC = self.material_mass_array * self.FEC_CF_stream.imass[self.chem_IDs]
         # feedstock_FEC = self.feedstock.F_mass*CFs['FEC_CFs']['Corn stover']
         return chemical_FEC
     
-    @property
+    @memoized_property
     def material_FEC_breakdown(self):
-        # self.LCA_stream.mass = sum(i.mass for i in self.LCA_streams)
-        self.LCA_stream.mix_from(self.LCA_streams)
-        FEC_CF_stream = self.FEC_CF_stream
-        chemical_FEC_dict = {ID: self.LCA_stream.imass[ID] * FEC_CF_stream.imass[ID] / self.main_product.F_mass \
-                              for ID in self.chem_IDs if not self.LCA_stream.imass[ID] * FEC_CF_stream.imass[ID] == 0.}
+        chemical_FEC = self.material_FEC_array
+        F_mass = self.main_product.F_mass
+        chemical_FEC_dict = {ID: FEC / F_mass for ID, FEC in zip(self.chem_IDs, chemical_FEC) if not FEC == 0.}
         return chemical_FEC_dict
     
-    @property
+    @memoized_property
     def material_FEC_breakdown_fractional(self):
         chemical_FEC_dict = self.material_FEC_breakdown 
         tot_material_FEC = self.material_FEC 
@@ -399,7 +454,7 @@ class LCA:
             chemical_FEC_dict[k] /= tot_material_FEC
         return chemical_FEC_dict
     
-    @property
+    @memoized_property
     def material_FEC_breakdown_as_fraction_of_tot_FEC(self):
         chemical_FEC_dict = self.material_FEC_breakdown 
         tot_FEC = self.FEC 
@@ -407,48 +462,49 @@ class LCA:
             chemical_FEC_dict[k] /= tot_FEC
         return chemical_FEC_dict
     
-    @property
+    @memoized_property
     def net_electricity_FEC(self): 
         return (self.net_electricity * self.CFs['FEC_CFs']['Electricity'])/self.main_product.F_mass
     
-    @property
+    @memoized_property
     def total_steam_FEC(self):
         return self.ng_FEC 
     
-    @property
+    @memoized_property
     def heating_demand_FEC(self): 
         return self.steam_frac_heating * self.total_steam_FEC 
    
-    @property
+    @memoized_property
     def cooling_demand_FEC(self):
         return self.steam_frac_cooling * self.total_steam_FEC  + \
             self.electricity_frac_cooling * self.net_electricity_FEC 
     
-    @property
+    @memoized_property
     def electricity_demand_non_cooling_FEC(self):
         return self.steam_frac_electricity_non_cooling * self.total_steam_FEC + \
             self.electricity_frac_non_cooling * self.net_electricity_FEC 
     
-    @property
+    @memoized_property
     def feedstock_FEC(self): 
         return (self.feedstock.F_mass-self.feedstock.imass['Water'])\
             * self.CFs['FEC_CFs']['FGHTP %s'%self.feedstock_ID]/self.main_product.F_mass
 
 
     def FEC_by_ID(self, ID):
+        self.material_mass_array # Makes sure LCA stream is up to date
         return self.LCA_stream.imass[ID] * self.FEC_CF_stream.imass[ID]/self.main_product.F_mass
     
     
-    @property
+    @memoized_property
     def ng_FEC(self): 
         return self.CFs['FEC_CFs']['CH4']*self.streams.natural_gas.F_mass/self.main_product.F_mass
     
     # Total FEC
-    @property
+    @memoized_property
     def FEC(self): 
         return self.material_FEC + self.net_electricity_FEC + self.feedstock_FEC + self.ng_FEC 
     
-    @property
+    @memoized_property
     def FEC_alternative(self): 
         return self.material_FEC + self.feedstock_FEC + self.heating_demand_FEC +\
         self.cooling_demand_FEC + self.electricity_demand_non_cooling_FEC 
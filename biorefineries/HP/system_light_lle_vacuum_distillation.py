@@ -1370,6 +1370,7 @@ def get_material_cost_breakdown_breakdown_fractional():
 
 
 HP_lca = LCA(HP_sys, HP_chemicals, CFs, feedstock, feedstock_ID, AA, [CT, CWP])
+spec.LCA = HP_lca
 
 # %% Full analysis
 # p11, p22, p33 = get_AA_MPSP(), HP_lca.GWP, HP_lca.FEC
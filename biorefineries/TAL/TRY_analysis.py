@@ -409,9 +409,25 @@ results_metric_1, results_metric_2, results_metric_3 = [], [], []
 
 
 # %% Run TRY analysis 
+
+# Set to True to only simulate points near the MPSP contour levels and the 
+# infeasible (sugar concentration) region; all other points are interpolated
+adaptive = False
+adaptive_levels = [np.arange(0, 15001, 500), None, None] # Levels of each metric (None to ignore)
+
 for p in productivities:
-    data_1 = TAL_data = spec.evaluate_across_specs(
-            TAL_sys, spec_1, spec_2, TAL_metrics, [p])
+    if adaptive:
+        from biorefineries.process_tools import AdaptiveGridEvaluation
+        from biorefineries.TAL._process_specification import last_infeasible_simulation
+        adaptive_evaluation = AdaptiveGridEvaluation(
+            spec, TAL_sys, spec_1, spec_2, TAL_metrics, [p], levels=adaptive_levels,
+            infeasible_simulations=last_infeasible_simulation,
+        )
+        data_1 = TAL_data = adaptive_evaluation.evaluate()
+        print(adaptive_evaluation.report())
+    else:
+        data_1 = TAL_data = spec.evaluate_across_specs(
+                TAL_sys, spec_1, spec_2, TAL_metrics, [p])
     
     
     # %% Save generated data
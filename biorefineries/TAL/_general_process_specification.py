@@ -6,6 +6,7 @@ Created on Mon May 29 15:30:15 2023
 """
 
 import numpy as np
+from biorefineries.process_tools import GridEvaluation, ConvergenceRecovery
 from winsound import Beep
 
 _red_highlight_white_text = '\033[1;47;41m'
@@ -19,6 +20,9 @@ def get_IDs(units_list):
     return [i.ID for i in units_list]
 
 bugfix = True
+convergence_recovery = ConvergenceRecovery(
+    strategies=[('baseline', None), ('reset', 'fixedpoint'), ('reset', 'wegstein')]
+)
 
 error = False
 
@@ -33,47 +37,17 @@ def evaluate_across_specs(spec, system,
         if spec_1 <= yield_ and spec_2 >= titer:
             return np.nan*np.ones([len(metrics), len(spec_3)])
     if bugfix:
-        def reset_and_reload():
-            print('Resetting cache and emptying recycles ...')
-            system.reset_cache()
-            system.empty_recycles()
-            print('Loading and simulating with baseline specifications ...')
-            
+        def load_specifications():
+            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
+        
+        def load_baseline_specifications():
             spec.load_specifications(spec_1=spec.baseline_spec_values[0], 
                                      spec_2=spec.baseline_spec_values[1], 
                                      spec_3=spec.baseline_spec_values[2])
-            
-            system.simulate()
-            print('Loading and simulating with required specifications ...')
-            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-            system.simulate()
         
-        def reset_and_switch_solver(solver_ID):
-            system.reset_cache()
-            system.empty_recycles()
-            system.converge_method = solver_ID
-            print(f"Trying {solver_ID} ...")
-            spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-            system.simulate()
-            
         def run_bugfix_barrage():
-            try:
-                reset_and_reload()
-            except Exception as e:
-                print(str(e))
-                try:
-                    reset_and_switch_solver('fixedpoint')
-                except Exception as e:
-                    print(str(e))
-                    try:
-                        reset_and_switch_solver('wegstein')
-                    except Exception as e:
-                        print(str(e))
-                        print(_yellow_text+"Bugfix barrage failed."+_reset_text)
-                        raise e
-            finally:
-                system.converge_method = 'aitken'
-                print('\n')
+            convergence_recovery.recover(system, load_specifications, (spec_1, spec_2, spec_3),
+                                         load_baseline_specifications)
     
     def HXN_Q_bal_OK():
         HXN = spec.HXN
@@ -167,9 +141,11 @@ class GeneralProcessSpecification():
         self.total_iterations = 0
         self.average_HXN_energy_balance_percent_error = 0.
         self.exceptions_dict = {}
+        self.grid_evaluation = None
         
     def evaluate_across_specs(self, system, 
-            spec_1, spec_2, metrics, spec_3):
+            spec_1, spec_2, metrics, spec_3,
+            path=None, processes=None, loader=None):
         
         """
         """
@@ -180,11 +156,23 @@ class GeneralProcessSpecification():
         self.exceptions_dict = {}
         
         self.total_iterations = len(spec_1) * len(spec_2) * len(spec_3)
-        results = evaluate_across_specs(self, system, 
-                                   spec_1, spec_2, 
-                                   metrics, spec_3)
+        if path is None and processes is None:
+            results = evaluate_across_specs(self, system, 
+                                       spec_1, spec_2, 
+                                       metrics, spec_3)
+        else:
+            self.grid_evaluation = GridEvaluation(self, system, spec_1, spec_2, 
+                                                  metrics, spec_3, path, loader)
+            results = self.grid_evaluation.evaluate(processes)
         self.average_HXN_energy_balance_percent_error /= self.total_iterations
         return results
+    
+    def evaluate_at_point(self, system, spec_1, spec_2, metrics, spec_3):
+        """
+        Evaluate metrics at a single spec_1 and spec_2 across a set of 
+        spec_3 values. Return an array [M x P] with the all metric results.
+        """
+        return evaluate_across_specs.pyfunc(self, system, spec_1, spec_2, metrics, spec_3)
 
     def load_specifications(self, spec_1=None, spec_2=None, spec_3=None,):
         """
@@ -28,6 +28,7 @@ from biosteam.evaluation import Model, Metric
 # from biosteam.evaluation.evaluation_tools import Setter
 from biorefineries.TAL.system_SA_adsorption_sugarcane import TAL_sys, TAL_tea, TAL_lca, u, s, unit_groups, unit_groups_dict, spec, price, TEA_breakdown, simulate_and_print, theoretical_max_g_TAL_per_g_glucose, TAL_chemicals
 from biorefineries.TAL.model_utils import EasyInputModel
+from biorefineries.process_tools import DirtyUnitTracker, ConvergenceRecovery
 # get_annual_factor = lambda: TAL_tea._annual_factor
 
 per_kg_KSA_to_per_kg_SA = TAL_chemicals.PotassiumSorbate.MW/TAL_chemicals.SorbicAcid.MW
@@ -205,55 +206,35 @@ baseline_spec = {'spec_1': spec.baseline_yield,
                  'spec_3': spec.baseline_productivity,}
 
 system=model._system
-def reset_and_reload():
-    print('Resetting cache and emptying recycles ...')
-    system.reset_cache()
-    system.empty_recycles()
-    print('Loading and simulating with baseline specifications ...')
-    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+convergence_recovery = ConvergenceRecovery()
+
+def load_baseline_specifications():
     spec.load_specifications(**baseline_spec)
-    system.simulate()
-    print('Loading and simulating with required specifications ...')
-    spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
-    system.simulate()
-    
-def reset_and_switch_solver(solver_ID):
-    system.reset_cache()
-    system.empty_recycles()
-    system.converge_method = solver_ID
-    print(f"Trying {solver_ID} ...")
-    spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
-    system.simulate()
     
 def run_bugfix_barrage():
-    try:
-        reset_and_reload()
-    except Exception as e:
-        print(str(e))
-        try:
-            reset_and_switch_solver('fixedpoint')
-        except Exception as e:
-            print(str(e))
-            try:
-                reset_and_switch_solver('aitken')
-            except Exception as e:
-                print(str(e))
-                # print(_yellow_text+"Bugfix barrage failed.\n"+_reset_text)
-                print("Bugfix barrage failed.\n")
-                raise e
+    spec_1, spec_2, spec_3 = spec.spec_1, spec.spec_2, spec.spec_3
+    convergence_recovery.recover(
+        system,
+        lambda: spec.load_specifications(spec_1=spec_1, spec_2=spec_2, spec_3=spec_3),
+        (spec_1, spec_2, spec_3),
+        load_baseline_specifications,
+    )
 ###############################
 
 #%% Model specification
 pre_fermenter_units_path = list(spec.reactor.get_upstream_units())
 pre_fermenter_units_path.reverse()
+# Only simulate pre-fermenter units affected by parameters that changed
+pre_fermenter_units_tracker = DirtyUnitTracker(model, pre_fermenter_units_path)
 def model_specification():
     try:
-        for i in pre_fermenter_units_path: i.simulate()
+        pre_fermenter_units_tracker.simulate_dirty_units()
         spec.load_specifications(spec_1=spec.spec_1, spec_2=spec.spec_2, spec_3=spec.spec_3)
         model._system.simulate()
     
 
     except Exception as e:
+        pre_fermenter_units_tracker.mark_all_dirty()
         str_e = str(e).lower()
         print('Error in model spec: %s'%str_e)
         # raise e
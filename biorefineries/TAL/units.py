@@ -22,7 +22,6 @@ All units are explicitly defined here for transparency and easy reference
 import numpy as np
 import thermosteam as tmo
 from math import exp, pi, log
-from flexsolve import aitken_secant
 from biosteam import Unit, BatchCrystallizer
 from biosteam.units import Flash, HXutility, Mixer, MixTank, Pump, \
     SolidsSeparator, StorageTank, LiquidsSplitSettler, \
@@ -31,6 +30,7 @@ from biosteam.units.decorators import cost
 from biosteam.units.design_tools import CEPCI_by_year as CEPCI
 from thermosteam import Stream, MultiStream
 from biorefineries.TAL.process_settings import price
+from biorefineries.process_tools import SteamInjection
 # from biorefineries.TAL.utils import CEPCI, baseline_feedflow, compute_extra_chemical, adjust_recycle
 from biorefineries.TAL.utils import baseline_feedflow, compute_extra_chemical, adjust_recycle
 
@@ -283,24 +283,13 @@ class SteamMixer(Unit):
     def __init__(self, ID='', ins=None, outs=(), *, P):
         Unit.__init__(self, ID, ins, outs)
         self.P = P
+        self.steam_injection = SteamInjection()
         
-    @staticmethod
-    def P_at_flow(mol_water, P, steam, mixed, feed):
-        steam.imol['Water'] = mol_water
-        mixed.mol = steam.mol + feed.mol
-        mixed.H = feed.H + steam.H
-        P_new = mixed.chemicals.Water.Psat(mixed.T)
-        return P_new-P
-    
     def _run(self):
         feed, steam = self.ins
         mixed = self.outs[0]
-
-        steam_mol = steam.F_mol
-        steam_mol = max(0, aitken_secant(f=self.P_at_flow,
-                                  x0=steam_mol, x1=steam_mol+0.1, 
-                                  xtol=1e-4, ytol=1e-4,
-                                  args=(self.P, steam, mixed, feed)))
+        T = mixed.chemicals.Water.Tsat(self.P) # Water vapor pressure is P
+        self.steam_injection(feed, steam, mixed, T)
         mixed.P = self.P
     
 # Pretreatment reactor
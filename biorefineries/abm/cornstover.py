@@ -44,11 +44,13 @@ Name: (Corn stover, Price [USD/kg]), dtype: float64
 
 """
 from biorefineries import cornstover as cs
+from biorefineries.tea import get_cashflow_inputs, BatchedCashFlowAnalysis
 import biosteam as bst
+import numpy as np
 import os
 import pandas as pd
 
-__all__ = ('ABM_TEA_model',)
+__all__ = ('ABM_TEA_model', 'ABM_TEA_batch', 'evaluate_ABM_TEA_samples')
 
 cs.load()
 bst.CE = 607.5
@@ -171,6 +173,193 @@ def ABM_TEA_function(
         'Production': cs.ethanol.F_mass * hours,
     }
 
+# %% Batched ABM TEA evaluation
+
+#: [tuple[str]] Metrics returned by `ABM_TEA_function` and `ABM_TEA_batch`.
+ABM_TEA_metrics = (
+    'MESP', 'MFPP', 'IRR', 'NPV', 'TCI', 'VOC', 'FOC',
+    'Electricity consumption [MWhr/yr]', 'Electricity production [MWhr/yr]',
+    'Production',
+)
+
+#: [dict[tuple[float, float, float], dict]] Results of simulated mass balance 
+#: points by cornstover fraction, operating days, and plant capacity.
+mass_balance_points = {}
+
+def simulate_mass_balance_point(cornstover_fraction, operating_days, plant_capacity, durations):
+    """
+    Simulate the biorefinery at a mass balance point and return a dictionary 
+    of the results required to solve the cash flows at any feedstock price, 
+    ethanol price, and IRR for the given durations.
+    
+    """
+    set_mixed_cornstover_miscanthus_feedstock(cornstover_fraction)
+    hours = operating_days * 24 
+    cs.cornstover.F_mass = plant_capacity / hours
+    tea = cs.cornstover_tea
+    tea.operating_days = operating_days
+    cs.cornstover_sys.simulate()
+    unit_group = bst.UnitGroup(units=cs.cornstover_sys.units)
+    cashflow_inputs = {}
+    for duration in durations: 
+        tea.duration = duration
+        cashflow_inputs[duration] = get_cashflow_inputs(tea)
+    return {
+        'Cash flow inputs': cashflow_inputs, # By duration
+        'Feedstock': (cs.cornstover.price, cs.cornstover.F_mass * hours), # Price and flow rate
+        'Ethanol': (cs.ethanol.price, cs.ethanol.F_mass * hours),
+        'Electricity consumption [MWhr/yr]': hours * unit_group.get_electricity_consumption(), 
+        'Electricity production [MWhr/yr]': hours * unit_group.get_electricity_production(),
+    }
+
+def evaluate_mass_balance_point(point, cornstover_fraction, price_cornstover,
+                                price_miscanthus, price_ethanol, IRR, duration):
+    """
+    Return a 2d array of metrics (by row) for the price and financial 
+    scenarios (by column) of a simulated mass balance point with the same 
+    duration.
+    
+    """
+    tea = cs.cornstover_tea
+    tea.duration = duration
+    inputs = point['Cash flow inputs'][duration]
+    price_feedstock = (price_cornstover * cornstover_fraction 
+                       + price_miscanthus * (1 - cornstover_fraction))
+    feedstock_price, feedstock_flow = point['Feedstock']
+    ethanol_price, ethanol_flow = point['Ethanol']
+    N = cornstover_fraction.size
+    batch = BatchedCashFlowAnalysis.from_inputs(
+        tea, N * [inputs], IRR=IRR, 
+        price2cost=np.full(N, ethanol_flow), 
+        market_value=price_ethanol * ethanol_flow,
+    )
+    # Material costs and sales are linear with the feedstock and ethanol prices
+    batch.material_cost += (price_feedstock - feedstock_price) * feedstock_flow
+    batch.sales += (price_ethanol - ethanol_price) * ethanol_flow
+    MESP = batch.solve_price()
+    batch.price2cost = np.full(N, -feedstock_flow)
+    batch.market_value = price_feedstock * feedstock_flow
+    MFPP = batch.solve_price()
+    return np.array([
+        MESP, MFPP, batch.solve_IRR(), batch.NPV, batch.TCI, batch.VOC, batch.FOC,
+        np.full(N, point['Electricity consumption [MWhr/yr]']),
+        np.full(N, point['Electricity production [MWhr/yr]']),
+        np.full(N, ethanol_flow),
+    ])
+
+def ABM_TEA_batch(
+        cornstover_fraction=1.0,
+        operating_days=350.4,
+        plant_capacity=876072883.4242561, 
+        price_cornstover=0.05159, 
+        price_miscanthus=0.08, 
+        price_ethanol=0.80,
+        IRR=0.10,
+        start_year=2007,
+        end_year=2037,
+        cornstover_fractions=None,
+    ):
+    """
+    Return a pandas DataFrame of biorefinery metrics (as returned by 
+    `ABM_TEA_function`) for the production of cellulosic ethanol from mixed 
+    feedstocks at each scenario. All arguments may be arrays (broadcasted
+    together).
+    
+    The biorefinery is only simulated once for each unique mass balance point
+    (i.e., cornstover fraction, operating days, and plant capacity), which are 
+    memoized in `mass_balance_points`. Cash flows at all prices, IRRs, and 
+    durations of a point are solved together without re-simulation.
+
+    Parameters
+    ----------
+    cornstover_fraction : float or 1d array
+        Fraction of cornstover in feedstock.
+    operating_days : float or 1d array
+        Number of operating days per year.
+    plant_capacity : float or 1d array
+        Plant capacity in kg/yr of feedstock.
+    price_cornstover : float or 1d array
+        Price of cornstover in USD/kg.
+    price_miscanthus : float or 1d array
+        Price of miscanthus in USD/kg.
+    price_ethanol : float or 1d array
+        Price of ethanol in USD/kg.
+    IRR : float or 1d array
+        Internal rate of return as a fraction (not percent!).
+    start_year, end_year : int or 1d array
+        Years of operation.
+    cornstover_fractions : 1d array, optional
+        Cornstover fractions to simulate. If given, metrics are linearly 
+        interpolated between the closest cornstover fractions (at the same 
+        prices, IRR, and duration), so that only these fractions are simulated.
+
+    Examples
+    --------
+    Evaluate 10000 agent-year queries with only 11 simulations (one for
+    each cornstover fraction given):
+    
+    >>> import numpy as np
+    >>> from biorefineries.abm.cornstover import ABM_TEA_batch # doctest: +SKIP
+    >>> N = 10000
+    >>> metrics = ABM_TEA_batch(
+    ...     cornstover_fraction=np.random.uniform(0, 1, N),
+    ...     price_cornstover=np.random.uniform(0.04, 0.07, N),
+    ...     IRR=np.random.uniform(0.05, 0.15, N),
+    ...     cornstover_fractions=np.linspace(0, 1, 11),
+    ... ) # doctest: +SKIP
+    >>> metrics['MESP'] # USD/kg # doctest: +SKIP
+
+    """
+    arrays = np.broadcast_arrays(*[np.asarray(i, float) for i in (
+        cornstover_fraction, operating_days, plant_capacity, price_cornstover, 
+        price_miscanthus, price_ethanol, IRR, start_year, end_year,
+    )])
+    (x_cornstover, operating_days, plant_capacity, price_cornstover, 
+     price_miscanthus, price_ethanol, IRR, start_year, end_year) = [i.ravel() for i in arrays]
+    if ((x_cornstover < 0.) | (x_cornstover > 1.)).any():
+        raise ValueError('cornstover fraction must be between 0 to 1')
+    N = x_cornstover.size
+    if cornstover_fractions is None:
+        nodes = [(x_cornstover, np.ones(N))]
+    else:
+        grid = np.unique(np.asarray(cornstover_fractions, float))
+        if grid.size < 2 or x_cornstover.min() < grid[0] or x_cornstover.max() > grid[-1]:
+            raise ValueError('cornstover fractions must include at least two '
+                             'fractions and bound all cornstover fractions')
+        index = np.searchsorted(grid, x_cornstover, side='right') - 1
+        index[index == grid.size - 1] -= 1
+        lb = grid[index]
+        ub = grid[index + 1]
+        weight = (x_cornstover - lb) / (ub - lb)
+        nodes = [(lb, 1. - weight), (ub, weight)]
+    durations = [(int(i), int(j)) for i, j in zip(start_year, end_year)]
+    weights = {} # Weights of scenarios by mass balance point
+    for node, weight in nodes:
+        for i in np.flatnonzero(weight):
+            key = (float(node[i]), float(operating_days[i]), float(plant_capacity[i]))
+            if key in weights: weights[key][i] = weight[i]
+            else: weights[key] = {i: weight[i]}
+    values = np.zeros([len(ABM_TEA_metrics), N])
+    for key, scenario_weights in weights.items():
+        scenarios = {} # By duration
+        for i in scenario_weights:
+            duration = durations[i]
+            if duration in scenarios: scenarios[duration].append(i)
+            else: scenarios[duration] = [i]
+        point = mass_balance_points.get(key)
+        if point is None:
+            point = simulate_mass_balance_point(*key, scenarios)
+        elif not point['Cash flow inputs'].keys() >= scenarios.keys():
+            point = simulate_mass_balance_point(*key, scenarios.keys() | point['Cash flow inputs'].keys())
+        mass_balance_points[key] = point
+        for duration, index in scenarios.items():
+            weight = np.array([scenario_weights[i] for i in index])
+            values[:, index] += weight * evaluate_mass_balance_point(
+                point, x_cornstover[index], price_cornstover[index], 
+                price_miscanthus[index], price_ethanol[index], IRR[index], duration,
+            )
+    return pd.DataFrame(values.T, columns=ABM_TEA_metrics)
+
 # %% ABM Model object
 
 metrics = [
@@ -209,7 +398,7 @@ def set_operating_days(operating_days):
     cs.cornstover_tea.operating_days = operating_days
     operating_hours = operating_days * 24
 
-@ABM_TEA_model.parameter
+@ABM_TEA_model.parameter(element='TEA')
 def set_IRR(IRR):
     cs.cornstover_tea.IRR = IRR
 
@@ -228,3 +417,19 @@ def set_plant_capacity(plant_capacity):
 ABM_TEA_model.parameter(set_mixed_cornstover_miscanthus_feedstock,
                         name='Corn stover fraction', units='by wt.')
 
+
+def evaluate_ABM_TEA_samples(samples, cornstover_fractions=None):
+    """
+    Return a pandas DataFrame of biorefinery metrics for samples of the 
+    `ABM_TEA_model` (a 2d array with columns in the order of its parameters)
+    through `ABM_TEA_batch`, which only simulates each unique mass balance 
+    point once.
+    
+    """
+    (price_cornstover, price_miscanthus, price_ethanol, operating_days, IRR, 
+     start_year, end_year, plant_capacity, cornstover_fraction) = np.asarray(samples, float).T
+    return ABM_TEA_batch(
+        cornstover_fraction, operating_days, plant_capacity, price_cornstover, 
+        price_miscanthus, price_ethanol, IRR, start_year, end_year, 
+        cornstover_fractions,
+    )
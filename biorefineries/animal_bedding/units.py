@@ -10,7 +10,6 @@ Humbird, D., Davis, R., Tao, L., Kinchin, C., Hsu, D., Aden, A., Dudgeon, D. (20
 """
 import os
 import sys
-import flexsolve as flx
 from thermosteam import MultiStream
 from biosteam import Unit
 from biosteam.units.decorators import cost, design
@@ -19,6 +18,7 @@ from biosteam.units.design_tools.specification_factors import  material_densitie
 from biosteam.units.design_tools import column_design
 import thermosteam as tmo
 import biosteam as bst
+from biorefineries.process_tools import SteamInjection
 
 Rxn = tmo.reaction.Reaction
 ParallelRxn = tmo.reaction.ParallelReaction
@@ -150,23 +150,13 @@ class SteamMixer(Unit):
     def __init__(self, ID='', ins=None, outs=(), *, P):
         super().__init__(ID, ins, outs)
         self.P = P
-    
-    @staticmethod
-    def _P_at_flow(mol_water, P, steam, mixed, feed):
-        steam.imol['7732-18-5'] = mol_water
-        mixed.mol[:] = steam.mol + feed.mol
-        mixed.H = feed.H + mol_water * 40798
-        P_new = mixed.chemicals.Water.Psat(mixed.T)
-        return P - P_new
+        self.steam_injection = SteamInjection('7732-18-5', steam_enthalpy=40798)
     
     def _run(self):
         feed, steam = self._ins
-        steam_mol = steam.F_mol
         mixed = self.outs[0]
-        steam_mol = flx.aitken_secant(self._P_at_flow,
-                                  steam_mol, steam_mol+0.1, 
-                                  1e-4, 1e-4,
-                                  args=(self.P, steam, mixed, feed))
+        T = mixed.chemicals.Water.Tsat(self.P) # Water vapor pressure is P
+        self.steam_injection(feed, steam, mixed, T)
         mixed.P = self.P      
         hu = self.heat_utilities[0]
         hu(steam.Hvap, mixed.T)
@@ -1,48 +1,73 @@
 # -*- coding: utf-8 -*-
 """
+Submodules are imported lazily: importing the package is cheap and all
+submodules are loaded (as if star-imported) the first time any other
+attribute is accessed.
+
 """
-from . import chemicals
-from . import composition
-from . import oil_extraction
-from . import process_settings
-from . import units
-from . import systems
-from . import biorefinery
-from . import evaluation
-from . import results
-from . import contour_plots
-from . import feature_mockups
-from . import uncertainty_plots
-from . import parse_configuration
-from . import tables
-
-__all__ = (
-    *chemicals.__all__,
-    *composition.__all__,
-    *oil_extraction.__all__,
-    *process_settings.__all__,
-    *units.__all__,
-    *systems.__all__,
-    *biorefinery.__all__,
-    *evaluation.__all__,
-    *results.__all__,
-    *contour_plots.__all__,
-    *uncertainty_plots.__all__,
-    *parse_configuration.__all__,
-    *tables.__all__,
+import sys as _sys
+
+def _import_submodule(name):
+    # Unlike importlib.import_module, __import__ is reported by `python -X importtime`
+    name = f'{__name__}.{name}'
+    __import__(name)
+    return _sys.modules[name]
+
+_submodules = (
+    'chemicals',
+    'composition',
+    'oil_extraction',
+    'process_settings',
+    'units',
+    'systems',
+    'model',
+    'snapshot',
+    'biorefinery',
+    'evaluation',
+    'results',
+    'contour_plots',
+    'feature_mockups',
+    'uncertainty_plots',
+    'parse_configuration',
+    'tables',
 )
 
-from .chemicals import *
-from .composition import *
-from .oil_extraction import *
-from .process_settings import *
-from .units import *
-from .systems import *
-from .biorefinery import *
-from .evaluation import *
-from .results import *
-from .contour_plots import *
-from .feature_mockups import *
-from .uncertainty_plots import *
-from .parse_configuration import *
-from .tables import *
\ No newline at end of file
+_exported = tuple([i for i in _submodules if i != 'feature_mockups'])
+
+# Imported by other submodules (e.g., `from .. import streams`) but not loaded
+_internal_submodules = ('streams',)
+
+_loaded = _loading = False
+
+def _public_names(module):
+    try:
+        return module.__all__
+    except AttributeError:
+        return [i for i in module.__dict__ if not i.startswith('_')]
+
+def load():
+    """Import all submodules and their public names into the package."""
+    global _loaded, _loading
+    if _loaded or _loading: return
+    _loading = True
+    try:
+        modules = {i: _import_submodule(i) for i in _submodules}
+        dct = globals()
+        dct['__all__'] = tuple([j for i in _exported for j in modules[i].__all__])
+        for module in modules.values():
+            dct.update({i: getattr(module, i) for i in _public_names(module)})
+        _loaded = True
+    finally:
+        _loading = False
+
+def __getattr__(name):
+    if name in _submodules or name in _internal_submodules: return _import_submodule(name)
+    if not _loaded and not _loading:
+        load()
+        dct = globals()
+        if name in dct: return dct[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__():
+    load()
+    return list(globals())
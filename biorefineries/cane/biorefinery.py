@@ -25,6 +25,8 @@ from .feature_mockups import (
     all_metric_mockups, 
 )
 from .process_settings import load_process_settings
+from .model import CostAwareModel, PerturbationEngine
+from .snapshot import BiorefinerySnapshot, get_snapshot_file
 from .chemicals import create_cellulosic_oilcane_chemicals as create_chemicals
 from biorefineries.cellulosic import PretreatmentReactorSystem as PRS
 from .systems import (
@@ -215,6 +217,7 @@ class Biorefinery:
     default_prices_correleted_to_crude_oil = False
     default_conversion_performance_distribution = 'longterm'
     default_year = 2022
+    default_snapshot_folder = None # Folder of converged snapshots (not saved if None)
     default_WWT = None
     default_oil_content_range = [5, 15]
     default_income_tax_range = [21, 28] # Davis et al. 2018; https://www.nrel.gov/docs/fy19osti/71949.pdf
@@ -339,6 +342,7 @@ class Biorefinery:
             remove_biodiesel_production=None,
             update_feedstock_price=None,
             simulate=True,
+            snapshot_folder=None,
         ):
         if update_feedstock_price is None: update_feedstock_price = True
         if year is None: year = cls.default_year
@@ -368,7 +372,8 @@ class Biorefinery:
         flowsheet_name = format_configuration(configuration, latex=False)
         flowsheet = bst.Flowsheet(flowsheet_name)
         main_flowsheet.set_flowsheet(flowsheet)
-        if chemicals: self._chemicals = chemicals
+        custom_chemicals = bool(chemicals)
+        if custom_chemicals: self._chemicals = chemicals
         else: chemicals = self.chemicals
         bst.settings.set_thermo(chemicals)
         load_process_settings()
@@ -468,11 +473,11 @@ class Biorefinery:
                 else:
                     key = (operation_mode, 'last')
                 if key in recycle_data: 
-                    material_data = recycle_data[key]
+                    data = recycle_data[key]
                 else:
-                    recycle_data[key] = material_data = cane_sys.get_material_data()
+                    recycle_data[key] = data = cane_sys.get_recycle_data()
                 try:
-                    cane_sys.simulate(material_data=material_data, update_material_data=True)
+                    cane_sys.simulate(recycle_data=data, update_recycle_data=True)
                 except Exception as e:
                     raise e
                     print(e)
@@ -755,7 +760,12 @@ class Biorefinery:
         self.price_distribution_module = dist = get_price_distributions_module(year)
         
         ## Model
-        model = bst.Model(sys, exception_hook='raise', retry_evaluation=False)
+        # Metrics that perturb the system (derivatives and competitive
+        # biomass yield) share simulations through the perturbation engine, 
+        # which restores the last simulated state.
+        self.perturbation_engine = perturbation_engine = PerturbationEngine(sys, feedstock)
+        model = CostAwareModel(sys, exception_hook='raise', retry_evaluation=False,
+                               perturbation_engine=perturbation_engine)
         parameter = model.parameter
         metric = model.metric
         
@@ -849,91 +859,94 @@ class Biorefinery:
                 self.dry_biomass_yield = dry_biomass_yield
     
         @parameter(distribution=dist.copd, element='crude oil', 
-                   baseline=dist.mcop, units='USD/L')
+                   baseline=dist.mcop, units='USD/L', kind='cost')
         def set_crude_oil_price(price):
             self.crude_oil_price = price
         
-        @default(self.baseline_feedstock_price, element='feedstock', units='USD/kg')
+        @default(self.baseline_feedstock_price, element='feedstock', units='USD/kg', kind='cost')
         def set_baseline_feedstock_price(price):
             self.baseline_feedstock_price = price
+            feedstock.price = self.feedstock_price
         
         if prices_correleted_to_crude_oil:
             predict = lambda name, scalar: dist.models[name].predict(np.array([[scalar]]))[0]
                                                                      
             @parameter(distribution=dist.residual_distributions['Cellulosic ethanol'],
-                       element='Cellulosic ethanol', baseline=0., units='USD/L')
+                       element='Cellulosic ethanol', baseline=0., units='USD/L', kind='cost')
             def set_cellulosic_ethanol_price(price): 
                 cellulosic_ethanol.price = predict('Cellulosic ethanol', self.crude_oil_price + price) * ethanol_L_per_kg
                 
             @parameter(distribution=dist.residual_distributions['Advanced ethanol'],
-                       element='Advanced ethanol', baseline=0., units='USD/L')
+                       element='Advanced ethanol', baseline=0., units='USD/L', kind='cost')
             def set_advanced_ethanol_price(price): 
                 advanced_ethanol.price =  predict('Advanced ethanol', self.crude_oil_price + price) * ethanol_L_per_kg
                 
             # USDA ERS historical price data
             @parameter(distribution=dist.residual_distributions['Biomass based diesel'], 
-                       element='Biomass based diesel', units='USD/L', baseline=0.)
+                       element='Biomass based diesel', units='USD/L', baseline=0., kind='cost')
             def set_biomass_based_diesel_price(price):
                 biomass_based_diesel.price =  predict('Biomass based diesel', self.crude_oil_price + price) * biodiesel_L_per_kg
         
             @parameter(distribution=dist.residual_distributions['Cellulosic based diesel'],
-                       element='Cellulosic based diesel', units='USD/L', baseline=0.)
+                       element='Cellulosic based diesel', units='USD/L', baseline=0., kind='cost')
             def set_cellulosic_based_diesel_price(price):
                 cellulosic_based_diesel.price =  predict('Cellulosic based diesel', self.crude_oil_price + price) * biodiesel_L_per_kg
         
             # https://www.eia.gov/energyexplained/natural-gas/prices.php
             @parameter(distribution=dist.residual_distributions['Natural gas'],
-                       element='Natural gas', units='USD/m3', baseline=0.)
+                       element='Natural gas', units='USD/m3', baseline=0., kind='cost')
             def set_natural_gas_price(price): 
                 BT.natural_gas_price =  predict('Natural gas', self.crude_oil_price + price) * V_ng
         
             @parameter(distribution=dist.residual_distributions['Electricity'],
-                       element='Electricity', units='USD/kWh', baseline=0.)
+                       element='Electricity', units='USD/kWh', baseline=0., kind='cost')
             def set_electricity_price(price): 
                 bst.PowerUtility.price = predict('Electricity', self.crude_oil_price + price)
                 
         else:
             # USDA ERS historical price data with EPA RIN prices
             @parameter(distribution=dist.cepd, element='Cellulosic ethanol', 
-                       baseline=dist.mcep, units='USD/L')
+                       baseline=dist.mcep, units='USD/L', kind='cost')
             def set_cellulosic_ethanol_price(price): # Triangular distribution fitted over the past 10 years Sep 2009 to Nov 2020
                 cellulosic_ethanol.price = price * ethanol_L_per_kg
                 
             @parameter(distribution=dist.aepd, element='Advanced ethanol', 
-                       baseline=dist.maep, units='USD/L')
+                       baseline=dist.maep, units='USD/L', kind='cost')
             def set_advanced_ethanol_price(price): # Triangular distribution fitted over the past 10 years Sep 2009 to Nov 2020
                 advanced_ethanol.price = price * ethanol_L_per_kg
                 
             # USDA ERS historical price data
-            @parameter(distribution=dist.bpd, element='Biomass based diesel', units='USD/L', baseline=dist.mbp)
+            @parameter(distribution=dist.bpd, element='Biomass based diesel', units='USD/L', baseline=dist.mbp,
+                       kind='cost')
             def set_biomass_based_diesel_price(price): # Triangular distribution fitted over the past 10 years Sep 2009 to March 2021
                 biomass_based_diesel.price = price * biodiesel_L_per_kg
         
-            @parameter(distribution=dist.cbpd, element='Cellulosic based diesel', units='USD/L', baseline=dist.mcbp)
+            @parameter(distribution=dist.cbpd, element='Cellulosic based diesel', units='USD/L', baseline=dist.mcbp,
+                       kind='cost')
             def set_cellulosic_based_diesel_price(price): # Triangular distribution fitted over the past 10 years Sep 2009 to March 2021
                 cellulosic_based_diesel.price = price * biodiesel_L_per_kg
         
             # https://www.eia.gov/energyexplained/natural-gas/prices.php
             @parameter(distribution=dist.natural_gas_price_distribution, element='Natural gas', units='USD/m3',
-                       baseline=4.73 * 35.3146667/1e3)
+                       baseline=4.73 * 35.3146667/1e3, kind='cost')
             def set_natural_gas_price(price): 
                 BT.natural_gas_price = price * V_ng
         
             @parameter(distribution=dist.electricity_price_distribution, units='USD/kWh',
-                       element='electricity', baseline=dist.mean_electricity_price)
+                       element='electricity', baseline=dist.mean_electricity_price, kind='cost')
             def set_electricity_price(price): 
                 bst.PowerUtility.price = price
         
         # 10% is suggested for waste reducing, but 15% is suggested for investment
-        @uniform(10., 15., units='%', baseline=10, element='')
+        @uniform(10., 15., units='%', baseline=10, element='', kind='cost')
         def set_IRR(IRR):
             tea.IRR = IRR / 100.
         
-        @uniform(0.10, 0.22, units='USD/kg', element=crude_glycerol.ID)
+        @uniform(0.10, 0.22, units='USD/kg', element=crude_glycerol.ID, kind='cost')
         def set_crude_glycerol_price(price):
             crude_glycerol.price = price
     
-        @default(0.65, units='USD/kg', element=pure_glycerine.ID)
+        @default(0.65, units='USD/kg', element=pure_glycerine.ID, kind='cost')
         def set_pure_glycerol_price(price):
             pure_glycerine.price = price
         
@@ -941,7 +954,7 @@ class Biorefinery:
         def set_saccharification_reaction_time(reaction_time):
             if abs(number) in cellulosic_configurations: saccharification.tau = reaction_time
         
-        @default(0.212, units='USD/kg', element=cellulase.ID)
+        @default(0.212, units='USD/kg', element=cellulase.ID, kind='cost')
         def set_cellulase_price(price):
             cellulase.price = price
     
@@ -1116,12 +1129,13 @@ class Biorefinery:
                 u.R401.oil_reaction.X[0] = TAG_to_FFA_conversion / 100.
         
         @default_gwp(feedstock.characterization_factors[GWP], name='GWP', 
-                 element='sugarcane', units='kg*CO2e/kg')
+                 element='sugarcane', units='kg*CO2e/kg', kind='cost')
         def set_feedstock_GWP(value):
             self.baseline_feedstock_CF = value
+            feedstock.set_CF(GWP, self.feedstock_CF)
         
         @default_gwp(methanol.characterization_factors[GWP], name='GWP', 
-                     element=methanol.ID, units='kg*CO2e/kg')
+                     element=methanol.ID, units='kg*CO2e/kg', kind='cost')
         def set_methanol_GWP(value):
             methanol.characterization_factors[GWP] = value
         
@@ -1131,24 +1145,25 @@ class Biorefinery:
         #     crude_glycerol.characterization_factors[GWP] = value
         
         @default_gwp(pure_glycerine.characterization_factors[GWP], name='GWP', 
-                     element=pure_glycerine.ID, units='kg*CO2e/kg')
+                     element=pure_glycerine.ID, units='kg*CO2e/kg', kind='cost')
         def set_pure_glycerine_GWP(value):
             pure_glycerine.characterization_factors[GWP] = value
         
         @default_gwp(cellulase.characterization_factors[GWP], name='GWP', 
-                     element=cellulase.ID, units='kg*CO2e/kg')
+                     element=cellulase.ID, units='kg*CO2e/kg', kind='cost')
         def set_cellulase_GWP(value):
             cellulase.characterization_factors[GWP] = value * 0.02
         
         @default_gwp(natural_gas.characterization_factors[GWP], name='GWP', 
-                     element=natural_gas.ID, units='kg*CO2e/kg')
+                     element=natural_gas.ID, units='kg*CO2e/kg', kind='cost')
         def set_natural_gas_GWP(value):
             for ng in natural_gas_streams:
                 ng.characterization_factors[GWP] = value
         
         income_tax_lb, income_tax_ub = self.default_income_tax_range
         tea.income_tax = income_tax_lb / 100
-        @uniform(income_tax_lb, income_tax_ub, baseline=income_tax_lb, name='Income tax', units='%')
+        @uniform(income_tax_lb, income_tax_ub, baseline=income_tax_lb, name='Income tax', units='%',
+                 kind='cost')
         def set_income_tax(income_tax):
             tea.income_tax = income_tax * 0.01
                     
@@ -1360,55 +1375,80 @@ class Biorefinery:
             else:
                 return 0.
     
+        oil_content_metrics = (
+            MFPP, biodiesel_production, ethanol_production, electricity_production,
+            natural_gas_consumption, TCI, GWP_economic,
+        )
+        baseline_oil_content = []
+        
+        def perturb_oil_content():
+            if agile:
+                cane_mode.oil_content += 0.01
+                sorghum_mode.oil_content += 0.01
+            else:
+                oil = composition_specification.oil
+                baseline_oil_content.append(oil)
+                composition_specification.load_oil_content(oil + 0.01)
+        
+        def revert_oil_content():
+            if agile:
+                cane_mode.oil_content -= 0.01
+                sorghum_mode.oil_content -= 0.01
+            else:
+                composition_specification.load_oil_content(baseline_oil_content.pop())
+        
+        perturbation_engine.perturbation(
+            'Oil content', perturb_oil_content, revert_oil_content,
+            getters={i.name: i.getter for i in oil_content_metrics},
+            active=lambda: number >= 0 and not self._derivative_disabled,
+        )
+        
+        def oil_content_difference(metric):
+            return perturbation_engine.get('Oil content', metric.name) - metric.cache
+        
         @metric(units='USD/MT')
         def MFPP_derivative():
             if number < 0:
                 return 0.
             if self._derivative_disabled:
                 return np.nan
-            if agile:
-                cane_mode.oil_content += 0.01
-                sorghum_mode.oil_content += 0.01
-            else:
-                composition_specification.load_oil_content(composition_specification.oil + 0.01)
-            sys.simulate()
-            return MFPP.difference()
+            return oil_content_difference(MFPP)
         
         @metric(units='L/MT')
         def biodiesel_production_derivative():
             if number < 0: return 0.
             if self._derivative_disabled: return np.nan
-            return biodiesel_production.difference()
+            return oil_content_difference(biodiesel_production)
         
         @metric(units='L/MT')
         def ethanol_production_derivative():
             if number < 0: return 0.
             if self._derivative_disabled: return np.nan
-            return ethanol_production.difference()
+            return oil_content_difference(ethanol_production)
         
         @metric(units='kWh/MT')
         def electricity_production_derivative():
             if number < 0: return 0.
             if self._derivative_disabled: return np.nan
-            return electricity_production.difference()
+            return oil_content_difference(electricity_production)
         
         @metric(units='cf/MT')
         def natural_gas_consumption_derivative():
             if number < 0: return 0.
             if self._derivative_disabled: return np.nan
-            return natural_gas_consumption.difference()
+            return oil_content_difference(natural_gas_consumption)
         
         @metric(units='10^6*USD')
         def TCI_derivative():
             if number < 0: return 0.
             if self._derivative_disabled: return np.nan
-            return TCI.difference()
+            return oil_content_difference(TCI)
         
         @metric(name='GWP derivative', element='Economic allocation', units='kg*CO2e / USD')
         def GWP_economic_derivative(): # Cradle to gate
             if number < 0: return 0.
             if self._derivative_disabled: return 0.
-            return GWP_economic.difference()
+            return oil_content_difference(GWP_economic)
     
         @metric(name='GWP derivative', element='Ethanol', units='kg*CO2e / L')
         def GWP_ethanol_derivative(): # Cradle to gate
@@ -1475,6 +1515,25 @@ class Biorefinery:
             sys.simulate()
             return tea.net_earnings, tea.TCI
         
+        baseline_dry_biomass_yield = []
+        
+        def perturb_dry_biomass_yield():
+            x0 = self.dry_biomass_yield
+            assert x0 < 100, "dry biomass yield over 100 dry MT / ha"
+            baseline_dry_biomass_yield.append(x0)
+            self.dry_biomass_yield = 2 * x0
+            self.update_feedstock()
+            
+        def revert_dry_biomass_yield():
+            self.dry_biomass_yield = baseline_dry_biomass_yield.pop()
+            self.update_feedstock()
+        
+        perturbation_engine.perturbation(
+            'Dry biomass yield', perturb_dry_biomass_yield, revert_dry_biomass_yield,
+            getters={'NE': lambda: tea.net_earnings, 'TCI': lambda: tea.TCI},
+            active=lambda: self.ROI_target is not None and composition_specification.oil != 0,
+        )
+        
         def competitive_biomass_yield_objective(biomass_yield, target, mb_NE, An_TCI):
             return 100. * linear_val(biomass_yield, mb_NE) / exponential_val(max(biomass_yield, 1), An_TCI) - target
         
@@ -1484,11 +1543,10 @@ class Biorefinery:
             if self.ROI_target is None: return np.nan
             if composition_specification.oil == 0: return self.baseline_dry_biomass_yield
             x0 = self.dry_biomass_yield
-            assert x0 < 100, "dry biomass yield over 100 dry MT / ha"
             x1 = 2 * x0
             NE0, TCI0 = tea.net_earnings, tea.TCI
-            NE1, TCI1 = NE_and_TCI_at_biomass_yield(x1)
-            self.dry_biomass_yield = x0 # Reset dry biomass yield
+            NE1 = perturbation_engine.get('Dry biomass yield', 'NE')
+            TCI1 = perturbation_engine.get('Dry biomass yield', 'TCI')
             mb_NE = linear_fit(x0, x1, NE0, NE1)
             An_TCI = exponential_fit(x0, x1, TCI0, TCI1)
             
@@ -1679,10 +1737,38 @@ class Biorefinery:
             PolishingFilter.recycle_system_hook = adjust_system_convergence
         
         ## Simulation
-        if simulate:
+        if snapshot_folder is None: snapshot_folder = cls.default_snapshot_folder
+        if snapshot_folder is None or agile or custom_chemicals: # Custom chemicals are not part of the key
+            snapshot = snapshot_file = None
+        else:
+            # Resolved values (after class defaults) so that changed defaults do not load stale snapshots
+            snapshot_key = (
+                key, bool(avoid_natural_gas), 
+                None if WWT_kwargs is None else sorted(WWT_kwargs.items()),
+                bool(prices_correleted_to_crude_oil), tuple(oil_content_range),
+                bool(remove_biodiesel_production), bool(update_feedstock_price),
+                tuple([(i.index, None if i.baseline is None else float(i.baseline)) 
+                       for i in model.parameters]), # Baseline state (e.g., oil content)
+            )
+            snapshot_file = get_snapshot_file(snapshot_folder, snapshot_key)
+            snapshot = BiorefinerySnapshot.load(snapshot_file, snapshot_key)
+            if snapshot is not None and not snapshot.is_compatible(sys): snapshot = None
+        if snapshot is not None: # Warm-start from the converged snapshot
+            snapshot.restore(sys, results=not simulate)
+            if simulate: 
+                sys.simulate()
+                if update_feedstock_price:
+                    feedstock.price = tea.solve_price(feedstock)
+                if not snapshot.matches(sys): # Stale; overwrite
+                    BiorefinerySnapshot(snapshot_key, sys, feedstock.price).save(snapshot_file)
+            elif update_feedstock_price:
+                feedstock.price = snapshot.feedstock_price
+        elif simulate:
             sys.simulate()
             if update_feedstock_price:
                 feedstock.price = tea.solve_price(feedstock)
+            if snapshot_file is not None:
+                BiorefinerySnapshot(snapshot_key, sys, feedstock.price).save(snapshot_file)
         
         ## Tests
         if feedstock_line is None:
@@ -5,6 +5,8 @@ import os
 import numpy as np
 import pandas as pd
 import biosteam as bst
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
 from warnings import warn
 from warnings import filterwarnings
 from biorefineries import cane
@@ -18,6 +20,9 @@ from .results import (
     monte_carlo_file,
     autoload_file_name,
     spearman_file,
+    save_table,
+    save_coordinate_tables,
+    load_coordinate_table,
 )
 
 __all__ = (
@@ -27,6 +32,8 @@ __all__ = (
     'evaluate_metrics_oil_recovery_integration',
     'evaluate_metrics_at_biomass_yield',
     'run_uncertainty_and_sensitivity',
+    'create_convergence_model',
+    'evaluate_samples_in_parallel',
     'save_pickled_results',
     'run_all',
     'run_sugarcane_microbial_oil_and_ethanol',
@@ -155,7 +162,8 @@ def evaluate_metrics_oil_recovery_integration(microbial_oil_recovery, microbial_
             data[i, j, :] = [i() for i in br.model.metrics]
     return data
 
-def save_pickled_results(N, configurations=None, rule='L', optimize=True):
+def save_pickled_results(N, configurations=None, rule='L', optimize=True,
+                         export_excel=False):
     from warnings import filterwarnings
     filterwarnings('ignore', category=bst.exceptions.DesignWarning)
     filterwarnings('ignore', category=bst.exceptions.CostWarning)
@@ -170,14 +178,16 @@ def save_pickled_results(N, configurations=None, rule='L', optimize=True):
             file=autoload_file_name(name),
             safe=False
         )
-        br.model.table.to_excel(file)
+        save_table(br.model.table, file)
+        if export_excel: br.model.table.to_excel(file)
         br.model.table = br.model.table.dropna(how='all', axis=1)
         for i in br.model.metrics:
             if i.index not in br.model.table: br.model._metrics.remove(i)
         br.model.table = br.model.table.dropna(how='any', axis=0)
         rho, p = br.model.spearman_r()
         file = spearman_file(name)
-        rho.to_excel(file)
+        save_table(rho, file)
+        if export_excel: rho.to_excel(file)
 
 def run_uncertainty_and_sensitivity(name, N, rule='L',
                                     across_lines=False, 
@@ -188,12 +198,28 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
                                     autoload=True,
                                     optimize=True,
                                     N_coordinate=None,
+                                    processes=None,
+                                    export_excel=False,
+                                    warm_start=False,
+                                    deterministic=False,
                                     **kwargs):
     print(f"Running {name}!")
+    if processes and (across_lines or across_oil_content):
+        raise ValueError('only the Monte Carlo at the baseline feedstock '
+                         'can be evaluated in parallel')
+    if warm_start and deterministic:
+        raise ValueError('deterministic evaluations cannot be warm-started '
+                         'from the nearest sample')
     filterwarnings('ignore', category=bst.exceptions.DesignWarning)
     filterwarnings('ignore', category=bst.exceptions.CostWarning)
     br = cane.Biorefinery(name, **kwargs)
     br.model.retry_evaluation = True
+    if warm_start or deterministic:
+        if br.configuration.agile:
+            raise ValueError('agile biorefineries cannot be warm-started')
+        convergence_model = create_convergence_model(br, warm_start, deterministic)
+    else:
+        convergence_model = None
     file = monte_carlo_file(name, across_lines, across_oil_content)
     N_notify = min(int(N/10), 20)
     autosave = N_notify if autosave else False
@@ -222,6 +248,7 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
                 config = br_sugarcane if line == 'WT' else br
             else:
                 config = br
+            if config is not br: kwargs['convergence_model'] = None
             autoload_file = autoload_file_name(f"{name}_{config.feedstock_line}")
             config.model.evaluate(
                 autosave=autosave, 
@@ -232,15 +259,17 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
             if config is br_sugarcane:
                 br.model.table = br_sugarcane.model.table
             
-        br.model.evaluate_across_coordinate(
+        metric_data = br.model.evaluate_across_coordinate(
             name='Line',
             notify=int(N/10),
             f_coordinate=set_line,
             f_evaluate=evaluate,
             coordinate=df.index,
             notify_coordinate=True,
-            xlfile=file,
+            xlfile=file if export_excel else None,
+            convergence_model=convergence_model,
         )
+        save_coordinate_tables(metric_data, br.model.metrics, df.index, 'Line', file)
     elif across_oil_content:
         evaluate = None
         # Remove cane oil content setter and replace with ROI target setter
@@ -310,6 +339,7 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
                 if br.composition_specification.oil == 0.:
                     # Configurations 1 and 2 do not work at zero oil content, so gotta go with respective sugarcane configuration.
                     if br_sugarcane:
+                        kwargs['convergence_model'] = None
                         br_sugarcane.model.evaluate(
                             autosave=autosave, 
                             autoload=autoload,
@@ -370,15 +400,17 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
                 #     **kwargs,
                 # )
             
-        br.model.evaluate_across_coordinate(
+        metric_data = br.model.evaluate_across_coordinate(
             name='Oil content',
             notify=int(N/10),
             f_coordinate=br.composition_specification.load_oil_content,
             f_evaluate=evaluate,
             coordinate=coordinate,
             notify_coordinate=True,
-            xlfile=file,
+            xlfile=file if export_excel else None,
+            convergence_model=convergence_model,
         )
+        save_coordinate_tables(metric_data, br.model.metrics, coordinate, 'Oil content', file)
     else:
         autoload_file = autoload_file_name(name)
         np.random.seed(1)
@@ -386,14 +418,28 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
         br.model.load_samples(samples, optimize=optimize)
         success = False
         if not derivative: br.disable_derivative()
-        for i in range(3):
+        if processes:
+            if derivative and name not in ('O1', 'O2'): br.disable_derivative()
+            evaluate_samples_in_parallel(
+                name, samples, processes,
+                autosave=autosave,
+                autoload=autoload,
+                file=autoload_file,
+                warm_start=warm_start,
+                deterministic=deterministic,
+                **kwargs
+            )
+            if derivative: br.enable_derivative()
+            success = True
+        for i in range(0 if success else 3):
             try:
                 if derivative and name not in ('O1', 'O2'): br.disable_derivative()
                 br.model.evaluate(
                     notify=int(N/10),
                     autosave=autosave,
                     autoload=autoload,
-                    file=autoload_file
+                    file=autoload_file,
+                    convergence_model=convergence_model,
                 )
             except Exception as e:
                 raise e from None
@@ -404,16 +450,128 @@ def run_uncertainty_and_sensitivity(name, N, rule='L',
                 break
         if not success:
             raise RuntimeError('evaluation failed')
-        br.model.table.to_excel(file)
+        save_table(br.model.table, file)
+        if export_excel: br.model.table.to_excel(file)
         br.model.table = br.model.table.dropna(how='all', axis=1)
         for i in br.model.metrics:
             if i.index not in br.model.table: br.model._metrics.remove(i)
         br.model.table = br.model.table.dropna(how='any', axis=0)
         rho, p = br.model.spearman_r(filter='omit nan')
         file = spearman_file(name)
-        rho.to_excel(file)
+        save_table(rho, file)
+        if export_excel: rho.to_excel(file)
+    if warm_start and not processes:
+        print(f"Recycle iterations of {name}: {convergence_model.iteration_report()}")
 
 run = run_uncertainty_and_sensitivity
+
+# Baseline warm start of each biorefinery, shared by serial and parallel
+# deterministic evaluations
+baseline_warm_starts = {}
+
+def create_convergence_model(br, warm_start=False, deterministic=False):
+    """
+    Return the convergence model of the biorefinery's Monte Carlo: a
+    BaselineWarmStart if `deterministic` (results do not depend on the
+    order of evaluation; created once per biorefinery), a RecycleDataCache
+    if `warm_start` (warm-started from the nearest sample), or None.
+    
+    """
+    if deterministic:
+        if br in baseline_warm_starts: return baseline_warm_starts[br]
+        baseline_warm_starts[br] = warm_start = cane.BaselineWarmStart(br.sys)
+        return warm_start
+    elif warm_start:
+        return cane.RecycleDataCache(br.sys, br.model.parameters, feedstock=br.feedstock)
+
+# Biorefinery and convergence model of each worker process, created once by 
+# the pool initializer (or inherited from the parent process when forked)
+_worker_biorefinery = _worker_convergence_model = None
+
+def _initialize_worker(name, defaults, kwargs, warm_start):
+    global _worker_biorefinery, _worker_convergence_model
+    filterwarnings('ignore', category=bst.exceptions.DesignWarning)
+    filterwarnings('ignore', category=bst.exceptions.CostWarning)
+    for i, j in defaults.items(): setattr(cane.Biorefinery, i, j)
+    _worker_biorefinery = br = cane.Biorefinery(name, **kwargs)
+    br.model.retry_evaluation = True
+    _worker_convergence_model = create_convergence_model(br, warm_start)
+    
+def _evaluate_shard(samples, autosave, autoload, file):
+    model = _worker_biorefinery.model
+    model.load_samples(samples)
+    model.evaluate(autosave=autosave, autoload=autoload, file=file,
+                   convergence_model=_worker_convergence_model)
+    return model.table[[i.index for i in model.metrics]].values
+
+def evaluate_samples_in_parallel(name, samples, processes, shards=None, 
+                                 autosave=False, autoload=False, file=None, 
+                                 warm_start=False, deterministic=False,
+                                 **kwargs):
+    """
+    Evaluate the Monte Carlo samples of a biorefinery configuration over a 
+    process pool and save the results to the model table in the original 
+    sample order.
+    
+    Each worker process creates its own biorefinery once (passing any 
+    `kwargs`) and evaluates contiguous shards of the samples. If a `file` is 
+    given, the pickled results of each shard are autosaved/autoloaded to/from 
+    its own file (i.e., `file` with a shard suffix), so an interrupted run 
+    picks up where each shard stopped.
+    
+    By default, each worker simulates from the last state it converged 
+    (as in a serial evaluation without a convergence model), so results 
+    depend on the shard boundaries and only agree with a serial evaluation 
+    to the convergence tolerance of recycle loops. Each worker warm-starts 
+    its simulations from the nearest sample it evaluated if `warm_start` is 
+    True (results also agree to the convergence tolerance). If 
+    `deterministic` is True, every simulation starts from the converged 
+    baseline state of the biorefinery in this process (i.e., 
+    `create_convergence_model(br, deterministic=True)`; see 
+    :class:`~biorefineries.cane.BaselineWarmStart`), so results agree with a 
+    serial evaluation from the same baseline to round-off (but are not 
+    bit-for-bit identical). In this case, workers are forked from this 
+    process to share the baseline (not available in Windows).
+    
+    """
+    global _worker_biorefinery, _worker_convergence_model
+    br = cane.Biorefinery(name, **kwargs)
+    model = br.model
+    model.load_samples(samples) # Results are saved to the table of these samples
+    N_samples = len(samples)
+    if shards is None: shards = processes
+    index = np.array_split(np.arange(N_samples), min(shards, N_samples))
+    N_shards = len(index)
+    if file is None:
+        files = [None] * N_shards
+    else:
+        files = [f"{file}_shard_{i}_of_{N_shards}" for i in range(N_shards)]
+    defaults = {
+        i: j for i, j in cane.Biorefinery.__dict__.items()
+        if i.startswith('default_') or i == '_derivative_disabled'
+    }
+    if deterministic:
+        if 'fork' not in mp.get_all_start_methods():
+            raise RuntimeError('deterministic parallel evaluations require '
+                               'forking worker processes')
+        _worker_biorefinery = br
+        _worker_convergence_model = create_convergence_model(br, deterministic=True)
+        pool_kwargs = dict(mp_context=mp.get_context('fork'))
+    else:
+        pool_kwargs = dict(initializer=_initialize_worker,
+                           initargs=(name, defaults, kwargs, warm_start))
+    try:
+        with ProcessPoolExecutor(processes, **pool_kwargs) as executor:
+            futures = [
+                executor.submit(_evaluate_shard, samples[i], autosave, autoload, j)
+                for i, j in zip(index, files)
+            ]
+            values = np.vstack([i.result() for i in futures])
+    finally:
+        _worker_biorefinery = _worker_convergence_model = None
+    model.table[[i.index for i in model.metrics]] = values
+    return model.table
+
     
 def run_all(N, across_lines=False, rule='L', configurations=None,
             filter=None,**kwargs):
@@ -483,10 +641,7 @@ def save_target_biomass_yield(configuration='O7'):
     br = cane.Biorefinery(configuration, simulate=False)
     br.set_cane_oil_content.setter(10)
     file = monte_carlo_file(configuration, across_lines=False, across_oil_content='oilcane vs sugarcane')
-    CBY_df = pd.read_excel(
-        file, 
-        sheet_name=cane.competitive_biomass_yield.short_description,
-        index_col=0)
+    CBY_df = load_coordinate_table(file, cane.competitive_biomass_yield)
     CBY_df = CBY_df.dropna()
     oil_content = np.array(CBY_df.columns) * 100
     q100 = np.percentile(CBY_df, 100, axis=0)
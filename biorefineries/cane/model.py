@@ -0,0 +1,707 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+"""
+import biosteam as bst
+import numpy as np
+from collections import OrderedDict
+from scipy.spatial import cKDTree
+from time import perf_counter
+from biosteam._system import SystemSpecification
+from .snapshot import BiorefinerySnapshot
+
+__all__ = (
+    'cost_parameter_mask',
+    'sort_cost_only_samples',
+    'get_recycle_iterations',
+    'CostAwareModel',
+    'RecycleDataCache',
+    'BaselineWarmStart',
+    'PerturbationEngine',
+)
+
+def cost_parameter_mask(parameters):
+    """
+    Return a boolean array which is True for parameters that only affect
+    TEA/LCA results (i.e., `kind='cost'`). All other parameters (including
+    untagged ones) are assumed to affect mass and energy balances.
+
+    """
+    return np.array([i.kind == 'cost' for i in parameters], bool)
+
+def sort_cost_only_samples(samples, parameters):
+    """
+    Return the order in which to evaluate samples so that samples which share
+    mass balance parameters (and only differ in cost parameters) are evaluated
+    consecutively. The original order of first appearance is otherwise kept.
+
+    """
+    samples = np.asarray(samples)
+    N_samples = samples.shape[0]
+    if N_samples < 2: return np.arange(N_samples)
+    mass_balance = samples[:, ~cost_parameter_mask(parameters)]
+    if not mass_balance.shape[1]: return np.arange(N_samples)
+    _, first, groups = np.unique(
+        mass_balance, axis=0, return_index=True, return_inverse=True
+    )
+    groups = groups.ravel()
+    return np.lexsort([np.arange(N_samples), first[groups]])
+
+def get_recycle_iterations(system):
+    """
+    Return the number of iterations of the last convergence of the system
+    and all its subsystems.
+    
+    """
+    return system._iter + sum([get_recycle_iterations(i) for i in system.subsystems])
+
+class CostAwareModel(bst.Model):
+    """
+    Create a Model object that skips system simulation when only cost
+    parameters (i.e., `kind='cost'`) changed since the last sample. In such
+    case, only the setters of the cost parameters are called (all of them,
+    in order, as they may depend on each other) and metrics are computed from the last simulated state (utility costs are
+    reloaded to account for changes in utility prices). Agile systems are
+    always simulated because their operation mode results are only
+    updated on simulation.
+
+    Parameters
+    ----------
+    reuse_condition : Callable, optional
+        Should return whether the last simulated state can be reused. For
+        example, the state cannot be reused if metrics modify the system.
+        Defaults to always reusing.
+    perturbation_engine : PerturbationEngine, optional
+        Perturbations evaluated by metrics. Values at perturbed states are
+        forgotten at each sample (perturbed states are reused when the
+        simulation is skipped).
+
+    Other parameters are passed to :class:`biosteam.Model`.
+
+    Notes
+    -----
+    The last sample is forgotten at the start of each :meth:`evaluate` call,
+    when the system is reset, and when :meth:`forget_last_sample` is called.
+    Call :meth:`forget_last_sample` whenever the system is changed outside
+    of the model parameters.
+
+    """
+    __slots__ = ('reuse_condition', 'perturbation_engine', 'simulations',
+                 'simulations_avoided', '_last_sample', '_cost_mask')
+
+    def __init__(self, *args, reuse_condition=None, perturbation_engine=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reuse_condition = reuse_condition
+        self.perturbation_engine = perturbation_engine
+        self.simulations = 0
+        self.simulations_avoided = 0
+        self._last_sample = None
+        self._cost_mask = None
+
+    def copy(self):
+        copy = super().copy()
+        copy.reuse_condition = self.reuse_condition
+        copy.perturbation_engine = self.perturbation_engine
+        copy.simulations = copy.simulations_avoided = 0
+        copy._last_sample = copy._cost_mask = None
+        return copy
+
+    def _erase(self):
+        super()._erase()
+        self._last_sample = self._cost_mask = None
+
+    @property
+    def cost_mask(self):
+        """[1d array] Whether each parameter is a cost parameter."""
+        cost_mask = self._cost_mask
+        parameters = self._parameters
+        if cost_mask is None or cost_mask.size != len(parameters):
+            self._cost_mask = cost_mask = cost_parameter_mask(parameters)
+        return cost_mask
+
+    def forget_last_sample(self):
+        """Forget last sample so that the next evaluation simulates the system."""
+        self._last_sample = None
+
+    def reset_counters(self):
+        """Reset the number of simulations performed and avoided."""
+        self.simulations = self.simulations_avoided = 0
+
+    def simulation_report(self):
+        """Return a dictionary with the number of simulations performed and avoided."""
+        simulations = self.simulations
+        avoided = self.simulations_avoided
+        total = simulations + avoided
+        return {
+            'Simulations': simulations,
+            'Simulations avoided': avoided,
+            'Fraction avoided': avoided / total if total else 0.,
+        }
+
+    def load_samples(self, samples=None, optimize=None, *args, **kwargs):
+        """
+        Load samples for evaluation. Samples that only differ in cost
+        parameters are always evaluated consecutively. See
+        :meth:`biosteam.Model.load_samples` for more details.
+
+        """
+        super().load_samples(samples, optimize, *args, **kwargs)
+        index = sort_cost_only_samples(self._samples, self._parameters)
+        self._index = index.tolist()
+
+    def evaluate(self, *args, **kwargs):
+        self._last_sample = None
+        return super().evaluate(*args, **kwargs)
+
+    evaluate.__doc__ = bst.Model.evaluate.__doc__
+
+    def _update_state(self, sample, convergence_model=None, **kwargs):
+        sample = np.array(sample, float)
+        last_sample = self._last_sample
+        self._last_sample = None # In case setters or simulation fail
+        perturbation_engine = self.perturbation_engine
+        if perturbation_engine is not None: perturbation_engine.forget_results()
+        reuse_condition = self.reuse_condition
+        system = self._system
+        if isinstance(convergence_model, BaselineWarmStart):
+            convergence_model.restore()
+            last_sample = None
+        if (last_sample is None
+            or isinstance(system, bst.AgileSystem)
+            or not (reuse_condition is None or reuse_condition())):
+            value = super()._update_state(sample, convergence_model, **kwargs)
+            self.simulations += 1
+        else:
+            changed = sample != last_sample
+            if changed[~self.cost_mask].any():
+                value = super()._update_state(sample, convergence_model, **kwargs)
+                self.simulations += 1
+            else:
+                # Cost setters may depend on other cost parameters (e.g., prices correlated to crude oil)
+                for f, s, x in zip(self._parameters, sample, self.cost_mask):
+                    if x: f.setter(s if f.scale is None else f.scale * s)
+                for i in system.cost_units: i._load_utility_cost()
+                value = None
+                self.simulations_avoided += 1
+        self._last_sample = sample
+        return value
+
+    def _reset_system(self):
+        self._last_sample = None
+        super()._reset_system()
+
+
+class RecycleDataCache:
+    """
+    Create a RecycleDataCache object that keeps the converged recycle data of
+    the last evaluated samples (up to `maxsize`, least recently used are
+    dropped first) and warm-starts the system from the converged recycle data
+    of the nearest sample before each simulation. It can be passed as the
+    `convergence_model` of :meth:`biosteam.Model.evaluate` and
+    :meth:`biosteam.Model.evaluate_across_coordinate`.
+    
+    Parameters
+    ----------
+    system : System
+        System to warm-start.
+    parameters : list[Parameter], optional
+        Parameters of the samples. If given, samples are normalized by the
+        parameter bounds and cost parameters are ignored when looking for
+        the nearest sample.
+    maxsize : int, optional
+        Maximum number of converged recycle data kept. Defaults to 128.
+    feedstock : Stream, optional
+        If given, recycle flow rates are rescaled by the ratio of the current
+        to the stored feedstock flow rate. This keeps recycle flow rates
+        consistent with specifications that rescale the system
+        (e.g., :meth:`biosteam.System.rescale`).
+    
+    Examples
+    --------
+    >>> from biorefineries import cane
+    >>> br = cane.Biorefinery('S1')
+    >>> cache = cane.RecycleDataCache(br.sys, br.model.parameters, feedstock=br.feedstock)
+    >>> br.model.load_samples(br.model.sample(10, rule='L'))
+    >>> br.model.evaluate(convergence_model=cache)
+    >>> cache.iteration_report() # doctest: +SKIP
+    {'Simulations': 10, 'Warm starts': 9, 'Mean iterations': ..., ...}
+    
+    """
+    __slots__ = ('system', 'maxsize', 'feedstock', 'iterations', 'warm_started',
+                 '_mask', '_lb', '_scale', '_entries', '_tree', '_keys',
+                 '_key', '_sample', '_warm_start')
+    
+    def __init__(self, system, parameters=None, maxsize=128, feedstock=None):
+        self.system = system
+        self.maxsize = maxsize
+        self.feedstock = feedstock
+        if parameters:
+            self._mask = mask = ~cost_parameter_mask(parameters)
+            lb, ub = np.array([i.bounds for i in parameters], float)[mask].T
+            diff = ub - lb
+            diff[diff == 0] = 1.
+            self._lb = lb
+            self._scale = 1. / diff
+        else:
+            self._mask = self._lb = self._scale = None
+        self.clear()
+    
+    def clear(self):
+        """Clear all converged recycle data and iteration counts."""
+        self._entries = OrderedDict()
+        self._tree = self._keys = self._sample = None
+        self._key = 0
+        self._warm_start = False
+        self.iterations = []
+        self.warm_started = []
+    
+    def normalize_sample(self, sample):
+        sample = np.asarray(sample, float)
+        mask = self._mask
+        if mask is None: return sample
+        return (sample[mask] - self._lb) * self._scale
+    
+    def nearest(self, sample):
+        """
+        Return the converged recycle data and feedstock flow rate of the
+        nearest sample (or None if empty).
+        
+        """
+        entries = self._entries
+        if not entries: return None
+        if self._tree is None:
+            self._keys = keys = list(entries)
+            self._tree = cKDTree(np.array([entries[i][0] for i in keys]))
+        distance, index = self._tree.query(self.normalize_sample(sample))
+        key = self._keys[index]
+        entries.move_to_end(key)
+        return entries[key][1:]
+    
+    def practice(self, sample):
+        """
+        Warm-start the system from the nearest converged sample and store the
+        converged recycle data after simulation. Must be used in a
+        with-statement containing the simulation.
+        
+        """
+        self._sample = sample
+        return self
+    
+    def __enter__(self):
+        nearest = self.nearest(self._sample)
+        if nearest is None:
+            self._warm_start = False
+        else:
+            recycle_data, F_mass = nearest
+            recycle_data.reset()
+            if F_mass:
+                ratio = self.feedstock.F_mass / F_mass
+                for i in recycle_data.recycle_data: i.recycle.rescale(ratio)
+            self._warm_start = True
+        return self
+    
+    def __exit__(self, type, exception, traceback):
+        if exception is not None: return
+        system = self.system
+        self.iterations.append(get_recycle_iterations(system))
+        self.warm_started.append(self._warm_start)
+        entries = self._entries
+        entries[self._key] = (
+            self.normalize_sample(self._sample),
+            system.get_recycle_data(),
+            None if self.feedstock is None else self.feedstock.F_mass,
+        )
+        self._key += 1
+        if len(entries) > self.maxsize: entries.popitem(last=False)
+        self._tree = self._keys = None
+    
+    def iteration_report(self):
+        """Return a dictionary with the number of simulations, warm starts, and mean iterations."""
+        iterations = np.array(self.iterations, float)
+        warm_started = np.array(self.warm_started, bool)
+        mean = lambda x: x.mean() if x.size else np.nan
+        return {
+            'Simulations': iterations.size,
+            'Warm starts': int(warm_started.sum()),
+            'Mean iterations': mean(iterations),
+            'Mean iterations (warm start)': mean(iterations[warm_started]),
+            'Mean iterations (cold start)': mean(iterations[~warm_started]),
+        }
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.system}, maxsize={self.maxsize})"
+
+
+def get_numerical_attributes(obj):
+    """
+    Return a dictionary of copies of the numerical attributes (including
+    booleans and arrays) of an object by name.
+    
+    """
+    names = [*getattr(obj, '__dict__', ())]
+    for cls in type(obj).__mro__: 
+        slots = getattr(cls, '__slots__', ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    attributes = {}
+    for name in names:
+        try: value = getattr(obj, name)
+        except AttributeError: continue
+        if isinstance(value, np.ndarray): attributes[name] = value.copy()
+        elif isinstance(value, (float, int)): attributes[name] = value # Includes booleans
+    return attributes
+
+
+class OrderedSet(dict):
+    """Set of objects iterated in order of insertion."""
+    __slots__ = ()
+    
+    def add(self, obj):
+        self[obj] = None
+
+
+class BaselineWarmStart:
+    """
+    Create a BaselineWarmStart object that stores the converged state of a
+    system (all stream data and the numerical attributes of unit operations
+    and the TEA object, such as solver guesses) and restores it before each
+    sample, so that results do not depend on the order of evaluation (e.g.,
+    on how samples are sharded across processes). It can be passed as the 
+    `convergence_model` of :meth:`CostAwareModel.evaluate`.
+    
+    Parameters
+    ----------
+    system : System
+        Converged system.
+    
+    Notes
+    -----
+    The state must be restored before parameter setters are called, which
+    is done by :class:`CostAwareModel` (the `practice` context of convergence
+    models is only entered after parameter setters are called). Utilities of 
+    facilities (e.g., steam utilities of boilers) are iterated in order of 
+    insertion instead of by memory address so that they are always summed 
+    in the same order.
+    
+    Results are reproducible to round-off (relative differences of about 
+    1e-10), but not bit-for-bit, as biosteam also iterates other sets of 
+    objects (e.g., unit operations with costs) by memory address.
+    
+    Examples
+    --------
+    >>> from biorefineries import cane
+    >>> br = cane.Biorefinery('S1')
+    >>> warm_start = cane.BaselineWarmStart(br.sys)
+    >>> br.model.load_samples(br.model.sample(10, rule='L'))
+    >>> br.model.evaluate(convergence_model=warm_start) # doctest: +SKIP
+    
+    """
+    __slots__ = ('system', 'snapshot', 'attributes')
+    
+    def __init__(self, system):
+        self.system = system
+        self.snapshot = BiorefinerySnapshot(None, system)
+        for unit in system.units:
+            for name, value in tuple(unit.__dict__.items()): 
+                if name.endswith('utilities') and isinstance(value, set): # Facilities
+                    setattr(unit, name, OrderedSet.fromkeys(value))
+        objects = list(system.units)
+        if system.TEA is not None: objects.append(system.TEA)
+        self.attributes = {i: get_numerical_attributes(i) for i in objects}
+        
+    def restore(self):
+        """Restore the stored state of the system."""
+        system = self.system
+        system.reset_cache()
+        self.snapshot.restore(system)
+        for obj, attributes in self.attributes.items():
+            for name, stored in attributes.items():
+                if isinstance(stored, np.ndarray):
+                    value = getattr(obj, name, None)
+                    if isinstance(value, np.ndarray) and value.shape == stored.shape:
+                        value[...] = stored # Arrays may be shared (e.g., split)
+                    else:
+                        setattr(obj, name, stored.copy())
+                else:
+                    setattr(obj, name, stored)
+    
+    def practice(self, sample):
+        return self
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, type, exception, traceback):
+        pass
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.system})"
+
+
+class Perturbation:
+    __slots__ = ('name', 'apply', 'revert', 'getters', 'active')
+    
+    def __init__(self, name, apply, revert, getters, active=None):
+        self.name = name
+        self.apply = apply
+        self.revert = revert
+        self.getters = getters
+        self.active = active
+        
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, getters={list(self.getters)})"
+    
+
+class PerturbationEngine:
+    """
+    Create a PerturbationEngine object that evaluates all perturbations of a 
+    system (e.g., for finite-difference derivatives) together the first time
+    any perturbed value is requested after each sample. Each perturbation is
+    warm-started from the base converged state (with recycle flow rates 
+    rescaled by the change in feedstock flow rate) and simulated with a 
+    tighter recycle tolerance. The base state (stream data and unit results) is restored 
+    afterwards without simulation.
+    
+    Perturbed states are kept until the system is simulated again, so that
+    samples which only change cost parameters (i.e., the mass balance is 
+    unchanged) reuse the perturbed unit design and cost results and only 
+    recompute TEA/LCA values.
+    
+    Parameters
+    ----------
+    system : System|AgileSystem
+        System to perturb. Agile systems are simulated at each perturbation
+        and their base state is not restored (operation mode results are 
+        only updated on simulation).
+    feedstock : Stream, optional
+        If given, recycle flow rates of the base state are rescaled by the 
+        ratio of the perturbed to the base feedstock flow rate before 
+        simulating each perturbation.
+    tolerance_factor : float, optional
+        Factor to multiply the molar tolerances of the system (and 
+        subsystems) by while simulating perturbations. Defaults to 0.1.
+    
+    Examples
+    --------
+    >>> from biorefineries import cane
+    >>> br = cane.Biorefinery('O3') # doctest: +SKIP
+    >>> br.model.evaluate() # doctest: +SKIP
+    >>> br.perturbation_engine.report() # doctest: +SKIP
+    {'Evaluations': 10, 'Simulations': 20, ...}
+    
+    """
+    __slots__ = ('system', 'feedstock', 'tolerance_factor', 'perturbations',
+                 'results', 'records', '_states', '_simulating')
+    
+    def __init__(self, system, feedstock=None, tolerance_factor=0.1):
+        self.system = system
+        self.feedstock = feedstock
+        self.tolerance_factor = tolerance_factor
+        #: dict[str, Perturbation] Perturbations by name.
+        self.perturbations = {}
+        #: dict[str, dict[str, float]]|None Values at each perturbed state 
+        #: (None if not evaluated at the current sample).
+        self.results = None
+        #: list[dict] Time, simulations, and recycle iterations of each 
+        #: perturbation at each evaluation.
+        self.records = []
+        self._states = {}
+        self._simulating = False
+        if self.stateful:
+            # Specifications run at the start of every simulation
+            specifications = system.specifications
+            if specifications:
+                specifications.insert(0, SystemSpecification(self._new_simulation, ()))
+            else:
+                system.add_specification(self._new_simulation, simulate=True)
+    
+    @property
+    def stateful(self):
+        """[bool] Whether the base state can be restored without simulation."""
+        return isinstance(self.system, bst.System)
+    
+    def _new_simulation(self):
+        if self._simulating: return
+        self.results = None
+        self._states.clear()
+    
+    def forget_results(self):
+        """
+        Forget values at perturbed states (but keep perturbed states) so 
+        that perturbations are evaluated again at the next request. Should
+        be called at each new sample.
+        
+        """
+        self.results = None
+    
+    def perturbation(self, name, apply, revert, getters, active=None):
+        """
+        Register a perturbation.
+        
+        Parameters
+        ----------
+        name : str
+            Name of perturbation.
+        apply : Callable
+            Should perturb the system given no parameters.
+        revert : Callable
+            Should revert the perturbation given no parameters.
+        getters : dict[str, Callable]
+            Functions that return the values required at the perturbed state
+            by name.
+        active : Callable, optional
+            Should return whether the perturbation is required at the 
+            current sample. Defaults to always required.
+        
+        """
+        self.perturbations[name] = Perturbation(name, apply, revert, getters, active)
+    
+    def get(self, name, value):
+        """
+        Return a value (by name) at the perturbed state (by perturbation name).
+        All required perturbations are evaluated at the first request of each
+        sample.
+        
+        """
+        if self.results is None: self.evaluate()
+        return self.results[name][value]
+    
+    def _get_systems(self, system):
+        systems = [system]
+        for i in system.subsystems: systems.extend(self._get_systems(i))
+        return systems
+    
+    def _get_state(self):
+        system = self.system
+        return (
+            [(i, i.get_data()) for i in system.streams],
+            [(i, dict(i.design_results), dict(i.baseline_purchase_costs),
+              dict(i.purchase_costs), dict(i.installed_costs),
+              [j.copy() for j in i.heat_utilities],
+              i.power_utility.consumption, i.power_utility.production)
+             for i in system.cost_units]
+        )
+    
+    def _set_state(self, state):
+        streams, units = state
+        for stream, data in streams: stream.set_data(data)
+        for unit, *results, heat_utilities, consumption, production in units:
+            for i, j in zip((unit.design_results, unit.baseline_purchase_costs,
+                             unit.purchase_costs, unit.installed_costs), results):
+                i.clear()
+                i.update(j)
+            unit.heat_utilities = [i.copy() for i in heat_utilities]
+            power_utility = unit.power_utility
+            power_utility.consumption = consumption
+            power_utility.production = production
+            unit._load_utility_cost()
+    
+    def _simulate(self, base, feedstock_flow):
+        system = self.system
+        feedstock = self.feedstock
+        streams, units = base
+        ratio = feedstock.F_mass / feedstock_flow if feedstock_flow else 1.
+        recycles = set(system.get_all_recycles())
+        for stream, data in streams: # Other streams may share data with perturbed feeds
+            if stream not in recycles: continue
+            stream.set_data(data)
+            if ratio != 1.: stream.imol.data[:] *= ratio
+        systems = self._get_systems(system)
+        tolerances = [(i.molar_tolerance, i.relative_molar_tolerance) for i in systems]
+        factor = self.tolerance_factor
+        try:
+            for i, (mol, rmol) in zip(systems, tolerances):
+                i.molar_tolerance = mol * factor
+                i.relative_molar_tolerance = rmol * factor
+            system.simulate()
+        finally:
+            for i, (mol, rmol) in zip(systems, tolerances):
+                i.molar_tolerance = mol
+                i.relative_molar_tolerance = rmol
+        return get_recycle_iterations(system)
+    
+    def evaluate(self):
+        """Simulate all required perturbations and save the values at each perturbed state."""
+        stateful = self.stateful
+        states = self._states
+        system = self.system
+        results = {}
+        record = {}
+        self.results = None
+        base = self._get_state() if stateful else None
+        feedstock = self.feedstock
+        feedstock_flow = None if feedstock is None else feedstock.F_mass
+        self._simulating = True
+        try:
+            for name, perturbation in self.perturbations.items():
+                active = perturbation.active
+                if active is not None and not active(): continue
+                time = perf_counter()
+                perturbation.apply()
+                try:
+                    if not stateful:
+                        system.simulate()
+                        simulated = True
+                        iterations = 0
+                    elif name in states:
+                        self._set_state(states[name])
+                        simulated = False
+                        iterations = 0
+                    else:
+                        iterations = self._simulate(base, feedstock_flow)
+                        states[name] = self._get_state()
+                        simulated = True
+                    results[name] = {i: f() for i, f in perturbation.getters.items()}
+                finally:
+                    perturbation.revert()
+                    if stateful: self._set_state(base)
+                record[name] = {
+                    'Time [s]': perf_counter() - time,
+                    'Simulated': simulated,
+                    'Recycle iterations': iterations,
+                    'Values': len(perturbation.getters),
+                }
+        finally:
+            self._simulating = False
+        self.records.append(record)
+        self.results = results
+        
+    def report(self):
+        """
+        Return a dictionary summarizing the simulations (and reused perturbed 
+        states) and the time per value computed at perturbed states 
+        (i.e., the cost of each derivative) by perturbation.
+        
+        """
+        records = self.records
+        by_perturbation = {}
+        for record in records:
+            for name, i in record.items():
+                if name in by_perturbation:
+                    summary = by_perturbation[name]
+                else:
+                    by_perturbation[name] = summary = {
+                        'Evaluations': 0, 'Simulations': 0, 'Recycle iterations': 0,
+                        'Time [s]': 0., 'Values': 0,
+                    }
+                summary['Evaluations'] += 1
+                summary['Simulations'] += i['Simulated']
+                summary['Recycle iterations'] += i['Recycle iterations']
+                summary['Time [s]'] += i['Time [s]']
+                summary['Values'] += i['Values']
+        for summary in by_perturbation.values():
+            values = summary.pop('Values')
+            summary['Time per value [s]'] = summary['Time [s]'] / values if values else 0.
+        return {
+            'Evaluations': len(records),
+            'Simulations': sum([i['Simulations'] for i in by_perturbation.values()]),
+            'Time [s]': sum([i['Time [s]'] for i in by_perturbation.values()]),
+            'By perturbation': by_perturbation,
+        }
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.system}, perturbations={list(self.perturbations)})"
@@ -9,6 +9,7 @@ from .parse_configuration import parse_configuration, Configuration, Configurati
 from warnings import warn
 from thermosteam.utils import roundsigfigs
 import os
+import json
 import pandas as pd
 import numpy as np
 import biosteam as bst
@@ -19,6 +20,11 @@ __all__ = (
     'spearman_file',
     'monte_carlo_file',
     'autoload_file_name',
+    'binary_file',
+    'save_table',
+    'load_table',
+    'save_coordinate_tables',
+    'load_coordinate_table',
     'get_monte_carlo_across_oil_content',
     'get_monte_carlo',
     'get_line_monte_carlo',
@@ -38,7 +44,7 @@ __all__ = (
 results_folder = os.path.join(os.path.dirname(__file__), 'results')
 images_folder = os.path.join(os.path.dirname(__file__), 'images')
 
-# %% Load simulation data
+# %% Results files
 
 def spearman_file(name):
     number, agile, line, case = parse_configuration(name)
@@ -79,14 +85,103 @@ def autoload_file_name(name):
     if case: filename += '_' + case
     return os.path.join(results_folder, filename)
 
+# %% Binary results store
+# Tables are saved as memory-mappable .npy files (with the same name as the 
+# Excel file) and their labels as .json index files, so that only the columns
+# (or metrics) of interest are read from disk. Excel files are only 
+# an optional export and are only read if no binary file is found.
+
+def binary_file(file):
+    return os.path.splitext(file)[0] + '.npy'
+
+def _index_file(file):
+    return os.path.splitext(file)[0] + '.json'
+
+def _dump_index(index):
+    return {
+        'names': list(index.names),
+        'values': [list(i) if isinstance(i, tuple) else i for i in index.tolist()],
+    }
+
+def _load_index(dct):
+    values = dct['values']
+    names = dct['names']
+    if len(names) > 1:
+        return pd.MultiIndex.from_tuples([tuple(i) for i in values], names=names)
+    else:
+        return pd.Index(values, name=names[0])
+
+def save_table(table, file):
+    """
+    Save a table of floats as a column-major .npy file (so that each column
+    is contiguous on disk) along with a .json file of its row and column labels.
+    `file` may have any extension (e.g., the one of the Excel file).
+    """
+    np.save(binary_file(file), np.asfortranarray(table.values, dtype=float))
+    with open(_index_file(file), 'w') as f:
+        json.dump(
+            {'index': _dump_index(table.index), 
+             'columns': _dump_index(table.columns)}, f
+        )
+
+def load_table(file, columns=None, **excel_kwargs):
+    """
+    Load a table saved by `save_table`, only reading the given columns from
+    the memory-mapped file. If no binary file is found, the table is read 
+    from the Excel `file` (passing any `excel_kwargs`).
+    """
+    npfile = binary_file(file)
+    if not os.path.exists(npfile):
+        df = pd.read_excel(file, **excel_kwargs)
+        return df if columns is None else df[columns]
+    with open(_index_file(file)) as f: labels = json.load(f)
+    index = _load_index(labels['index'])
+    all_columns = _load_index(labels['columns'])
+    data = np.load(npfile, mmap_mode='r')
+    if columns is None:
+        return pd.DataFrame(np.array(data), index=index, columns=all_columns)
+    columns = pd.Index(columns) if isinstance(columns, list) else columns
+    positions = all_columns.get_indexer(columns)
+    if (positions == -1).any(): 
+        raise KeyError(f'{list(columns[positions == -1])} not in table')
+    return pd.DataFrame(data[:, positions], index=index, columns=all_columns[positions])
+
+def save_coordinate_tables(metric_data, metrics, coordinate, name, file):
+    """
+    Save the metric tables from `biosteam.Model.evaluate_across_coordinate`
+    as a single .npy file (metric by sample by coordinate) along with 
+    a .json file of the metric descriptions and coordinate values.
+    """
+    data = np.array([metric_data[i.index] for i in metrics], dtype=float)
+    np.save(binary_file(file), data)
+    with open(_index_file(file), 'w') as f:
+        json.dump(
+            {'metrics': [i.short_description for i in metrics],
+             'coordinate': _dump_index(pd.Index(coordinate, name=name))}, f
+        )
+
+def load_coordinate_table(file, metric):
+    """
+    Load the table (sample by coordinate) of a metric saved by 
+    `save_coordinate_tables`, only reading the given metric from the 
+    memory-mapped file. If no binary file is found, the table is read from
+    the respective sheet of the Excel `file`.
+    """
+    sheet_name = metric if isinstance(metric, str) else metric.short_description
+    npfile = binary_file(file)
+    if not os.path.exists(npfile):
+        return pd.read_excel(file, sheet_name=sheet_name, index_col=0)
+    with open(_index_file(file)) as f: labels = json.load(f)
+    data = np.load(npfile, mmap_mode='r')
+    index = labels['metrics'].index(sheet_name)
+    return pd.DataFrame(np.array(data[index]), columns=_load_index(labels['coordinate']))
+
+# %% Load simulation data
+
 def get_monte_carlo_across_oil_content(name, metric, derivative=False):
     key = parse_configuration(name)
     if isinstance(key, Configuration):
-        df = pd.read_excel(
-            monte_carlo_file(key, True),
-            sheet_name=metric if isinstance(metric, str) else metric.short_description,
-            index_col=0
-        )
+        df = load_coordinate_table(monte_carlo_file(key, True), metric)
     elif isinstance(key, ConfigurationComparison):
         df = (
             get_monte_carlo_across_oil_content(key.a, metric)
@@ -113,7 +208,7 @@ def get_line_monte_carlo(line, name, feature, cache={}):
             df = cache[key]
         else:
             file = monte_carlo_file(configuration, across_lines=True)
-            cache[key] = df = pd.read_excel(file, header=[0], index_col=[0], sheet_name=feature.short_description)
+            cache[key] = df = load_coordinate_table(file, feature)
             df.columns = [str(i) for i in df.columns]
         mc = df[line]
     elif isinstance(configuration, ConfigurationComparison):
@@ -129,30 +224,24 @@ def get_monte_carlo(name, features=None, cache={}):
     key = parse_configuration(name)
     index = tuple([i.index for i in features])
     if isinstance(key, Configuration):
-        if key in cache:
-            df = cache[key]
+        if (subkey:=(key, index)) in cache:
+            df = cache[subkey]
         elif key.line:
-            if (subkey:=(key, index)) in cache:
-                df = cache[subkey]
-            else:
-                file = monte_carlo_file(key, across_lines=True)
-                line = key.line
-                data = np.hstack([
-                    pd.read_excel(
-                        file, header=[0, 1], index_col=[0], sheet_name=i.short_description
-                    )[line].values
-                    for i in features
-                ])
-                cache[subkey] = df = pd.DataFrame(
-                    data, 
-                    columns=pd.MultiIndex.from_tuples(
-                        index, names=['Element', 'Name']
-                    )
+            file = monte_carlo_file(key, across_lines=True)
+            line = key.line
+            data = np.array([
+                load_coordinate_table(file, i)[line].values
+                for i in features
+            ]).transpose()
+            cache[subkey] = df = pd.DataFrame(
+                data, 
+                columns=pd.MultiIndex.from_tuples(
+                    index, names=['Element', 'Name']
                 )
+            )
         else:
             file = monte_carlo_file(key, features)
-            cache[key] = df = pd.read_excel(file, header=[0, 1], index_col=[0])
-            df = df[index]
+            cache[subkey] = df = load_table(file, list(index), header=[0, 1], index_col=[0])
     elif isinstance(key, ConfigurationComparison):
         df_a = get_monte_carlo(key.a, features)
         df_b = get_monte_carlo(key.b, features)
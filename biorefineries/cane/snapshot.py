@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Snapshots of converged biorefinery systems saved to disk, so that new
+processes (e.g., workers of parallel evaluations) can warm-start a
+configuration instead of converging it from empty recycles.
+
+"""
+import os
+import pickle
+import hashlib
+import numpy as np
+import biosteam as bst
+import thermosteam as tmo
+import biorefineries
+
+__all__ = (
+    'get_snapshot_versions',
+    'get_stream_key',
+    'get_snapshot_file',
+    'BiorefinerySnapshot',
+)
+
+#: Version of the snapshot format (increase when the format changes).
+snapshot_format = 1
+
+def get_snapshot_versions():
+    """Return versions of the snapshot format and packages a snapshot is valid for."""
+    return (snapshot_format, biorefineries.__version__, bst.__version__, tmo.__version__)
+
+def get_stream_key(stream):
+    """
+    Return the source and sink unit IDs and indices of a stream, which
+    identify the stream across biorefineries of the same configuration
+    (unlike default stream IDs).
+    
+    """
+    connection = stream.get_connection()
+    return (getattr(connection.source, 'ID', None), connection.source_index,
+            getattr(connection.sink, 'ID', None), connection.sink_index)
+
+def get_snapshot_file(folder, key):
+    """Return the file of the snapshot of a configuration (by key) in the given folder."""
+    versions = get_snapshot_versions()
+    digest = hashlib.sha1(repr((key, versions)).encode()).hexdigest()[:20]
+    return os.path.join(folder, f'cane_{digest}.pkl')
+
+
+class BiorefinerySnapshot:
+    """
+    Create a BiorefinerySnapshot object that stores the converged state of a
+    system: material flow rates, temperature, pressure, and phases of all
+    streams (including recycle streams), unit design and cost results, and
+    the feedstock price. Snapshots are saved to disk so that new processes
+    can warm-start the system instead of simulating from empty recycles.
+
+    Parameters
+    ----------
+    key : tuple
+        Full configuration key of the biorefinery.
+    system : System
+        Converged system.
+    feedstock_price : float, optional
+        Feedstock price [USD/kg].
+
+    Notes
+    -----
+    A snapshot is only loaded if its key and versions (snapshot format,
+    biorefineries, biosteam, and thermosteam) match, and it can only be
+    restored if the chemicals, streams, and units of the system match.
+
+    Examples
+    --------
+    >>> from biorefineries import cane
+    >>> br = cane.Biorefinery('S1', snapshot_folder='snapshots') # doctest: +SKIP
+
+    In a new process, the same configuration is warm-started from disk:
+
+    >>> br = cane.Biorefinery('S1', snapshot_folder='snapshots') # doctest: +SKIP
+
+    """
+    __slots__ = ('key', 'versions', 'chemicals', 'streams', 'units',
+                 'feedstock_price')
+
+    def __init__(self, key, system, feedstock_price=None):
+        self.key = key
+        self.versions = get_snapshot_versions()
+        self.chemicals = system.units[0].chemicals.IDs
+        self.streams = {
+            get_stream_key(i): (i.phases, np.array(i.imol.data, float), i.T, i.P)
+            for i in system.streams
+        }
+        self.units = {
+            i.ID: (dict(i.design_results), dict(i.baseline_purchase_costs),
+                   dict(i.purchase_costs), dict(i.installed_costs))
+            for i in system.units
+        }
+        self.feedstock_price = feedstock_price
+
+    @classmethod
+    def load(cls, file, key):
+        """
+        Return the snapshot saved in the file (or None if the file does not
+        exist, cannot be read, or the key or versions do not match).
+
+        """
+        try:
+            with open(file, 'rb') as f: snapshot = pickle.load(f)
+        except Exception:
+            return None
+        if (not isinstance(snapshot, cls)
+            or snapshot.key != key
+            or snapshot.versions != get_snapshot_versions()):
+            return None
+        return snapshot
+
+    def save(self, file):
+        """Save the snapshot to the file (written atomically)."""
+        folder = os.path.dirname(file)
+        if folder: os.makedirs(folder, exist_ok=True)
+        temporary_file = f'{file}.{os.getpid()}.tmp'
+        with open(temporary_file, 'wb') as f: pickle.dump(self, f)
+        os.replace(temporary_file, file)
+
+    def is_compatible(self, system):
+        """Return whether the snapshot can be restored to the system."""
+        return (
+            system.units[0].chemicals.IDs == self.chemicals
+            and set(self.streams) == set([get_stream_key(i) for i in system.streams])
+            and set(self.units) == set([i.ID for i in system.units])
+        )
+
+    def restore(self, system, results=False):
+        """
+        Restore stream data (and unit design and cost results if `results`
+        is True) to the system.
+
+        """
+        streams = self.streams
+        for stream in system.streams:
+            phases, data, T, P = streams[get_stream_key(stream)]
+            stream.phases = phases
+            stream.imol.data[:] = data
+            stream.T = T
+            stream.P = P
+        if results:
+            units = self.units
+            for unit in system.units:
+                for i, j in zip((unit.design_results, unit.baseline_purchase_costs,
+                                 unit.purchase_costs, unit.installed_costs),
+                                units[unit.ID]):
+                    i.clear()
+                    i.update(j)
+
+    def matches(self, system, rtol=1e-2):
+        """
+        Return whether the installed equipment cost of the system is within
+        a relative tolerance of the snapshot.
+
+        """
+        snapshot_cost = sum([sum(i[3].values()) for i in self.units.values()])
+        installed_cost = sum([sum(i.installed_costs.values()) for i in system.units])
+        return np.allclose(installed_cost, snapshot_cost, rtol=rtol)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.key})"
@@ -200,6 +200,21 @@ def create_sucrose_fermentation_system(ins, outs,
         fermentor_outs = ['']
     dilution_water = bst.Stream('dilution_water')
     
+    # Maximum number of path runs to confirm titer estimates before falling 
+    # back to bracketed solvers
+    titer_solver_maxiter = 5
+    
+    def run_path(path):
+        stats = R301.titer_solver_stats
+        stats['Path evaluations'] += 1
+        stats['Last path evaluations'] += 1
+        for i in path: i.run()
+    
+    def start_titer_solver():
+        stats = R301.titer_solver_stats
+        stats['Calls'] += 1
+        stats['Last path evaluations'] = 0
+    
     if fed_batch:
         if 'Sugar' not in dilution_water.chemicals:
             dilution_water.chemicals.define_group('Sugar', ('Glucose', 'Sucrose', 'Xylose'))
@@ -236,6 +251,7 @@ def create_sucrose_fermentation_system(ins, outs,
         
         @SX1.add_specification(run=False)
         def sugar_concentration_adjustment():
+            start_titer_solver()
             target_titer = R301.titer
             R301.tau = target_titer / R301.productivity 
             dilution_water = M301.ins[1]
@@ -245,7 +261,7 @@ def create_sucrose_fermentation_system(ins, outs,
             beer = R301.outs[1]
             def f(removed_water_split):
                 SX1.split[:] = removed_water_split
-                for unit in path: unit.run()
+                run_path(path)
                 return target_titer - get_titer()
             dilution_water.imass['Water'] = 0.
             x0 = 0
@@ -258,15 +274,36 @@ def create_sucrose_fermentation_system(ins, outs,
                 required_water = (1./target_titer - 1./current_titer) * (product - ignored_product) * 1000.
                 dilution_water.imass['Water'] = max(required_water, 0)
             else:
-                y1 = f(x1)
-                if y1 > 0.:
-                    long_path = [SX0, F301, *sugar_path]
-                    for split in (0.15, 0.10, 0.5, 0.):
-                        SX0.split[:] = split
-                        for i in long_path: i.run()
-                        y1 = f(x1)
-                        if y1 < 0.: break
-                SX1.split[:] = flx.IQ_interpolation(f, x0, x1, y0, y1, x=SX1.split[0], ytol=1e-5, xtol=1e-6)
+                # The inverse of the titer is nearly linear with the water 
+                # returned to fermentation, which is linear with the split; so
+                # estimate the split from the water required and correct it
+                # by secant steps with few path runs
+                condensate_water = SX1.ins[0].imass['Water']
+                x = x0
+                y = y0
+                for i in range(titer_solver_maxiter if condensate_water > 0. else 0):
+                    inverse_titer = 1. / get_titer()
+                    if i:
+                        slope = (inverse_titer - inverse_titer_last) / (x - x_last)
+                        x_last = x
+                        x += (1. / target_titer - inverse_titer) / slope
+                    else:
+                        x_last = x
+                        x -= get_additional_dilution_water() / condensate_water
+                    inverse_titer_last = inverse_titer
+                    if not x0 < x < x1: break
+                    y = f(x)
+                    if abs(y) < 1e-5: break
+                if abs(y) >= 1e-5:
+                    y1 = f(x1)
+                    if y1 > 0.:
+                        long_path = [SX0, F301, *sugar_path]
+                        for split in (0.15, 0.10, 0.5, 0.):
+                            SX0.split[:] = split
+                            for i in long_path: i.run()
+                            y1 = f(x1)
+                            if y1 < 0.: break
+                    SX1.split[:] = flx.IQ_interpolation(f, x0, x1, y0, y1, x=SX1.split[0], ytol=1e-5, xtol=1e-6)
             SX0.split[:] = 0.2 # Restart
     else:
         F301 = bst.MultiEffectEvaporator('F301',
@@ -283,15 +320,21 @@ def create_sucrose_fermentation_system(ins, outs,
         
         def titer_at_fraction_evaporated_objective(V, path):
             F301.V = V
-            for i in path: i.run()
+            run_path(path)
             return R301.titer - get_titer()
         
+        def effluent_water_objective(V, water):
+            F301.V = V
+            F301._run()
+            return F301.outs[0].imass['Water'] - water
+        
         F301.P_original = P_original = tuple(F301.P)
         Pstart = P_original[0]
         Plast = P_original[-1]
         N_evaps = len(P_original)
         @F301.add_specification(run=False)
         def evaporation():
+            start_titer_solver()
             R301.tau = R301.titer / R301.productivity
             V_guess = F301.V
             s_dilution_water = M301.ins[-1]
@@ -300,35 +343,68 @@ def create_sucrose_fermentation_system(ins, outs,
             F301.P = F301.P_original
             F301._reload_components = True
             F301.V = 0
-            for i in path: i.run()
+            run_path(path)
             dilution_water = get_additional_dilution_water()
-            f = titer_at_fraction_evaporated_objective
             if dilution_water < 0.:
+                # The inverse of the titer is nearly linear with the water 
+                # left in the juice, which is nearly linear with the fraction
+                # evaporated (past the first effect); so estimate the fraction
+                # evaporated with the evaporator alone and correct it with 
+                # few path runs
+                water = F301.outs[0].imass['Water'] + dilution_water
+                f = effluent_water_objective
                 x0 = 0.
-                y0 = f(x0, path)
                 x1 = 0.5
-                y1 = f(x1, path)
+                y1 = f(x1, water)
                 if y1 > 0.: raise RuntimeError('cannot evaporate to target sugar concentration')
+                xmin = 1e-6
                 for i in range(1, N_evaps):
-                    if f(1e-6, path) < 0.:
+                    ymin = f(xmin, water)
+                    if ymin < 0.:
                         F301.P = np.linspace(Pstart, Plast, N_evaps - i)
                         F301._reload_components = True
                     else:
                         break
+                else:
+                    ymin = f(xmin, water)
                 x1 = 0.05
-                y1 = f(x1, path)
+                y1 = f(x1, water)
                 while y1 > 0:
                     x1 += 0.05
+                    y1 = f(x1, water)
+                water_slope = (y1 - ymin) / (x1 - xmin)
+                V = xmin - ymin / water_slope
+                for i in range(titer_solver_maxiter):
+                    F301.V = V
+                    run_path(path)
+                    titer = get_titer()
+                    if abs(R301.titer - titer) < 1e-3: break
+                    inverse_titer = 1. / titer
+                    if i:
+                        slope = (inverse_titer - inverse_titer_last) / (V - V_last)
+                        V_last = V
+                        V += (1. / R301.titer - inverse_titer) / slope
+                    else:
+                        V_last = V
+                        V += get_additional_dilution_water() / water_slope
+                    inverse_titer_last = inverse_titer
+                    if not x0 < V < x1: break
+                if abs(R301.titer - get_titer()) >= 1e-3:
+                    f = titer_at_fraction_evaporated_objective
+                    y0 = f(x0, path)
                     y1 = f(x1, path)
-                F301.V = flx.IQ_interpolation(
-                    f, x0, x1, y0, y1, x=V_guess, ytol=1e-3, xtol=1e-9, maxiter=20,
-                    args=(path,), checkiter=False
-                )
+                    while y1 > 0:
+                        x1 += 0.05
+                        y1 = f(x1, path)
+                    F301.V = flx.IQ_interpolation(
+                        f, x0, x1, y0, y1, x=V_guess, ytol=1e-3, xtol=1e-9, maxiter=20,
+                        args=(path,), checkiter=False
+                    )
             else:
                 mx_path = M301.path_until(R301, inclusive=True)
                 def f(required_water):
                     M301.ins[-1].imass['Water'] = required_water
-                    for unit in mx_path: unit.run()
+                    run_path(mx_path)
                     return required_water + get_additional_dilution_water()
                 try:
                     s_dilution_water.imass['Water'] = flx.wegstein(
@@ -393,6 +469,7 @@ def create_sucrose_fermentation_system(ins, outs,
         
     R301.titer = titer # g / L
     R301.productivity = productivity # g / L-h
+    R301.titer_solver_stats = {'Calls': 0, 'Path evaluations': 0, 'Last path evaluations': 0}
     
     def get_titer():
         s = R301.outs[1]
@@ -44,6 +44,8 @@ from .results import (
     get_monte_carlo,
     get_line_monte_carlo,
     spearman_file,
+    load_table,
+    load_coordinate_table,
 )
 import os
 from colorpalette import ColorWheel, Color
@@ -1473,7 +1475,7 @@ def _plot_competitive_biomass_yield_across_oil_content(
         configuration,
     ):
     file = monte_carlo_file(configuration, across_lines=False, across_oil_content='oilcane vs sugarcane')
-    df = pd.read_excel(file, sheet_name=features.competitive_biomass_yield.short_description, index_col=0)
+    df = load_coordinate_table(file, features.competitive_biomass_yield)
     df = df.dropna()
     oil_content = np.array(df.columns) * 100
     plt.ylabel(f"Competitive biomass yield\n[{format_units('DMT/ha/y')}]")
@@ -1501,7 +1503,7 @@ def plot_competitive_microbial_oil_yield_across_oil_content(
     ):
     if configuration is None: configuration = 'O7'
     file = monte_carlo_file(configuration, across_lines=False, across_oil_content='microbial oil vs bioethanol')
-    df = pd.read_excel(file, sheet_name=features.competitive_microbial_oil_yield.short_description, index_col=0)
+    df = load_coordinate_table(file, features.competitive_microbial_oil_yield)
     df = df.dropna(axis=0)
     fig = plt.figure()
     oil_fraction = np.array(df.columns) * 100
@@ -1755,7 +1757,7 @@ def plot_spearman(configurations, labels=None, metric=None,
     for name in configurations:
         file = spearman_file(name)
         try: 
-            df = pd.read_excel(file, header=[0, 1], index_col=[0, 1])
+            df = load_table(file, header=[0, 1], index_col=[0, 1])
         except: 
             warning = RuntimeWarning(f"file '{file}' not found")
             warn(warning)
@@ -1804,7 +1806,7 @@ def plot_spearman_YRCP2023(configurations=None, labels=None,
         names = get_YRCP2023_spearman_names(configuration, kind)
         file = spearman_file(configuration)
         try: 
-            df = pd.read_excel(file, header=[0, 1], index_col=[0, 1])
+            df = load_table(file, header=[0, 1], index_col=[0, 1])
         except: 
             warning = RuntimeWarning(f"file '{file}' not found")
             warn(warning)
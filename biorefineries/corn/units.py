@@ -47,10 +47,10 @@ Facilities
 """
 import biosteam as bst
 import thermosteam as tmo
-import flexsolve as flx
 from biosteam.units.decorators import cost, copy_algorithm
 from biosteam.units.design_tools import CEPCI_by_year, cylinder_diameter_from_volume, cylinder_area
 from biosteam import tank_factory
+from biorefineries.process_tools import SteamInjection
 import numpy as np
 
 __all__ = (
@@ -153,24 +153,12 @@ class JetCooker(bst.Unit):
     def __init__(self, ID="", ins=None, outs=(), thermo=None, T=483.15):
         super().__init__(ID, ins, outs, thermo)
         self.T = T
-    
-    @staticmethod
-    def _T_objective_function(steam_mol, T, steam, effluent, feed):
-        steam.imol[CAS_water] = abs(steam_mol)
-        effluent.mol[:] = steam.mol + feed.mol
-        effluent.H = feed.H + steam.H
-        return effluent.T - T
+        self.steam_injection = SteamInjection(CAS_water)
     
     def _run(self):
         feed, steam = self._ins
-        steam_mol = feed.F_mol / 100.
         effluent, = self.outs
-        effluent.T = self.T
-        steam_mol = flx.aitken_secant(self._T_objective_function,
-                                      steam_mol, 1/8 * steam_mol + 1., 
-                                      1e-4, 1e-4,
-                                      args=(self.T, steam, effluent, feed),
-                                      checkroot=False)
+        self.steam_injection(feed, steam, effluent, self.T)
         effluent.P = steam.P / 2.
 
 CookedSlurrySurgeTank = tank_factory('CookedSlurrySurgeTank',
@@ -7,42 +7,26 @@
 # github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
 # for license details.
 
-import os, sys, io
-os.environ['NUMPY_EXPERIMENTAL_ARRAY_FUNCTION'] = '0'
-
-import numpy as np
-import cProfile, pstats
-from pstats import SortKey
+import os
+from biorefineries import lactic as la
+from biorefineries.process_tools import UnitProfiler
 
 path = os.path.dirname(__file__)
 
-# Instead using `pstats`, for t = 0.1, the stats are stored in `system_01`
-cProfile.run('from biorefineries import lactic as la; la.load()', 'la_profile_temp.prof')
-
-p = pstats.Stats('la_profile_temp.prof')
-
-# Save all results to a csv file
-output = io.StringIO()
-# Save the old stream so we can swap back
-console_strm = p.stream
-p.stream = output
-
-# Pass the outputs to `text`
-p.sort_stats('tottime').print_stats()
-
-# Add deliminator
-text = output.getvalue()
-text = 'ncalls' + text.split('ncalls')[-1]
-text = '\n'.join([','.join(line.rstrip().split(None,5)) for line in text.split('\n')])
+la.load(print_results=False)
+lactic_sys = la.lactic_sys
 
-# Save the results to csv, here
-csv_path = os.path.join(path, 'la_profile_temp.csv')
-with open(csv_path, 'w+') as f:
-    f.write(text)
-    f.close()
+# Profile simulation from empty recycles by unit operation, specification,
+# and recycle loop iteration
+lactic_sys.reset_cache()
+lactic_sys.empty_recycles()
+profiler = UnitProfiler(lactic_sys)
+with profiler: lactic_sys.simulate()
 
-# Swap back the output stream
-p.stream = console_strm
+# Save the results to a csv file and the folded stacks for flame graphs
+# (e.g., with speedscope or flamegraph.pl)
+profiler.table().to_csv(os.path.join(path, 'la_profile_temp.csv'))
+profiler.save_folded_stacks(os.path.join(path, 'la_profile_temp.folded'))
 
 # import biosteam as bst
 # from chaospy import distributions as shape
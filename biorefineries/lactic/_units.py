@@ -40,6 +40,7 @@ References
 import numpy as np
 import thermosteam as tmo
 from math import exp, pi, ceil
+from scipy.integrate import solve_ivp
 from biosteam import Stream, Unit, main_flowsheet
 from biosteam.exceptions import DesignError
 from biosteam.units import HXutility, Mixer, SolidsSeparator, StorageTank
@@ -1004,6 +1005,10 @@ class Esterification(Reactor):
         Operating temperature, [K].
     catalyst_price : float
         Unit price of the Amberlyst-15 catalyst, [$/kg].
+    integration : str
+        Method to integrate the rate law when X1 and tau are not given,
+        can be 'euler' (fixed time step) or 'ode' (adaptive step size,
+        stopping when the conversion rate falls below the threshold).
     """
     _N_ins = 5
     _N_outs = 2
@@ -1031,6 +1036,7 @@ class Esterification(Reactor):
                  vessel_material='Stainless steel 316',
                  vessel_type='Vertical',
                  catalyst_price=138.03, # price['Amberlyst15']
+                 integration='euler',
                  ):
 
         Unit.__init__(self, ID, ins, outs)
@@ -1049,6 +1055,8 @@ class Esterification(Reactor):
         self.vessel_material = vessel_material
         self.vessel_type = vessel_type
         self.catalyst_price = catalyst_price
+        self.integration = integration
+        self._activity_model = None
         ID = self.ID
         self._mixed = Stream(f'{ID}_mixed')
         self._tmp_flow = Stream(f'{ID}_tmp_flow')
@@ -1064,24 +1072,49 @@ class Esterification(Reactor):
         KEt = self.KEt = 1.22 * exp(359.63/T)
         return K, kc, KW, KEt
 
-    def compute_r(self, flow, reactives, T):
-        lle_chemicals = self.chemicals.lle_chemicals
-        lle_IDs = tuple([i.ID for i in lle_chemicals])
+    @property
+    def integration(self):
+        """[str] Method to integrate the rate law, 'euler' or 'ode'."""
+        return self._integration
+    @integration.setter
+    def integration(self, i):
+        if i not in ('euler', 'ode'):
+            raise ValueError(f"integration must be either 'euler' or 'ode', not {i!r}")
+        self._integration = i
+
+    def _load_activity_model(self, reactives):
+        # Activity coefficient model and indices are only created once
+        # for a given set of chemicals and reactives
+        chemicals = self.chemicals
+        activity_model = self._activity_model
+        if activity_model and activity_model[0] is chemicals \
+            and activity_model[1] == reactives:
+            return activity_model[2:]
+        lle_chemicals = chemicals.lle_chemicals
+        lle_IDs = [i.ID for i in lle_chemicals]
         f_gamma = tmo.equilibrium.DortmundActivityCoefficients(lle_chemicals)
-        gammas = f_gamma(flow.get_normalized_mol(lle_IDs), T)
-        gammas_reactives = np.array([gammas[lle_IDs.index(ID)]
-                                     for ID in reactives])
-        normalized_mol = flow.get_normalized_mol(lle_IDs)
-        curr_conc = np.array([normalized_mol[lle_IDs.index(ID)]
-                              for ID in reactives])
-        activities = gammas_reactives * curr_conc
+        lle_index = chemicals.get_index(lle_IDs)
+        reactive_index = np.array([lle_IDs.index(ID) for ID in reactives])
+        self._activity_model = (chemicals, reactives, f_gamma, lle_index, reactive_index)
+        return f_gamma, lle_index, reactive_index
+
+    def _compute_r(self, lle_mol, f_gamma, reactive_index, T):
+        normalized_mol = lle_mol / lle_mol.sum()
+        gammas = f_gamma(normalized_mol, T)
+        activities = gammas[reactive_index] * normalized_mol[reactive_index]
         r_numerator = self.kc * (activities[1]*activities[0]-
                                  (activities[3]*activities[2]/self.K))
         r_denominator = (1+self.KEt*activities[3]+self.KW*activities[2])**2
         r = r_numerator / r_denominator
         return r
 
+    def compute_r(self, flow, reactives, T):
+        f_gamma, lle_index, reactive_index = self._load_activity_model(tuple(reactives))
+        return self._compute_r(flow.mol[lle_index], f_gamma, reactive_index, T)
+
     def compute_X1_and_tau(self, mixed_stream, time_step):
+        if self.integration == 'ode':
+            return self._integrate_X1_and_tau(mixed_stream, time_step)
         T = self.T
         cat_load = self.cat_load
         reactives = self.reactives[0:4]
@@ -1124,6 +1157,49 @@ class Esterification(Reactor):
         tau = tau_min / 60 # convert min to hr
         return X1, tau
 
+    def _integrate_X1_and_tau(self, mixed_stream, time_step):
+        # Same rate law and stopping criteria as the Euler method, but integrated
+        # with an adaptive step size; the reaction stops when the extent
+        # within a time step falls below 1e-4 of the initial lactic acid,
+        # when lactic acid or ethanol run out, or at the maximum residence time
+        T = self.T
+        reactives = self.reactives[0:4]
+        time_max = self.tau_max * 60 # tau_max in hr
+        self.compute_coefficients(T)
+        f_gamma, lle_index, reactive_index = self._load_activity_model(reactives)
+        compute_r = self._compute_r
+        self.mcat = mcat = self.cat_load * mixed_stream.F_mass
+        lle_mol = np.array(mixed_stream.mol[lle_index], float)
+        reactives_mol = lle_mol[reactive_index]
+        stoichiometry = np.array([-1., -1., 1., 1.]) # LA, ethanol, water, EtLA
+        LA_initial = reactives_mol[0]
+        X_max = min(reactives_mol[0], reactives_mol[1])
+
+        def dX_dt(t, X): # X is the extent of reaction in kmol/hr
+            lle_mol[reactive_index] = reactives_mol + stoichiometry * X[0]
+            return [compute_r(lle_mol, f_gamma, reactive_index, T) * mcat / 1000] # r is in mol g-1 min-1
+
+        def slow_conversion(t, X):
+            return dX_dt(t, X)[0] * time_step / LA_initial - 1e-4
+        slow_conversion.terminal = True
+        slow_conversion.direction = -1
+
+        def reactant_depleted(t, X):
+            return X_max - X[0]
+        reactant_depleted.terminal = True
+
+        if LA_initial <= 0. or slow_conversion(0., [0.]) <= 0.:
+            X = 0.
+            tau_min = time_step
+        else:
+            solution = solve_ivp(dX_dt, (0., time_max), [0.], rtol=1e-6,
+                                 events=(slow_conversion, reactant_depleted))
+            X = min(solution.y[0, -1], X_max)
+            tau_min = max(solution.t[-1], time_step)
+        X1 = X / LA_initial if LA_initial else 0.
+        tau = tau_min / 60 # convert min to hr
+        return X1, tau
+
     @property
     def tau(self):
         """Residence time [hr]."""
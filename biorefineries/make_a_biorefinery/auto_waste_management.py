@@ -119,6 +119,7 @@ class AutoWasteManagement(Facility):
         self.boiler_solids_mixer = boiler_solids_mixer
         self.to_wastewater_mixer_ID_key = to_wastewater_mixer_ID_key
         self.to_boiler_solids_mixer_ID_key = to_boiler_solids_mixer_ID_key
+        self._stream_index_key = None
         
         print("\n\nThe AutoWasteManagement facility is being used. Note that")
         print(f"all streams labeled '{to_wastewater_mixer_ID_key}' are mixed as the final inlet of {wastewater_mixer.ID}, and")
@@ -134,7 +135,38 @@ class AutoWasteManagement(Facility):
         def boiler_solids_mixer_spec():
             self._run()
                 
-    def _run(self):
+    def _get_stream_index_key(self):
+        # Changes whenever the system configuration is saved again (i.e., 
+        # the topology changed), streams are added/removed/renamed in the 
+        # flowsheet, the ID keys change, or the inlets of the mixers are replaced.
+        # Renamed streams are registered again at the end of the registry.
+        wastewater_mixer = self.wastewater_mixer
+        boiler_solids_mixer = self.boiler_solids_mixer
+        system = self.system
+        streams = system.flowsheet.stream.data
+        return (
+            getattr(system, '_connections', None),
+            len(streams),
+            next(reversed(streams), None),
+            self.to_wastewater_mixer_ID_key,
+            self.to_boiler_solids_mixer_ID_key,
+            *wastewater_mixer.ins, 
+            *boiler_solids_mixer.ins,
+        )
+    
+    def _stream_index_is_valid(self, key):
+        old_key = self._stream_index_key
+        return (
+            old_key is not None 
+            and len(old_key) == len(key)
+            and all([i is j or i == j for i, j in zip(old_key, key)])
+        )
+    
+    def reset_stream_index(self):
+        """Reset the index of streams to mix so that it is recreated on the next run."""
+        self._stream_index_key = None
+    
+    def _load_stream_index(self):
         wastewater_mixer = self.wastewater_mixer
         boiler_solids_mixer = self.boiler_solids_mixer
         to_wastewater_mixer_ID_key = self.to_wastewater_mixer_ID_key
@@ -145,18 +177,32 @@ class AutoWasteManagement(Facility):
         self.individual_streams_to_WWT = individual_streams_to_WWT = []
         self.individual_solids_to_boiler = individual_solids_to_boiler = []
         
-        self.mixed_streams_to_WWT = mixed_streams_to_WWT = wastewater_mixer.ins[-1]
-        self.mixed_solids_to_boiler = mixed_solids_to_boiler = boiler_solids_mixer.ins[-1]
-        
+        wastewater_mixer_streams = set([*wastewater_mixer.ins, *wastewater_mixer.outs])
+        boiler_solids_mixer_streams = set([*boiler_solids_mixer.ins, *boiler_solids_mixer.outs])
+        wastewater_mixer_downstream_units = set(wastewater_mixer.get_downstream_units())
+        boiler_solids_mixer_downstream_units = set(boiler_solids_mixer.get_downstream_units())
         for si in s:
             if to_wastewater_mixer_ID_key in si.ID and \
-                not (si in wastewater_mixer.ins or si in wastewater_mixer.outs) and \
-                not si.source in wastewater_mixer.get_downstream_units():
+                not si in wastewater_mixer_streams and \
+                not si.source in wastewater_mixer_downstream_units:
                 individual_streams_to_WWT.append(si)
             elif to_boiler_solids_mixer_ID_key in si.ID and \
-                not (si in boiler_solids_mixer.ins or si in boiler_solids_mixer.outs) and \
-                not si.source in boiler_solids_mixer.get_downstream_units():
+                not si in boiler_solids_mixer_streams and \
+                not si.source in boiler_solids_mixer_downstream_units:
                 individual_solids_to_boiler.append(si)
+    
+    def _run(self):
+        wastewater_mixer = self.wastewater_mixer
+        boiler_solids_mixer = self.boiler_solids_mixer
+        key = self._get_stream_index_key()
+        if not self._stream_index_is_valid(key):
+            self._load_stream_index()
+            self._stream_index_key = key
+        individual_streams_to_WWT = self.individual_streams_to_WWT
+        individual_solids_to_boiler = self.individual_solids_to_boiler
+        
+        self.mixed_streams_to_WWT = mixed_streams_to_WWT = wastewater_mixer.ins[-1]
+        self.mixed_solids_to_boiler = mixed_solids_to_boiler = boiler_solids_mixer.ins[-1]
         
         mixed_streams_to_WWT.empty()
         mixed_streams_to_WWT.mix_from(individual_streams_to_WWT)
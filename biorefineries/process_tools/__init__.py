@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+"""
+from . import grid_evaluation
+from . import adaptive_grid_evaluation
+from . import dirty_unit_tracker
+from . import convergence_recovery
+from . import steam_injection
+from . import unit_profiler
+
+__all__ = (
+    *grid_evaluation.__all__,
+    *adaptive_grid_evaluation.__all__,
+    *dirty_unit_tracker.__all__,
+    *convergence_recovery.__all__,
+    *steam_injection.__all__,
+    *unit_profiler.__all__,
+)
+
+from .grid_evaluation import *
+from .adaptive_grid_evaluation import *
+from .dirty_unit_tracker import *
+from .convergence_recovery import *
+from .steam_injection import *
+from .unit_profiler import *
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Adaptive evaluation of process specifications across grids of spec_1 and
+spec_2 (e.g., yield and titer) for TRY contour plots. The grid is evaluated
+coarsely first and cells are only refined where metric contour levels change
+or where the feasibility boundary crosses. Points within the infeasible
+region (e.g., sugar concentrations that cannot be reached) are inferred from
+a monotone boundary and all other points are interpolated.
+
+"""
+import numpy as np
+from .grid_evaluation import PENDING, EVALUATED, FAILED, _evaluate_point
+
+__all__ = ('AdaptiveGridEvaluation',)
+
+INFERRED, INTERPOLATED = 3, 4
+FEASIBLE, INFEASIBLE, UNDEFINED = 0, 1, 2
+
+
+class AdaptiveGridEvaluation:
+    """
+    Create an AdaptiveGridEvaluation object that evaluates metrics of a
+    process specification across a grid of spec_1 and spec_2 values and a set
+    of spec_3 values, only simulating points near contour levels and the
+    infeasible region.
+
+    Parameters
+    ----------
+    spec : ProcessSpecification
+        Must implement `evaluate_at_point(system, spec_1, spec_2, metrics, spec_3)`,
+        which returns metric results [M x P] at a single spec_1 and spec_2.
+    system : System
+        System to simulate.
+    spec_1 : array_like[N] or array_like[T x N]
+        Spec 1 values (e.g., yield) to evaluate. A meshgrid is also accepted.
+    spec_2 : array_like[T] or array_like[T x N]
+        Spec 2 values (e.g., titer) to evaluate. A meshgrid is also accepted.
+    metrics : Iterable[Callable; M elements]
+        Should return a number given no parameters.
+    spec_3 : array_like[P elements]
+        Spec 3 values (e.g., productivity) to evaluate.
+    levels : Iterable[array_like|None; M elements], optional
+        Contour levels of each metric. Cells are refined where the levels
+        of a metric change. Metrics with no levels (None) are not used for
+        refinement.
+    infeasible_simulations : list, optional
+        Record of the last infeasible simulation (i.e., the
+        `last_infeasible_simulation` list of the process specification module),
+        which is filled with (spec_1, spec_2) when a point is infeasible. If
+        given, infeasible points are assumed to be bounded by a monotone
+        frontier (i.e., any point with lower spec_1 and higher spec_2 than an
+        infeasible point is also infeasible) and are not simulated.
+    coarse_points : int, optional
+        Number of points along each axis of the initial coarse grid. Defaults to 5.
+
+    Attributes
+    ----------
+    results : array[T x N x M x P]
+        All metric results.
+    status : array[T x N]
+        Status of each point (0 if pending, 1 if evaluated, 2 if failed,
+        3 if inferred infeasible, 4 if interpolated).
+    infeasible : array[T x N]
+        Whether each point is infeasible.
+    time : array[T x N]
+        Time taken to evaluate each point in seconds.
+    errors : dict[tuple[int], str]
+        Error messages of failed points by grid index.
+
+    Notes
+    -----
+    The results have the same shape as the results of
+    `evaluate_across_specs` given meshgrids of spec_1 and spec_2, so they can
+    be passed to :func:`biosteam.plots.plot_contour_2d` as is.
+
+    Examples
+    --------
+    >>> from biorefineries.HP._process_specification import last_infeasible_simulation # doctest: +SKIP
+    >>> evaluation = AdaptiveGridEvaluation( # doctest: +SKIP
+    ...     spec, HP_sys, spec_1, spec_2, HP_metrics, spec_3,
+    ...     levels=[MPSP_levels, None, None],
+    ...     infeasible_simulations=last_infeasible_simulation,
+    ... )
+    >>> results = evaluation.evaluate() # doctest: +SKIP
+    >>> evaluation.report() # doctest: +SKIP
+    {'Points': 400, 'Simulations': 131, 'Inferred infeasible': 74, ...}
+
+    """
+    __slots__ = ('spec', 'system', 'spec_1', 'spec_2', 'metrics', 'spec_3',
+                 'levels', 'infeasible_simulations', 'coarse_points',
+                 'results', 'status', 'infeasible', 'time', 'errors', '_frontier')
+
+    def __init__(self, spec, system, spec_1, spec_2, metrics, spec_3,
+                 levels=None, infeasible_simulations=None, coarse_points=5):
+        spec_1 = np.asarray(spec_1, float)
+        spec_2 = np.asarray(spec_2, float)
+        if spec_1.ndim == 2: spec_1 = spec_1[0]
+        if spec_2.ndim == 2: spec_2 = spec_2[:, 0]
+        self.spec = spec
+        self.system = system
+        self.spec_1 = spec_1
+        self.spec_2 = spec_2
+        self.metrics = metrics
+        self.spec_3 = spec_3 = np.asarray(spec_3, float)
+        M = len(metrics)
+        if levels is None: levels = M * [None]
+        elif len(levels) != M: raise ValueError('levels must be given for each metric (or None)')
+        self.levels = [None if i is None else np.sort(np.asarray(i, float)) for i in levels]
+        self.infeasible_simulations = infeasible_simulations
+        self.coarse_points = coarse_points
+        shape = (spec_2.size, spec_1.size)
+        self.results = np.full((*shape, M, spec_3.size), np.nan)
+        self.status = np.zeros(shape, np.int8)
+        self.infeasible = np.zeros(shape, bool)
+        self.time = np.full(shape, np.nan)
+        self.errors = {}
+        self._frontier = []
+
+    @property
+    def shape(self):
+        """tuple[int] Shape of the grid (spec_2 x spec_1)."""
+        return self.status.shape
+
+    def _is_dominated(self, x, y):
+        return any([x <= i and y >= j for i, j in self._frontier])
+
+    def _evaluate(self, r, c):
+        if self.status[r, c] != PENDING: return
+        x = self.spec_1[c]
+        y = self.spec_2[r]
+        if self._is_dominated(x, y):
+            self.status[r, c] = INFERRED
+            self.infeasible[r, c] = True
+            return
+        record = self.infeasible_simulations
+        if record is not None: record.clear()
+        values, time, error = _evaluate_point(
+            self.spec, self.system, self.metrics, x, y, self.spec_3
+        )
+        self.time[r, c] = time
+        if error is None:
+            self.results[r, c] = values
+            self.status[r, c] = EVALUATED
+        else:
+            self.status[r, c] = FAILED
+            self.errors[(r, c)] = error
+        if record:
+            self.infeasible[r, c] = True
+            self._frontier.append((x, y))
+
+    def _state(self, r, c):
+        if self.infeasible[r, c]: return INFEASIBLE
+        elif np.isnan(self.results[r, c]).all(): return UNDEFINED
+        else: return FEASIBLE
+
+    def _needs_refinement(self, r0, r1, c0, c1):
+        status = self.status[r0:r1+1, c0:c1+1]
+        rows, cols = np.nonzero(status != PENDING)
+        rows += r0
+        cols += c0
+        states = set([self._state(r, c) for r, c in zip(rows, cols)])
+        if len(states) > 1: return True
+        if states.pop() != FEASIBLE: return False
+        results = self.results[rows, cols]
+        for i, levels in enumerate(self.levels):
+            if levels is None: continue
+            values = results[:, i, :]
+            bins = np.digitize(values, levels)
+            bins[np.isnan(values)] = -1
+            if (bins != bins[0]).any(): return True
+        return False
+
+    def _interpolate(self, r0, r1, c0, c1):
+        status = self.status[r0:r1+1, c0:c1+1]
+        pending = status == PENDING
+        if not pending.any(): return
+        state = self._state(r0, c0)
+        if state != FEASIBLE:
+            status[pending] = INTERPOLATED
+            self.infeasible[r0:r1+1, c0:c1+1][pending] = state == INFEASIBLE
+            return
+        x = self.spec_1
+        y = self.spec_2
+        tx = (x[c0:c1+1] - x[c0]) / (x[c1] - x[c0])
+        ty = (y[r0:r1+1] - y[r0]) / (y[r1] - y[r0])
+        tx = tx[np.newaxis, :, np.newaxis, np.newaxis]
+        ty = ty[:, np.newaxis, np.newaxis, np.newaxis]
+        results = self.results
+        values = (
+            (1 - ty) * ((1 - tx) * results[r0, c0] + tx * results[r0, c1])
+            + ty * ((1 - tx) * results[r1, c0] + tx * results[r1, c1])
+        )
+        results[r0:r1+1, c0:c1+1][pending] = values[pending]
+        status[pending] = INTERPOLATED
+
+    def evaluate(self):
+        """
+        Evaluate the grid adaptively and return all metric results
+        [T x N x M x P] (interpolated where not simulated).
+
+        """
+        T, N = self.shape
+        spec = self.spec
+        spec.count = 0
+        spec.total_iterations = T * N
+        coarse_points = self.coarse_points
+        rows = np.unique(np.linspace(0, T - 1, min(coarse_points, T)).round().astype(int))
+        cols = np.unique(np.linspace(0, N - 1, min(coarse_points, N)).round().astype(int))
+        for r in rows:
+            for c in cols: self._evaluate(r, c)
+        cells = [(r0, r1, c0, c1) for r0, r1 in zip(rows[:-1], rows[1:])
+                                  for c0, c1 in zip(cols[:-1], cols[1:])]
+        leaves = []
+        while cells:
+            refined_cells = []
+            for cell in cells:
+                r0, r1, c0, c1 = cell
+                if (r1 - r0 < 2 and c1 - c0 < 2) or not self._needs_refinement(*cell):
+                    leaves.append(cell)
+                    continue
+                rows = [r0, (r0 + r1) // 2, r1] if r1 - r0 > 1 else [r0, r1]
+                cols = [c0, (c0 + c1) // 2, c1] if c1 - c0 > 1 else [c0, c1]
+                for r in rows:
+                    for c in cols: self._evaluate(r, c)
+                refined_cells.extend([(r0, r1, c0, c1) for r0, r1 in zip(rows[:-1], rows[1:])
+                                                       for c0, c1 in zip(cols[:-1], cols[1:])])
+            cells = refined_cells
+        for cell in leaves: self._interpolate(*cell)
+        return self.results.copy()
+
+    def report(self):
+        """Return a dictionary with the number of simulations performed and saved."""
+        status = self.status
+        points = status.size
+        simulations = int(((status == EVALUATED) | (status == FAILED)).sum())
+        return {
+            'Points': points,
+            'Simulations': simulations,
+            'Failed': int((status == FAILED).sum()),
+            'Inferred infeasible': int((status == INFERRED).sum()),
+            'Interpolated': int((status == INTERPOLATED).sum()),
+            'Simulations saved': points - simulations,
+            'Fraction saved': 1 - simulations / points,
+        }
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.spec}, shape={self.shape})"
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Recovery of failed system simulations (i.e., the "bugfix barrage") by
+retrying with other warm starts and converge methods, in the order that
+succeeded fastest at nearby points.
+
+"""
+import numpy as np
+from time import perf_counter
+
+__all__ = ('ConvergenceRecovery',)
+
+_yellow_text = '\033[1;33m'
+_reset_text = '\033[1;0m'
+
+#: Warm starts to retry simulations with.
+#: 'baseline': Reset the cache, empty recycles, and simulate at the baseline
+#: specifications before simulating at the given specifications.
+#: 'reset': Reset the cache and empty recycles before simulating.
+#: 'last': Simulate from the last recycle state.
+warm_starts = ('baseline', 'reset', 'last')
+
+def flatten_point(point):
+    """Return a tuple of floats of the point with array elements (e.g., productivities) flattened."""
+    return tuple([float(j) for i in point for j in np.ravel(i)])
+
+
+class ConvergenceRecovery:
+    """
+    Create a ConvergenceRecovery object that retries failed system
+    simulations with recovery strategies (pairs of warm starts and converge
+    methods) and learns which strategies succeed fastest near each point.
+
+    Parameters
+    ----------
+    strategies : Iterable[tuple[str, str|None]], optional
+        Warm start ('baseline', 'reset', or 'last') and converge method
+        (None for the current method of the system) of each strategy in
+        default order. Defaults to [('baseline', None), ('reset', 'fixedpoint'),
+        ('reset', 'aitken')], which are the strategies of the original
+        bugfix barrage.
+    time_budget : float, optional
+        Maximum time in seconds to spend retrying each point. No new
+        strategies are tried once exceeded (at least one strategy is always
+        tried). Defaults to no limit.
+    neighbors : int, optional
+        Number of nearest points recovered before used to rank strategies.
+        Defaults to 5.
+    verbose : bool, optional
+        Whether to print each strategy tried. Defaults to True.
+
+    Attributes
+    ----------
+    history : list[tuple[tuple[float], dict]]
+        Points recovered (or not) and the time taken by each strategy tried
+        (NaN if failed).
+    records : list[dict]
+        Statistics of each recovery.
+
+    Notes
+    -----
+    Strategies which succeeded at the nearest points are tried first (the
+    fastest first), then strategies not tried at these points (in default
+    order), and lastly strategies which only failed at these points. The
+    converge method of the system is restored after each recovery.
+
+    Examples
+    --------
+    >>> convergence_recovery = ConvergenceRecovery(time_budget=300) # doctest: +SKIP
+    >>> convergence_recovery.recover( # doctest: +SKIP
+    ...     system,
+    ...     load=lambda: spec.load_specifications(spec_1, spec_2, spec_3),
+    ...     baseline=lambda: spec.load_specifications(**baseline_spec),
+    ...     point=(spec_1, spec_2, spec_3),
+    ... )
+    >>> convergence_recovery.report() # doctest: +SKIP
+    {'Samples': 12, 'Recovered': 11, 'Failed': 1, 'Attempts': 15, ...}
+
+    """
+    __slots__ = ('strategies', 'time_budget', 'neighbors', 'verbose',
+                 'history', 'records')
+
+    def __init__(self, strategies=None, time_budget=None, neighbors=5, verbose=True):
+        if strategies is None:
+            strategies = [('baseline', None), ('reset', 'fixedpoint'), ('reset', 'aitken')]
+        else:
+            strategies = [tuple(i) for i in strategies]
+        for warm_start, method in strategies:
+            if warm_start not in warm_starts:
+                raise ValueError(f"warm start must be one of {warm_starts}, not {warm_start!r}")
+        self.strategies = strategies
+        self.time_budget = time_budget
+        self.neighbors = neighbors
+        self.verbose = verbose
+        self.history = []
+        self.records = []
+
+    def rank_strategies(self, point=()):
+        """Return strategies in the order they should be tried at the given point."""
+        strategies = self.strategies
+        history = self.history
+        point = np.array(flatten_point(point))
+        history = [i for i in history if len(i[0]) == point.size] # Comparable points only
+        if not history: return list(strategies)
+        points = np.array([i for i, j in history], float).reshape([len(history), point.size])
+        scale = points.max(axis=0) - points.min(axis=0)
+        scale[scale == 0] = 1.
+        distance = np.abs((points - point) / scale).sum(axis=1)
+        latest = np.arange(len(history))[::-1] # Break ties with the latest points
+        nearest = latest[np.argsort(distance[latest], kind='stable')][:self.neighbors]
+        times = {i: [] for i in strategies}
+        for i in nearest:
+            for strategy, time in history[i][1].items():
+                if strategy in times: times[strategy].append(time)
+        def key(index):
+            strategy_times = np.array(times[strategies[index]])
+            succeeded = strategy_times[~np.isnan(strategy_times)]
+            if succeeded.size: return (0, succeeded.mean(), index)
+            elif strategy_times.size: return (2, 0., index)
+            else: return (1, 0., index)
+        return [strategies[i] for i in sorted(range(len(strategies)), key=key)]
+
+    def _simulate(self, system, load, baseline, strategy):
+        warm_start, method = strategy
+        if method is not None: system.converge_method = method
+        if warm_start != 'last':
+            if self.verbose: print('Resetting cache and emptying recycles ...')
+            system.reset_cache()
+            system.empty_recycles()
+            if warm_start == 'baseline':
+                if self.verbose: print('Loading and simulating with baseline specifications ...')
+                baseline()
+                system.simulate()
+        if self.verbose: print('Loading and simulating with required specifications ...')
+        load()
+        system.simulate()
+
+    def recover(self, system, load, point=(), baseline=None):
+        """
+        Simulate the system with each recovery strategy until one succeeds.
+        The last exception is raised if all strategies fail (or the time
+        budget is exceeded).
+
+        Parameters
+        ----------
+        system : System
+            System to simulate.
+        load : Callable
+            Should load the specifications to simulate given no parameters.
+        point : Iterable[float|Iterable[float]], optional
+            Point simulated (e.g., spec_1, spec_2, and spec_3 values) used to
+            find nearby points. Elements may be arrays (e.g., productivities),
+            which are flattened. Should have the same flattened length at
+            every call (other points are not used to rank strategies).
+        baseline : Callable, optional
+            Should load baseline specifications given no parameters.
+            Strategies with baseline warm starts are skipped if not given.
+
+        """
+        point = flatten_point(point)
+        converge_method = system.converge_method
+        time_budget = self.time_budget
+        verbose = self.verbose
+        attempts = {}
+        start = perf_counter()
+        error = None
+        try:
+            for strategy in self.rank_strategies(point):
+                warm_start, method = strategy
+                if warm_start == 'baseline' and baseline is None: continue
+                if attempts and time_budget is not None and perf_counter() - start > time_budget:
+                    if verbose: print('Time budget exceeded.')
+                    break
+                if verbose: print(f"Trying {method or converge_method} with {warm_start} warm start ...")
+                time = perf_counter()
+                try:
+                    self._simulate(system, load, baseline, strategy)
+                except Exception as e:
+                    attempts[strategy] = np.nan
+                    error = e
+                    if verbose: print(str(e))
+                else:
+                    attempts[strategy] = perf_counter() - time
+                    error = None
+                    break
+                finally:
+                    system.converge_method = converge_method
+        finally:
+            self.history.append((point, attempts))
+            self.records.append({
+                'Point': point,
+                'Attempts': len(attempts),
+                'Strategy': None if error is not None or not attempts else strategy,
+                'Time [s]': perf_counter() - start,
+            })
+            if verbose: print('\n')
+        if error is not None:
+            if verbose: print(_yellow_text+"Bugfix barrage failed."+_reset_text)
+            raise error
+        elif not attempts:
+            raise RuntimeError('no recovery strategies could be tried')
+
+    def report(self):
+        """Return a dictionary summarizing the strategies tried and their success."""
+        records = self.records
+        successes = {i: 0 for i in self.strategies}
+        for i in records:
+            strategy = i['Strategy']
+            if strategy is not None: successes[strategy] += 1
+        recovered = sum(successes.values())
+        return {
+            'Samples': len(records),
+            'Recovered': recovered,
+            'Failed': len(records) - recovered,
+            'Attempts': sum([i['Attempts'] for i in records]),
+            'Time [s]': sum([i['Time [s]'] for i in records]),
+            'Successes by strategy': successes,
+        }
+
+    def __repr__(self):
+        return f"{type(self).__name__}(strategies={self.strategies})"
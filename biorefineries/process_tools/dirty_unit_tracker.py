@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Tracking of unit operations that must be simulated again given the model
+parameters that changed since the last sample (e.g., to only simulate
+pre-fermentation units affected by the sampled parameters before
+converging the whole system).
+
+"""
+import ast
+import biosteam as bst
+from time import perf_counter
+
+__all__ = ('DirtyUnitTracker', 'get_loaded_names')
+
+_missing = object()
+
+def get_loaded_names(statement):
+    """
+    Return names loaded (but not assigned) by the statement, excluding the
+    parameter value `x`.
+    """
+    loaded = set()
+    stored = {'x'}
+    for node in ast.walk(ast.parse(statement)):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load): loaded.add(node.id)
+            else: stored.add(node.id)
+    return loaded - stored
+
+
+class DirtyUnitTracker:
+    """
+    Create a DirtyUnitTracker object that maps each model parameter to the
+    unit operations its setter mutates, marks these units and their
+    downstream units dirty when the parameter value changes, and simulates
+    only dirty units.
+
+    Parameters
+    ----------
+    model : Model
+        Model with parameters to track.
+    units : Iterable[Unit]
+        Unit operations to track in simulation order (e.g., all units
+        upstream of the fermentation reactor).
+    dependencies : dict[Parameter|str, Iterable[Unit]], optional
+        Unit operations mutated by parameters (or parameter names). Takes
+        priority over inferred dependencies.
+    namespace_dict : dict, optional
+        Namespace of load statements. Defaults to the `namespace_dict` of
+        the model (if any).
+    independent : Iterable[object], optional
+        Objects which do not affect mass and energy balances (in addition to
+        TEA objects and utility classes).
+    log : bool, optional
+        Whether to record units simulated and skipped at each sample.
+    run : Callable, optional
+        Function to simulate each unit. Defaults to :meth:`biosteam.Unit.simulate`.
+
+    Notes
+    -----
+    Dependencies are inferred from the load statements of the parameter
+    (i.e., `model.load_statements`) or otherwise from the parameter element.
+    Unit operations and streams (through their sink) are dependencies and
+    numbers, strings, TEA objects and utility classes are ignored. If
+    any other object is referenced, the dependencies of the parameter
+    are unknown and all units are marked dirty when it changes.
+    Setters are wrapped to detect changes when the tracker is created;
+    parameters added later are tracked on the next call to
+    :meth:`simulate_dirty_units`.
+
+    """
+    __slots__ = ('model', 'units', 'dependencies', 'namespace_dict',
+                 'independent', 'log', 'records', 'dirty', 'run',
+                 '_unit_set', '_setters', '_last_values', '_parameter_units',
+                 '_downstream_units', '_unit_times')
+
+    def __init__(self, model, units, dependencies=None, namespace_dict=None,
+                 independent=(), log=False, run=None):
+        self.model = model
+        self.units = units = list(units)
+        self.dependencies = {} if dependencies is None else dict(dependencies)
+        if namespace_dict is None: namespace_dict = getattr(model, 'namespace_dict', None)
+        self.namespace_dict = {} if namespace_dict is None else namespace_dict
+        self.independent = independent
+        #: [bool] Whether to record units simulated and skipped at each sample.
+        self.log = log
+        #: [list[dict]] Units simulated and skipped and time saved at each sample.
+        self.records = []
+        #: [set[Unit]] Units to simulate.
+        self.dirty = set(units)
+        #: [Callable] Function to simulate units.
+        self.run = run or bst.Unit.simulate
+        self._unit_set = set(units)
+        self._setters = {}
+        self._last_values = {}
+        self._parameter_units = {}
+        self._downstream_units = {}
+        self._unit_times = {}
+        self.update_parameters()
+
+    def _get_object_dependencies(self, obj):
+        if isinstance(obj, bst.Unit):
+            return {obj}
+        elif isinstance(obj, bst.Stream):
+            return set() if obj.sink is None else {obj.sink}
+        elif (isinstance(obj, (int, float, str, bst.TEA))
+              or obj is bst.PowerUtility or obj is bst.HeatUtility
+              or any([obj is i for i in self.independent])):
+            return set()
+
+    def get_dependencies(self, parameter):
+        """Return the unit operations mutated by the parameter (None if unknown)."""
+        dependencies = self.dependencies
+        if parameter in dependencies: return set(dependencies[parameter])
+        if parameter.name in dependencies: return set(dependencies[parameter.name])
+        statements = getattr(self.model, 'load_statements', None)
+        if statements and parameter in statements:
+            namespace_dict = self.namespace_dict
+            units = set()
+            for name in get_loaded_names(statements[parameter]):
+                if name not in namespace_dict: continue # Builtin
+                dependencies = self._get_object_dependencies(namespace_dict[name])
+                if dependencies is None: return None
+                units.update(dependencies)
+            return units
+        return self._get_object_dependencies(parameter.element)
+
+    def _get_downstream_units(self, unit):
+        downstream_units = self._downstream_units
+        if unit not in downstream_units:
+            downstream_units[unit] = (
+                set([unit, *unit.get_downstream_units()]) & self._unit_set
+            )
+        return downstream_units[unit]
+
+    def mark_dirty(self, parameter):
+        """Mark units mutated by the parameter and their downstream units dirty."""
+        units = self._parameter_units.get(parameter, _missing)
+        if units is _missing:
+            self._parameter_units[parameter] = units = self.get_dependencies(parameter)
+        if units is None:
+            self.dirty.update(self.units)
+        else:
+            for i in units: self.dirty.update(self._get_downstream_units(i))
+
+    def mark_all_dirty(self):
+        """Mark all units dirty (e.g., after resetting the system)."""
+        self.dirty.update(self.units)
+
+    def update_parameters(self):
+        """Wrap setters of new model parameters to detect changes."""
+        setters = self._setters
+        last_values = self._last_values
+        for parameter in self.model.parameters:
+            if setters.get(parameter) is parameter.setter: continue
+            f = parameter.setter
+            def setter(value, parameter=parameter, f=f):
+                if last_values.get(parameter, _missing) != value:
+                    self.mark_dirty(parameter)
+                    last_values[parameter] = value
+                f(value)
+            parameter.setter = setters[parameter] = setter
+            last_values.pop(parameter, None)
+            self._parameter_units.pop(parameter, None)
+            self.dirty.update(self.units) # State before tracking is unknown
+
+    def simulate_dirty_units(self):
+        """Simulate dirty units in order and return the units skipped."""
+        self.update_parameters()
+        dirty = self.dirty
+        unit_times = self._unit_times
+        run = self.run
+        simulated = []
+        skipped = []
+        try:
+            for i in self.units:
+                if i in dirty:
+                    time = perf_counter()
+                    run(i)
+                    unit_times[i] = perf_counter() - time
+                    simulated.append(i)
+                else:
+                    skipped.append(i)
+        except:
+            self.mark_all_dirty()
+            raise
+        dirty.clear()
+        if self.log:
+            self.records.append({
+                'Simulated': [i.ID for i in simulated],
+                'Skipped': [i.ID for i in skipped],
+                'Time saved [s]': sum([unit_times.get(i, 0.) for i in skipped]),
+            })
+        return skipped
+
+    def report(self):
+        """Return a dictionary with the number of units skipped and the time saved."""
+        records = self.records
+        return {
+            'Samples': len(records),
+            'Units skipped': sum([len(i['Skipped']) for i in records]),
+            'Units simulated': sum([len(i['Simulated']) for i in records]),
+            'Time saved [s]': sum([i['Time saved [s]'] for i in records]),
+        }
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.model}, units={[i.ID for i in self.units]})"
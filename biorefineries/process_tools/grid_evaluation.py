@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Evaluation of process specifications across grids of spec_1 and spec_2
+(e.g., yield and titer) at a set of spec_3 values (e.g., productivity) for
+TRY analyses. Points may be distributed over a process pool and each
+completed point is persisted to memory-mapped arrays, so that interrupted
+evaluations resume where they stopped.
+
+"""
+import os
+import numpy as np
+from time import perf_counter
+from multiprocessing import Pool
+
+__all__ = ('GridEvaluation',)
+
+PENDING, EVALUATED, FAILED = 0, 1, 2
+
+# Bookkeeping of process specifications (if present) collected from each
+# point evaluated in worker processes and merged into the main specification
+_dict_records = ('HXN_Q_bal_percent_error_dict', 'HXN_new_HXs',
+                 'HXN_new_HX_utils', 'exceptions_dict')
+_list_records = ('HXN_intolerable_points',)
+_number_records = ('count_exceptions', 'average_HXN_energy_balance_percent_error')
+
+_worker = None # (spec, system, metrics, spec_3) within worker processes
+
+def _clear_records(spec):
+    for i in _dict_records:
+        if hasattr(spec, i): setattr(spec, i, {})
+    for i in _list_records:
+        if hasattr(spec, i): setattr(spec, i, [])
+    for i in _number_records:
+        if hasattr(spec, i): setattr(spec, i, 0)
+
+def _get_records(spec):
+    records = {}
+    for i in (*_dict_records, *_list_records, *_number_records):
+        if hasattr(spec, i): records[i] = getattr(spec, i)
+    if 'exceptions_dict' in records: # Exceptions may not be picklable
+        records['exceptions_dict'] = {
+            i: tuple([repr(e) for e in j]) if isinstance(j, tuple) else repr(j)
+            for i, j in records['exceptions_dict'].items()
+        }
+    return records
+
+def _merge_records(spec, records):
+    for i, j in records.items():
+        if i in _dict_records: getattr(spec, i).update(j)
+        elif i in _list_records: getattr(spec, i).extend(j)
+        else: setattr(spec, i, getattr(spec, i) + j)
+
+def _evaluate_point(spec, system, metrics, spec_1, spec_2, spec_3):
+    time = perf_counter()
+    try:
+        values = spec.evaluate_at_point(system, spec_1, spec_2, metrics, spec_3)
+    except Exception as e:
+        values = None
+        error = f"{type(e).__name__}: {e}"
+    else:
+        error = None
+    return values, perf_counter() - time, error
+
+def _init_worker(loader, spec_3, total):
+    global _worker
+    spec, system, metrics = loader()
+    spec.total_iterations = total
+    _worker = (spec, system, metrics, spec_3)
+
+def _evaluate_in_worker(task):
+    index, spec_1, spec_2 = task
+    spec, system, metrics, spec_3 = _worker
+    _clear_records(spec)
+    spec.count = index
+    values, time, error = _evaluate_point(spec, system, metrics, spec_1, spec_2, spec_3)
+    return index, values, time, error, os.getpid(), _get_records(spec)
+
+
+class GridEvaluation:
+    """
+    Create a GridEvaluation object that evaluates metrics of a process
+    specification across a grid of spec_1 and spec_2 values and a set of
+    spec_3 values.
+
+    Parameters
+    ----------
+    spec : ProcessSpecification
+        Must implement `evaluate_at_point(system, spec_1, spec_2, metrics, spec_3)`,
+        which returns metric results [M x P] at a single spec_1 and spec_2.
+    system : System
+        System to simulate.
+    spec_1 : array_like[shape]
+        Spec 1 values (e.g., yield) to evaluate.
+    spec_2 : array_like[shape]
+        Spec 2 values (e.g., titer) to evaluate.
+    metrics : Iterable[Callable; M elements]
+        Should return a number given no parameters.
+    spec_3 : array_like[P elements]
+        Spec 3 values (e.g., productivity) to evaluate.
+    path : str, optional
+        Path (without extension) of the files where results ('{path}.npy') and
+        per-point telemetry ('{path}_status.npy', '{path}_time.npy',
+        and '{path}_worker.npy') are saved as each point is completed. If
+        these files already exist, the previous evaluation is resumed (failed
+        points are evaluated again).
+    loader : Callable, optional
+        Should return a (spec, system, metrics) tuple equivalent to the given
+        ones. Required for parallel evaluation, as each worker process loads
+        its own biorefinery. Must be picklable (e.g., a module-level function).
+
+    Attributes
+    ----------
+    results : array[shape x M x P]
+        All metric results (NaN if pending or failed).
+    status : array[shape]
+        Status of each point (0 if pending, 1 if evaluated, 2 if failed).
+    time : array[shape]
+        Time taken to evaluate each point in seconds.
+    worker : array[shape]
+        Process ID of the worker which evaluated each point.
+    errors : dict[tuple[int], str]
+        Error messages of failed points by grid index.
+
+    Notes
+    -----
+    Points are evaluated in order (C-order of the grid). In parallel
+    evaluations, specification bookkeeping (e.g., HXN energy balance errors,
+    intolerable points, and exceptions) is collected from each worker and
+    merged into the given specification. The last infeasible simulation
+    used to skip infeasible titers is kept per worker.
+
+    Examples
+    --------
+    >>> evaluation = GridEvaluation( # doctest: +SKIP
+    ...     spec, HP_sys, spec_1, spec_2, HP_metrics, spec_3,
+    ...     path='HP_TRY', loader=load_HP_TRY,
+    ... )
+    >>> results = evaluation.evaluate(processes=4) # doctest: +SKIP
+    >>> evaluation.telemetry() # doctest: +SKIP
+    {'Points': 400, 'Evaluated': 400, 'Infeasible': 37, 'Failed': 0, ...}
+
+    """
+    __slots__ = ('spec', 'system', 'spec_1', 'spec_2', 'metrics', 'spec_3',
+                 'path', 'loader', 'results', 'status', 'time', 'worker',
+                 'errors', 'wall_time')
+
+    def __init__(self, spec, system, spec_1, spec_2, metrics, spec_3,
+                 path=None, loader=None):
+        spec_1, spec_2 = np.broadcast_arrays(np.asarray(spec_1, float),
+                                             np.asarray(spec_2, float))
+        self.spec = spec
+        self.system = system
+        self.spec_1 = spec_1
+        self.spec_2 = spec_2
+        self.metrics = metrics
+        self.spec_3 = spec_3 = np.asarray(spec_3, float)
+        self.path = path
+        self.loader = loader
+        self.errors = {}
+        self.wall_time = 0.
+        shape = spec_1.shape
+        results_shape = (*shape, len(metrics), spec_3.size)
+        if path is None:
+            self.results = np.full(results_shape, np.nan)
+            self.status = np.zeros(shape, np.int8)
+            self.time = np.full(shape, np.nan)
+            self.worker = np.zeros(shape, np.int64)
+        elif all([os.path.exists(i) for i in self._files()]):
+            grid = np.load(f'{path}_grid.npz')
+            if not (np.array_equal(grid['spec_1'], spec_1)
+                    and np.array_equal(grid['spec_2'], spec_2)
+                    and np.array_equal(grid['spec_3'], spec_3)):
+                raise ValueError(
+                    f"grid saved at {path!r} does not match the grid to evaluate; "
+                     "use another path to start a new evaluation"
+                )
+            open_memmap = np.lib.format.open_memmap
+            self.results = open_memmap(f'{path}.npy', mode='r+')
+            self.status = open_memmap(f'{path}_status.npy', mode='r+')
+            self.time = open_memmap(f'{path}_time.npy', mode='r+')
+            self.worker = open_memmap(f'{path}_worker.npy', mode='r+')
+            if self.results.shape != results_shape:
+                raise ValueError(
+                    f"results saved at {path!r} have shape {self.results.shape}, "
+                    f"not {results_shape}; use another path to start a new evaluation"
+                )
+        else:
+            np.savez(f'{path}_grid.npz', spec_1=spec_1, spec_2=spec_2, spec_3=spec_3)
+            open_memmap = np.lib.format.open_memmap
+            self.results = open_memmap(f'{path}.npy', mode='w+', dtype=float, shape=results_shape)
+            self.status = open_memmap(f'{path}_status.npy', mode='w+', dtype=np.int8, shape=shape)
+            self.time = open_memmap(f'{path}_time.npy', mode='w+', dtype=float, shape=shape)
+            self.worker = open_memmap(f'{path}_worker.npy', mode='w+', dtype=np.int64, shape=shape)
+            self.results[:] = np.nan
+            self.time[:] = np.nan
+            self.flush()
+
+    def _files(self):
+        path = self.path
+        return (f'{path}_grid.npz', f'{path}.npy', f'{path}_status.npy',
+                f'{path}_time.npy', f'{path}_worker.npy')
+
+    @property
+    def shape(self):
+        """tuple[int] Shape of the grid."""
+        return self.spec_1.shape
+
+    @property
+    def pending(self):
+        """[1d array] Flat indices of points that have not been evaluated (or failed)."""
+        return np.flatnonzero(self.status.ravel() != EVALUATED)
+
+    def flush(self):
+        """Write any changes in the results and telemetry to disk."""
+        if self.path is None: return
+        for i in (self.results, self.status, self.time, self.worker): i.flush()
+
+    def _record(self, index, values, time, error, worker, records=None):
+        index = tuple([int(i) for i in np.unravel_index(index, self.shape)])
+        if error is None:
+            self.results[index] = values
+            self.status[index] = EVALUATED
+            self.errors.pop(index, None)
+        else:
+            self.results[index] = np.nan
+            self.status[index] = FAILED
+            self.errors[index] = error
+        self.time[index] = time
+        self.worker[index] = worker
+        if records is not None:
+            _merge_records(self.spec, records)
+            self.spec.count += 1
+        self.flush()
+
+    def evaluate(self, processes=None):
+        """
+        Evaluate all pending (and failed) points and return all metric
+        results [shape x M x P].
+
+        Parameters
+        ----------
+        processes : int, optional
+            Number of worker processes. Points are evaluated in the current
+            process if None or 1.
+
+        """
+        pending = self.pending
+        spec_1 = self.spec_1.ravel()
+        spec_2 = self.spec_2.ravel()
+        time = perf_counter()
+        if processes is None or processes == 1:
+            spec = self.spec
+            system = self.system
+            metrics = self.metrics
+            spec_3 = self.spec_3
+            pid = os.getpid()
+            for i in pending:
+                values, point_time, error = _evaluate_point(
+                    spec, system, metrics, spec_1[i], spec_2[i], spec_3
+                )
+                self._record(i, values, point_time, error, pid)
+        elif pending.size:
+            if self.loader is None:
+                raise ValueError('a loader is required for parallel evaluation')
+            tasks = [(i, spec_1[i], spec_2[i]) for i in pending]
+            initargs = (self.loader, self.spec_3, self.status.size)
+            with Pool(processes, _init_worker, initargs) as pool:
+                for args in pool.imap_unordered(_evaluate_in_worker, tasks):
+                    self._record(*args)
+        self.wall_time += perf_counter() - time
+        return np.array(self.results)
+
+    def telemetry(self):
+        """Return a dictionary summarizing the status and timing of all points."""
+        status = self.status
+        evaluated = status == EVALUATED
+        infeasible = evaluated & np.isnan(self.results).all(axis=(-2, -1))
+        time = self.time[status != PENDING]
+        worker = self.worker[status != PENDING]
+        return {
+            'Points': status.size,
+            'Evaluated': int(evaluated.sum()),
+            'Infeasible': int(infeasible.sum()),
+            'Failed': int((status == FAILED).sum()),
+            'Pending': int((status == PENDING).sum()),
+            'Mean time [s]': time.mean() if time.size else np.nan,
+            'Max time [s]': time.max() if time.size else np.nan,
+            'Wall time [s]': self.wall_time,
+            'Workers': np.unique(worker).size,
+        }
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.spec}, shape={self.shape}, path={self.path!r})"
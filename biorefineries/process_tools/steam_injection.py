@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Direct steam injection (e.g., jet cookers and steam mixers) solved by Newton
+steps of the enthalpy balance at the outlet temperature, which need no
+temperature-enthalpy inversions.
+
+"""
+import flexsolve as flx
+
+__all__ = ('SteamInjection',)
+
+
+class SteamInjection:
+    """
+    Create a SteamInjection object that solves the flow rate of steam
+    required to heat a feed to a given temperature by direct injection and
+    mixes the feed and steam into the effluent.
+
+    Parameters
+    ----------
+    water : str, optional
+        ID (or CAS number) of water. Defaults to 'Water'.
+    steam_enthalpy : float, optional
+        Molar enthalpy of steam [kJ/kmol]. Defaults to the enthalpy of the
+        steam stream.
+    xtol : float, optional
+        Steam flow rate tolerance of the secant method [kmol/hr].
+        Defaults to 1e-4.
+    Ttol : float, optional
+        Temperature tolerance [K]. Defaults to 1e-4.
+
+    Attributes
+    ----------
+    steam_mol : float|None
+        Last steam flow rate solved [kmol/hr], which is the starting point of
+        the next solution.
+    solutions : dict[str, int]
+        Number of solutions by Newton steps and by the secant method.
+
+    Notes
+    -----
+    The enthalpy of the inlets and the enthalpy of the effluent at the outlet
+    temperature are linear with the flow rate of steam (as long as the
+    phases of the effluent do not change), so Newton steps converge in one
+    iteration. The result is checked by setting the enthalpy of the effluent
+    and the (Aitken) secant method is only used if the temperature of the
+    effluent is off (e.g., phases changed) or the flow rate of steam is
+    negative.
+
+    Examples
+    --------
+    >>> steam_injection = SteamInjection() # doctest: +SKIP
+    >>> steam_injection(feed, steam, effluent, T=483.15) # doctest: +SKIP
+
+    """
+    __slots__ = ('water', 'steam_enthalpy', 'xtol', 'Ttol', 'steam_mol',
+                 'solutions')
+
+    def __init__(self, water='Water', steam_enthalpy=None, xtol=1e-4, Ttol=1e-4):
+        self.water = water
+        self.steam_enthalpy = steam_enthalpy
+        self.xtol = xtol
+        self.Ttol = Ttol
+        self.steam_mol = None
+        self.solutions = {'Newton': 0, 'Secant': 0}
+
+    def _mix(self, steam_mol, feed, steam, effluent):
+        steam.imol[self.water] = steam_mol
+        effluent.mol[:] = steam.mol + feed.mol
+        steam_enthalpy = self.steam_enthalpy
+        return steam.H if steam_enthalpy is None else steam_mol * steam_enthalpy
+
+    def _enthalpy_balance(self, steam_mol, T, H_feed, feed, steam, effluent):
+        H_in = H_feed + self._mix(steam_mol, feed, steam, effluent)
+        effluent.T = T
+        return H_in - effluent.H
+
+    def _T_objective_function(self, steam_mol, T, H_feed, feed, steam, effluent):
+        effluent.H = H_feed + self._mix(abs(steam_mol), feed, steam, effluent)
+        return effluent.T - T
+
+    def __call__(self, feed, steam, effluent, T):
+        """
+        Solve the flow rate of steam to heat the feed to the temperature
+        (updating the steam and effluent) and return the flow rate [kmol/hr].
+
+        """
+        steam_mol = self.steam_mol
+        if not steam_mol: steam_mol = feed.F_mol / 100. + 1.
+        phase = effluent.phase
+        H_feed = feed.H
+        f = self._enthalpy_balance
+        args = (T, H_feed, feed, steam, effluent)
+        x0 = 0.
+        y0 = f(x0, *args)
+        y1 = f(steam_mol, *args)
+        steam_mol -= y1 * steam_mol / (y1 - y0)
+        if steam_mol >= 0.:
+            self._T_objective_function(steam_mol, *args)
+            if effluent.phase == phase and abs(effluent.T - T) < self.Ttol:
+                self.solutions['Newton'] += 1
+                self.steam_mol = steam_mol
+                return steam_mol
+        else:
+            steam_mol = self.steam_mol or feed.F_mol / 100.
+        steam_mol = abs(flx.aitken_secant(
+            self._T_objective_function, steam_mol, 1/8 * steam_mol + 1.,
+            self.xtol, self.Ttol, args=args, checkroot=False,
+        ))
+        self._T_objective_function(steam_mol, *args)
+        self.solutions['Secant'] += 1
+        self.steam_mol = steam_mol
+        return steam_mol
+
+    def __repr__(self):
+        return f"{type(self).__name__}(water={self.water!r})"
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Profiling of systems and models by unit operation (mass and energy
+balances, design, and cost), process specification, and recycle loop
+iteration rather than by Python function.
+
+"""
+import pandas as pd
+import biosteam as bst
+from time import perf_counter
+
+__all__ = ('UnitProfiler',)
+
+#: Unit operation methods profiled.
+unit_methods = ('_run', '_design', '_cost')
+
+
+class UnitProfiler:
+    """
+    Create a UnitProfiler object that attributes wall time and calls to the
+    unit operations (`_run`, `_design`, and `_cost` methods), process
+    specifications (functions added with `add_specification` to units,
+    the system, and its subsystems), and recycle loop iterations of a
+    system while used as a context manager.
+
+    Parameters
+    ----------
+    element : System|Model
+        System (or model of the system) to profile.
+
+    Attributes
+    ----------
+    stats : dict[tuple[str, str, str], list[float]]
+        Calls, time, and self time (excluding profiled calls within) [s] by
+        element ID, type, and method.
+    stacks : dict[tuple[str, ...], float]
+        Self time [s] by stack of profiled calls.
+
+    Notes
+    -----
+    Unit operations and specifications are profiled by temporarily
+    replacing their methods and functions (only for the objects of the
+    system), so the overhead is only a few microseconds per call. Recycle
+    loop iterations are profiled by system ID for all systems converged
+    while profiling (subsystems may be created again when simulating).
+    Time not spent in profiled calls (e.g., TEA) is attributed to the
+    system itself.
+
+    Examples
+    --------
+    >>> from biorefineries import lactic as la # doctest: +SKIP
+    >>> from biorefineries.process_tools import UnitProfiler # doctest: +SKIP
+    >>> la.load(print_results=False) # doctest: +SKIP
+    >>> profiler = UnitProfiler(la.lactic_sys) # doctest: +SKIP
+    >>> with profiler: la.lactic_sys.simulate() # doctest: +SKIP
+    >>> profiler.table() # doctest: +SKIP
+    >>> profiler.save_folded_stacks('lactic.folded') # doctest: +SKIP
+
+    The folded stacks can be viewed as a flame graph (e.g., with
+    speedscope or flamegraph.pl).
+
+    """
+    __slots__ = ('system', 'stats', 'stacks', '_stack', '_child_times',
+                 '_restore', '_enter_time')
+
+    def __init__(self, element):
+        self.system = element if isinstance(element, bst.System) else element.system
+        self.stats = {}
+        self.stacks = {}
+        self._stack = []
+        self._child_times = []
+        self._restore = []
+
+    def _profiled(self, f, key, label):
+        stats = self.stats
+        stacks = self.stacks
+        stack = self._stack
+        child_times = self._child_times
+        def profiled(*args, **kwargs):
+            stack.append(label)
+            child_times.append(0.)
+            time = perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                time = perf_counter() - time
+                self_time = time - child_times.pop()
+                if child_times: child_times[-1] += time
+                path = tuple(stack)
+                stack.pop()
+                if key in stats:
+                    calls_time_self = stats[key]
+                    calls_time_self[0] += 1
+                    calls_time_self[1] += time
+                    calls_time_self[2] += self_time
+                else:
+                    stats[key] = [1, time, self_time]
+                if path in stacks:
+                    stacks[path] += self_time
+                else:
+                    stacks[path] = self_time
+        return profiled
+
+    def _iter_run_conditional(self, method):
+        profiled = {}
+        def _iter_run_conditional(system, data):
+            ID = system.ID
+            if ID not in profiled:
+                profiled[ID] = self._profiled(
+                    method, (ID, 'System', 'recycle iteration'), f'{ID} recycle iteration'
+                )
+            return profiled[ID](system, data)
+        return _iter_run_conditional
+
+    def _profile_specifications(self, specifications, ID, name):
+        restore = self._restore
+        for specification in specifications:
+            f = specification.f
+            function = getattr(f, '__name__', type(f).__name__)
+            restore.append((specification, 'f', f))
+            specification.f = self._profiled(
+                f, (ID, name, f'specification {function}'),
+                f'{ID} specification {function}'
+            )
+
+    def __enter__(self):
+        system = self.system
+        restore = self._restore
+        units = [*system.units, *[i for i in system.facilities if i not in system.units]]
+        for unit in units:
+            dct = unit.__dict__
+            name = type(unit).__name__
+            for method in unit_methods:
+                restore.append((dct, method, dct.get(method)))
+                dct[method] = self._profiled(getattr(unit, method), (unit.ID, name, method),
+                                             f'{unit.ID}.{method}')
+            self._profile_specifications(unit._specifications, unit.ID, name)
+        systems = [system]
+        for i in systems:
+            self._profile_specifications(i._specifications, i.ID, 'System')
+            systems.extend(i.subsystems)
+        method = bst.System._iter_run_conditional
+        restore.append((bst.System, '_iter_run_conditional', method))
+        bst.System._iter_run_conditional = self._iter_run_conditional(method)
+        self._stack.append(system.ID)
+        self._child_times.append(0.)
+        self._enter_time = perf_counter()
+        return self
+
+    def __exit__(self, type, exception, traceback):
+        time = perf_counter() - self._enter_time
+        stack = self._stack
+        path = tuple(stack)
+        self_time = time - self._child_times.pop()
+        stack.clear()
+        key = (self.system.ID, 'System', 'total')
+        stats = self.stats
+        if key in stats:
+            calls_time_self = stats[key]
+            calls_time_self[0] += 1
+            calls_time_self[1] += time
+            calls_time_self[2] += self_time
+        else:
+            stats[key] = [1, time, self_time]
+        stacks = self.stacks
+        stacks[path] = stacks.get(path, 0.) + self_time
+        restore = self._restore
+        for obj, name, value in reversed(restore):
+            if isinstance(obj, dict):
+                if value is None: del obj[name]
+                else: obj[name] = value
+            else:
+                setattr(obj, name, value)
+        restore.clear()
+
+    def profile(self, f, *args, **kwargs):
+        """Return the result of calling the function (e.g., `model.evaluate`) while profiling."""
+        with self: return f(*args, **kwargs)
+
+    def reset(self):
+        """Clear all profiled stats and stacks."""
+        self.stats.clear()
+        self.stacks.clear()
+
+    def table(self):
+        """
+        Return a table of calls, time, and self time (excluding profiled
+        calls within) by element ID, type, and method, sorted by self time.
+
+        """
+        stats = self.stats
+        table = pd.DataFrame(
+            [j for j in stats.values()],
+            index=pd.MultiIndex.from_tuples(stats, names=('Element', 'Type', 'Method')),
+            columns=('Calls', 'Time [s]', 'Self time [s]'),
+        )
+        return table.sort_values('Self time [s]', ascending=False)
+
+    def folded_stacks(self):
+        """
+        Return self time in microseconds by stack of profiled calls in
+        the folded format of flame graphs (i.e., 'frame;frame;frame time').
+
+        """
+        return [f"{';'.join(path)} {round(time * 1e6)}"
+                for path, time in self.stacks.items()]
+
+    def save_folded_stacks(self, file):
+        """Save folded stacks (see `folded_stacks`) to the file."""
+        with open(file, 'w') as f: f.write('\n'.join(self.folded_stacks()) + '\n')
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.system.ID})"
@@ -16,6 +16,10 @@ This module is a modified implementation of modules from the following:
 @author: sarangbhagwat
 """
 
+import os
+import ast
+import builtins
+from functools import lru_cache
 from pandas import DataFrame, read_excel
 from chaospy import distributions as shape
 # from biorefineries.succinic.system_sc import succinic_tea, u, s
@@ -37,6 +41,44 @@ def replace_apostrophes(statement):
     statement = statement.replace('’', "'").replace('‘', "'").replace('“', '"').replace('”', '"')
     return statement
 
+@lru_cache(maxsize=None)
+def compile_statement(statement):
+    """Return a code object of the (codified) load statement."""
+    return compile(statement, '<load statements>', 'exec')
+
+def get_unresolved_names(statement, namespace_dict):
+    """
+    Return names loaded by the (codified) statement which are not defined 
+    in the namespace dictionary, the statement itself, or builtins.
+    """
+    loaded = set()
+    stored = {'x'}
+    for node in ast.walk(ast.parse(statement)):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load): loaded.add(node.id)
+            else: stored.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            stored.update([(i.asname or i.name).split('.')[0] for i in node.names])
+        elif isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            stored.add(node.name)
+        elif isinstance(node, ast.arg):
+            stored.add(node.arg)
+    return sorted([i for i in loaded - stored 
+                   if i not in namespace_dict and not hasattr(builtins, i)])
+
+_parameter_distributions = {}
+
+def read_parameter_distributions(filename):
+    """
+    Return a DataFrame of the parameter distributions workbook. The parsed 
+    workbook is cached until the file is modified.
+    """
+    filename = os.path.abspath(filename)
+    key = (filename, os.path.getmtime(filename))
+    if key not in _parameter_distributions:
+        _parameter_distributions[key] = read_excel(filename)
+    return _parameter_distributions[key]
+
 #%%
 class EasyInputModel(Model):
     """
@@ -48,17 +90,33 @@ class EasyInputModel(Model):
         Model.__init__(self, system=system, metrics=metrics, specification=specification, 
                      parameters=parameters, retry_evaluation=retry_evaluation, exception_hook=exception_hook)
         self.namespace_dict = namespace_dict
+        self.load_statements = {} # Source of load statements by parameter
         # globals().update(namespace_dict)
     
-    def load_parameter_distributions(self, distributions,):
+    def load_parameter_distributions(self, distributions, validate=True):
+        """
+        Load parameters from a DataFrame or Excel file of parameter distributions.
+        Load statements are compiled once. If `validate` is True, a NameError
+        listing all names of load statements that are not defined in the 
+        namespace dictionary is raised before any parameter is added.
+        """
         df = distributions
         if type(df) is not DataFrame:
-            df = read_excel(distributions)
+            df = read_parameter_distributions(distributions)
             
         create_function = self.create_function
         namespace_dict = self.namespace_dict
         param = self.parameter
         
+        if validate:
+            unresolved = {}
+            for i, row in df.iterrows():
+                names = get_unresolved_names(codify(row['Load Statements']), namespace_dict)
+                if names: unresolved[row['Parameter name']] = names
+            if unresolved:
+                unresolved = '\n'.join([f"{i}: {', '.join(j)}" for i, j in unresolved.items()])
+                raise NameError(f"unresolved names in load statements:\n{unresolved}")
+        
         for i, row in df.iterrows():
             name = row['Parameter name']
             element = row['Element'] # currently only compatible with string elements
@@ -67,7 +125,8 @@ class EasyInputModel(Model):
             baseline = row['Baseline']
             shape_data = row['Shape']
             lower, midpoint, upper = row['Lower'], row['Midpoint'], row['Upper']
-            load_statements = codify(row['Load Statements'])
+            statement = codify(row['Load Statements'])
+            load_statements = compile_statement(statement)
             
             D = None
             if shape_data.lower() in ['triangular', 'triangle',]:
@@ -75,15 +134,17 @@ class EasyInputModel(Model):
             elif shape_data.lower() in ['uniform',]:
                 D = shape.Uniform(lower, upper)
             
-            param(name=name, 
-                  setter=create_function(load_statements, namespace_dict), 
-                  element=element, 
-                  kind=kind, 
-                  units=units,
-                  baseline=baseline, 
-                  distribution=D)
+            parameter = param(name=name, 
+                              setter=create_function(load_statements, namespace_dict), 
+                              element=element, 
+                              kind=kind, 
+                              units=units,
+                              baseline=baseline, 
+                              distribution=D)
+            self.load_statements[parameter] = statement
             
     def create_function(self, code, namespace_dict):
+        if isinstance(code, str): code = compile_statement(code)
         def wrapper_fn(statement):
             def f(x):
                 namespace_dict['x'] = x
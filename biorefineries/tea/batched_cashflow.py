@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized cash flow analysis of many converged simulations (e.g., cached
+Monte Carlo samples) with the financial assumptions of a CellulosicEthanolTEA
+object. NPV, prices and IRRs are solved for all simulations at once, so that
+financial parameters (e.g., IRR, income tax, financing) can be varied without
+re-simulating the system.
+
+"""
+import numpy as np
+import biosteam as bst
+from biosteam._tea import add_all_replacement_costs_to_cashflow_array
+
+__all__ = ('get_cashflow_inputs', 'BatchedCashFlowAnalysis')
+
+def get_cashflow_inputs(tea, streams=None):
+    """
+    Return a dictionary of the cost inputs of the current (converged)
+    simulation required by BatchedCashFlowAnalysis. If `streams` are given,
+    also include the factor to convert their price to cost ("price2cost") and
+    their market value, which are required to solve their price.
+
+    """
+    system = tea.system
+    agile = isinstance(system, bst.AgileSystem)
+    BT = tea.boiler_turbogenerator
+    if BT is None:
+        BT_installed_cost = 0.
+    else:
+        if agile: BT = system.unit_capital_costs[BT]
+        BT_installed_cost = BT.installed_cost
+    start = tea._start
+    years = tea._years
+    replacement_cost = np.zeros(start + years)
+    unit_capital_costs = system.unit_capital_costs.values() if agile else system.cost_units
+    for i in unit_capital_costs:
+        add_all_replacement_costs_to_cashflow_array(
+            i, replacement_cost, years, start, tea.lang_factor
+        )
+    inputs = dict(
+        installed_equipment_cost=tea.installed_equipment_cost,
+        OSBL_installed_equipment_cost=tea.OSBL_installed_equipment_cost,
+        BT_installed_cost=BT_installed_cost,
+        material_cost=tea.material_cost,
+        utility_cost=tea.utility_cost,
+        sales=tea.sales,
+        replacement_cost=replacement_cost,
+    )
+    if streams is not None:
+        if isinstance(streams, bst.Stream): streams = [streams]
+        inputs['price2cost'] = sum([system._price2cost(i) for i in streams])
+        inputs['market_value'] = sum([system.get_market_value(i) for i in streams])
+    return inputs
+
+
+class BatchedCashFlowAnalysis:
+    """
+    Create a BatchedCashFlowAnalysis object for the vectorized cash flow
+    analysis of many simulations with the financial assumptions of a
+    CellulosicEthanolTEA object.
+
+    Parameters
+    ----------
+    tea : CellulosicEthanolTEA
+        Financial assumptions (e.g., schedules and cost factors).
+    installed_equipment_cost, OSBL_installed_equipment_cost, BT_installed_cost : 1d array
+        Installed equipment costs of all units, units outside the
+        battery limits, and the boiler-turbogenerator [USD].
+    material_cost, utility_cost, sales : 1d array
+        Annual costs and sales [USD/yr].
+    replacement_cost : 2d array, optional
+        Equipment replacement costs by year [USD]. Defaults to no replacements.
+    price2cost, market_value : 1d array, optional
+        Factor to convert the price of the streams with variable selling price
+        to cost [kg/yr] and their market value [USD/yr]. Only required to
+        solve prices.
+    IRR, income_tax, finance_interest, finance_fraction : float or 1d array, optional
+        Financial parameters of each simulation. Defaults to the values of the TEA.
+
+    Examples
+    --------
+    >>> # inputs = []
+    >>> # for sample in samples:
+    >>> #     ... # Set parameters and simulate
+    >>> #     inputs.append(get_cashflow_inputs(tea, ethanol))
+    >>> # batch = BatchedCashFlowAnalysis.from_inputs(tea, inputs)
+    >>> # batch.income_tax = np.random.uniform(0.21, 0.28, len(inputs))
+    >>> # MESP = batch.solve_price() # USD/kg
+    >>> # IRR = batch.solve_IRR()
+
+    """
+    __slots__ = (
+        'tea', 'installed_equipment_cost', 'OSBL_installed_equipment_cost',
+        'BT_installed_cost', 'material_cost', 'utility_cost', 'sales',
+        'replacement_cost', 'price2cost', 'market_value', 'IRR',
+        'income_tax', 'finance_interest', 'finance_fraction',
+    )
+
+    def __init__(self, tea, installed_equipment_cost, OSBL_installed_equipment_cost,
+                 BT_installed_cost, material_cost, utility_cost, sales,
+                 replacement_cost=None, price2cost=None, market_value=None,
+                 IRR=None, income_tax=None, finance_interest=None,
+                 finance_fraction=None):
+        if tea.lang_factor:
+            raise NotImplementedError('lang factor cannot yet be used')
+        if type(tea)._fill_tax_and_incentives is not bst.TEA._fill_tax_and_incentives:
+            raise NotImplementedError('only the default income tax is implemented')
+        self.tea = tea
+        self.installed_equipment_cost = np.asarray(installed_equipment_cost, float)
+        self.OSBL_installed_equipment_cost = np.asarray(OSBL_installed_equipment_cost, float)
+        self.BT_installed_cost = np.asarray(BT_installed_cost, float)
+        self.material_cost = np.asarray(material_cost, float)
+        self.utility_cost = np.asarray(utility_cost, float)
+        self.sales = np.asarray(sales, float)
+        if replacement_cost is None:
+            replacement_cost = np.zeros([self.size, tea._start + tea._years])
+        self.replacement_cost = np.asarray(replacement_cost, float)
+        self.price2cost = None if price2cost is None else np.asarray(price2cost, float)
+        self.market_value = None if market_value is None else np.asarray(market_value, float)
+        self.IRR = tea.IRR if IRR is None else IRR
+        self.income_tax = tea.income_tax if income_tax is None else income_tax
+        if finance_interest is None: finance_interest = tea.finance_interest
+        if finance_fraction is None: finance_fraction = tea.finance_fraction
+        self.finance_interest = finance_interest or 0.
+        self.finance_fraction = finance_fraction or 0.
+
+    @classmethod
+    def from_inputs(cls, tea, inputs, **kwargs):
+        """Return a BatchedCashFlowAnalysis object from a list of dictionaries
+        returned by `get_cashflow_inputs`."""
+        data = {i: np.array([j[i] for j in inputs]) for i in inputs[0]}
+        return cls(tea, **data, **kwargs)
+
+    @property
+    def size(self):
+        """[int] Number of simulations."""
+        return self.installed_equipment_cost.size
+
+    def _column(self, value):
+        return np.broadcast_to(np.asarray(value, float), self.size)[:, None]
+
+    @property
+    def ISBL_installed_equipment_cost(self):
+        return self.installed_equipment_cost - self.OSBL_installed_equipment_cost
+
+    @property
+    def DPI(self):
+        """[1d array] Direct permanent investment [USD]."""
+        tea = self.tea
+        factors = tea.warehouse + tea.site_development + tea.additional_piping
+        return self.installed_equipment_cost + self.ISBL_installed_equipment_cost * factors
+
+    TDC = DPI
+
+    @property
+    def FCI(self):
+        """[1d array] Fixed capital investment [USD]."""
+        tea = self.tea
+        return self.TDC * (1. + tea.proratable_costs + tea.field_expenses
+                           + tea.construction + tea.contingency
+                           + tea.other_indirect_costs)
+
+    @property
+    def TCI(self):
+        """[1d array] Total capital investment [USD]."""
+        return (1. + self.tea.WC_over_FCI) * self.FCI
+
+    @property
+    def FOC(self):
+        """[1d array] Fixed operating costs [USD/yr]."""
+        tea = self.tea
+        return (self.FCI * tea.property_insurance
+                + self.ISBL_installed_equipment_cost * tea.maintenance
+                + tea.labor_cost * (1 + tea.labor_burden))
+
+    @property
+    def VOC(self):
+        """[1d array] Variable operating costs [USD/yr]."""
+        return self.material_cost + self.utility_cost
+
+    def _taxable_nontaxable_cashflows(self):
+        tea = self.tea
+        start = tea._start
+        years = tea._years
+        N = self.size
+        length = start + years
+        TDC = self.TDC
+        FCI = self.FCI
+        FOC = self.FOC[:, None]
+        VOC = self.VOC[:, None]
+        sales = self.sales[:, None]
+        BT_TDC = self.BT_installed_cost
+        D = np.zeros([N, length])
+        depreciation_array = tea._get_depreciation_array()[:years]
+        D[:, start:start + depreciation_array.size] = (TDC - BT_TDC)[:, None] * depreciation_array
+        depreciation_array = tea._steam_power_depreciation_array[:years] # Truncated as in the TEA
+        D[:, start:start + depreciation_array.size] += BT_TDC[:, None] * depreciation_array
+        C = np.zeros([N, length])
+        S = C.copy()
+        w0 = tea._startup_time
+        w1 = 1. - w0
+        C[:, start:start+1] = (w0 * tea.startup_VOCfrac * VOC + w1 * VOC
+                               + w0 * tea.startup_FOCfrac * FOC + w1 * FOC)
+        S[:, start:start+1] = w0 * tea.startup_salesfrac * sales + w1 * sales
+        C[:, start + 1:] = VOC + FOC
+        S[:, start + 1:] = sales
+        C_FC = self.replacement_cost.copy()
+        C_FC[:, :start] = FCI[:, None] * tea._construction_schedule
+        C_WC = np.zeros([N, length])
+        WC = tea.WC_over_FCI * FCI
+        C_WC[:, start - 1] = WC
+        C_WC[:, -1] = -WC
+        interest = self._column(self.finance_interest)
+        financed = interest != 0.
+        loan = np.where(financed, self._column(self.finance_fraction), 0.) * (C_FC[:, :start] + C_WC[:, :start])
+        # Constant loan payment to pay off the principal after the finance years
+        finance_years = tea.finance_years
+        principal = np.zeros([N, 1])
+        for i in range(start): principal = (principal + loan[:, i:i+1]) * (1. + interest)
+        interest = np.where(financed, interest, 1.)
+        payment = np.where(financed, principal * interest / (1. - (1. + interest) ** -finance_years), 0.)
+        LP = np.zeros([N, length])
+        LP[:, start:start + finance_years] = payment
+        Loan = np.zeros([N, length])
+        Loan[:, :start] = loan
+        taxable_cashflow = S - C - D - LP
+        nontaxable_cashflow = D + Loan - C_FC - C_WC
+        return taxable_cashflow, nontaxable_cashflow
+
+    def _discount_factors(self, IRR):
+        return (1. + self._column(IRR)) ** -self.tea._get_duration_array()
+
+    def _cashflow(self, taxable_cashflow, nontaxable_cashflow):
+        income_tax = self._column(self.income_tax)
+        tax = np.where(taxable_cashflow > 0., income_tax * taxable_cashflow, 0.)
+        return nontaxable_cashflow + taxable_cashflow - tax
+
+    @property
+    def cashflow_array(self):
+        """[2d array] Cash flows by simulation and year [USD]."""
+        return self._cashflow(*self._taxable_nontaxable_cashflows())
+
+    @property
+    def NPV(self):
+        """[1d array] Net present value [USD]."""
+        return (self.cashflow_array * self._discount_factors(self.IRR)).sum(1)
+
+    def solve_sales(self, xtol=10., maxiter=100):
+        """
+        Return the required additional sales [USD/yr] of each simulation
+        to reach the breakeven point (NPV = 0) through cash flow analysis.
+
+        """
+        tea = self.tea
+        taxable_cashflow, nontaxable_cashflow = self._taxable_nontaxable_cashflows()
+        discount_factors = self._discount_factors(self.IRR)
+        income_tax = self._column(self.income_tax)
+        start = tea._start
+        sales_coefficients = np.ones(taxable_cashflow.shape[1])
+        sales_coefficients[:start] = 0
+        w0 = tea._startup_time
+        sales_coefficients[start] = w0*tea.startup_VOCfrac + (1-w0)
+        # NPV is piecewise linear, increasing, and concave with respect to
+        # sales, so Newton's method converges within a few iterations
+        sales = np.zeros([self.size, 1])
+        for i in range(maxiter):
+            taxable = taxable_cashflow + sales * sales_coefficients
+            taxed = taxable > 0.
+            cashflow = nontaxable_cashflow + np.where(taxed, (1. - income_tax) * taxable, taxable)
+            NPV = (cashflow * discount_factors).sum(1, keepdims=True)
+            dNPV = (np.where(taxed, 1. - income_tax, 1.) * sales_coefficients * discount_factors).sum(1, keepdims=True)
+            dx = NPV / dNPV
+            sales -= dx
+            if (np.abs(dx) < xtol).all(): break
+        return sales[:, 0]
+
+    def solve_price(self):
+        """
+        Return the price [USD/kg] of the streams with variable selling price
+        at the breakeven point (NPV = 0) of each simulation.
+
+        """
+        if self.price2cost is None:
+            raise RuntimeError('price2cost and market_value are required to solve prices')
+        price2cost = self.price2cost
+        return self.market_value / np.abs(price2cost) + self.solve_sales() / price2cost
+
+    def solve_IRR(self, IRR=None, xtol=1e-6, maxiter=200):
+        """
+        Return the IRR of each simulation at the breakeven point (NPV = 0)
+        through cash flow analysis. Simulations that do not converge are nan.
+
+        """
+        cashflow = self.cashflow_array
+        duration_array = self.tea._get_duration_array()
+        if IRR is None: IRR = self.IRR
+        IRR = np.array(self._column(IRR))
+        IRR[~(IRR > 0.)] = 0.10
+        converged = np.zeros(IRR.shape, bool)
+        for i in range(maxiter):
+            discount_factors = (1. + IRR) ** -duration_array
+            NPV = (cashflow * discount_factors).sum(1, keepdims=True)
+            dNPV = (-duration_array * cashflow * discount_factors / (1. + IRR)).sum(1, keepdims=True)
+            dx = NPV / dNPV
+            IRR = np.where(converged, IRR, IRR - dx)
+            converged |= np.abs(dx) < xtol
+            if converged.all(): break
+        IRR[~converged] = np.nan
+        return IRR[:, 0]
@@ -11,9 +11,12 @@ from . import test_biorefineries
 from .test_biorefineries import *
 from . import run_readmes
 from .run_readmes import *
+from . import benchmark_biorefineries
+from .benchmark_biorefineries import *
 
 __all__ = (
     *test_biorefineries.__all__,
-    *run_readmes.__all__
+    *run_readmes.__all__,
+    *benchmark_biorefineries.__all__,
 )
 
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Performance regression benchmarks of the biorefineries. Each biorefinery is
+loaded through the same entry points as in test_biorefineries in a new
+Python process (so that import times are cold and memory use is not
+shared) and the time to import, build, simulate, solve the price of the
+main product, and simulate the heat exchanger network are recorded along
+with recycle iterations and peak memory use.
+
+Results can be saved as a baseline (JSON) and new results compared to it
+from the command line:
+
+$ python -m biorefineries.tests.benchmark_biorefineries --save baseline.json
+$ python -m biorefineries.tests.benchmark_biorefineries --compare baseline.json --threshold 0.2
+
+Only standard library modules are imported here so that importing this
+module does not affect the import times measured.
+
+"""
+import os
+import sys
+import json
+import platform
+import subprocess
+from time import perf_counter
+from importlib import import_module
+
+__all__ = (
+    'benchmark_cases',
+    'RecycleIterationCounter',
+    'benchmark_case',
+    'run_benchmarks',
+    'save_baseline',
+    'load_baseline',
+    'compare_to_baseline',
+)
+
+#: dict[str, tuple[str, str|None, tuple, dict]] Module, loader function (None
+#: if the system is created on import), arguments, and keyword arguments of
+#: each benchmark case.
+benchmark_cases = {
+    'cornstover': ('biorefineries.cornstover', 'load', (), {}),
+    'sugarcane': ('biorefineries.sugarcane', 'load', (), {}),
+    'lipidcane': ('biorefineries.lipidcane', 'load', (), {}),
+    **{f'oilcane-{i}': ('biorefineries.oilcane', 'load', (i,), {})
+       for i in ('O1', 'O2', 'O3', 'O4', 'O5', 'O6', 'O7', 'O8', 'O9')},
+    'lactic': ('biorefineries.lactic', 'load', (), {'print_results': False}),
+    'HP-lignocellulosic': ('biorefineries.HP', None, (), {}),
+    'HP-sugarcane': ('biorefineries.HP', 'load_system', ('sugarcane',), {}),
+    'TAL': ('biorefineries.TAL.system', None, (), {}),
+    'BDO': ('biorefineries.BDO.system_MS3', None, (), {}),
+    'succinic': ('biorefineries.succinic', 'load', (), {}),
+    'wwt-sugarcane1g': ('biorefineries.wwt.sugarcane1g', 'create_sc1g_comparison_systems', (), {}),
+}
+
+#: Metrics compared to the baseline and their minimum absolute change
+#: to be flagged as a regression (to ignore noise in small values).
+compared_metrics = {
+    'Import [s]': 0.05,
+    'Build [s]': 0.05,
+    'First simulate [s]': 0.05,
+    'Warm simulate [s]': 0.05,
+    'Solve price [s]': 0.05,
+    'HXN [s]': 0.05,
+    'First simulate recycle iterations': 1,
+    'Warm simulate recycle iterations': 1,
+    'Peak RSS [MB]': 10,
+}
+
+_results_marker = 'BENCHMARK RESULTS:'
+
+def get_peak_RSS():
+    """Return the peak resident set size of this process [MB] (or None if not available)."""
+    try:
+        import resource
+    except ImportError: # Not available in Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024 # bytes in macOS, kB otherwise
+
+def get_system_and_TEA(module, value=None):
+    """
+    Return the system and TEA object loaded (returned by the loader or
+    found in the module namespace).
+
+    """
+    import biosteam as bst
+    values = value if isinstance(value, tuple) else (value,)
+    systems = [i for i in values if isinstance(i, bst.System)]
+    if systems:
+        system = systems[-1]
+        return system, system.TEA
+    dct = module.__dict__
+    name = module.__name__.split('.')[1]
+    for tea_name in ('tea', f'{name}_tea', 'TEA'):
+        tea = dct.get(tea_name)
+        if isinstance(tea, bst.TEA): break
+    else:
+        teas = [i for i in dct.values() if isinstance(i, bst.TEA)]
+        if not teas: raise RuntimeError(f'no TEA object found in {module.__name__}')
+        tea = teas[0]
+    return tea.system, tea
+
+def get_main_product(tea):
+    """Return the product with the highest market value (or None if no products are priced)."""
+    products = [i for i in tea.system.products if i.price and i.F_mass]
+    if not products: return None
+    return max(products, key=lambda i: i.price * i.F_mass)
+
+class RecycleIterationCounter:
+    """
+    Create a RecycleIterationCounter object that counts recycle loop
+    iterations of all systems and subsystems (which are reset at every
+    iteration of their parent system and cannot be counted with the
+    `_iter` attribute) while used as a context manager.
+
+    """
+    __slots__ = ('iterations', '_method')
+
+    def __init__(self):
+        self.iterations = 0
+
+    def __enter__(self):
+        from biosteam import System
+        self._method = method = System._iter_run_conditional
+        def _iter_run_conditional(system, data):
+            self.iterations += 1
+            return method(system, data)
+        System._iter_run_conditional = _iter_run_conditional
+        return self
+
+    def __exit__(self, type, exception, traceback):
+        from biosteam import System
+        System._iter_run_conditional = self._method
+
+def benchmark_case(name, warm_repeats=1):
+    """
+    Load, simulate, and evaluate the biorefinery of the benchmark case in
+    this process and return a dictionary of results. Any exception is
+    recorded in the 'Error' entry along with the results up to that point.
+    Import times are only cold in a new process (see `run_benchmarks`).
+
+    """
+    module_name, loader, args, kwargs = benchmark_cases[name]
+    results = {}
+    try:
+        time = perf_counter()
+        module = import_module(module_name)
+        results['Import [s]'] = perf_counter() - time
+        import biosteam as bst
+        if loader is None:
+            value = None
+        else:
+            time = perf_counter()
+            value = getattr(module, loader)(*args, **kwargs)
+            results['Build [s]'] = perf_counter() - time
+        system, tea = get_system_and_TEA(module, value)
+        system.reset_cache()
+        system.empty_recycles()
+        with RecycleIterationCounter() as counter:
+            time = perf_counter()
+            system.simulate()
+            results['First simulate [s]'] = perf_counter() - time
+        results['First simulate recycle iterations'] = counter.iterations
+        warm_times = []
+        for i in range(warm_repeats):
+            with RecycleIterationCounter() as counter:
+                time = perf_counter()
+                system.simulate()
+                warm_times.append(perf_counter() - time)
+        results['Warm simulate [s]'] = min(warm_times)
+        results['Warm simulate recycle iterations'] = counter.iterations
+        product = None if tea is None else get_main_product(tea)
+        if product is not None:
+            price = product.price
+            time = perf_counter()
+            tea.solve_price(product)
+            results['Solve price [s]'] = perf_counter() - time
+            product.price = price
+        HXNs = [i for i in system.facilities if isinstance(i, bst.HeatExchangerNetwork)]
+        if HXNs:
+            time = perf_counter()
+            for i in HXNs: i.simulate()
+            results['HXN [s]'] = perf_counter() - time
+    except Exception as error:
+        results['Error'] = f'{type(error).__name__}: {error}'
+    results['Peak RSS [MB]'] = get_peak_RSS()
+    return results
+
+def run_benchmarks(cases=None, warm_repeats=1, timeout=3600, verbose=True):
+    """
+    Run each benchmark case (all by default) in a new Python process and
+    return a dictionary of results by case.
+
+    """
+    import biorefineries
+    if cases is None: cases = benchmark_cases
+    root = os.path.dirname(os.path.dirname(biorefineries.__file__))
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([root, env.get('PYTHONPATH', '')])
+    results = {}
+    for name in cases:
+        if name not in benchmark_cases:
+            raise ValueError(f"no benchmark case {name!r}; valid cases are {list(benchmark_cases)}")
+        if verbose: print(f'Benchmarking {name} ...')
+        # Run this file as a script so that the biorefineries.tests package is not imported
+        command = [sys.executable, __file__, '--case', name, '--warm-repeats', str(warm_repeats)]
+        try:
+            process = subprocess.run(command, env=env, capture_output=True,
+                                     text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            results[name] = {'Error': f'TimeoutExpired: no results after {timeout} seconds'}
+            continue
+        for line in reversed(process.stdout.splitlines()):
+            if line.startswith(_results_marker):
+                results[name] = json.loads(line[len(_results_marker):])
+                break
+        else:
+            lines = process.stderr.strip().splitlines()
+            results[name] = {'Error': lines[-1] if lines else f'exit code {process.returncode}'}
+        if verbose: print(json.dumps(results[name], indent=4))
+    return results
+
+def get_versions():
+    import biosteam as bst
+    import thermosteam as tmo
+    import biorefineries
+    return {
+        'python': platform.python_version(),
+        'biosteam': bst.__version__,
+        'thermosteam': tmo.__version__,
+        'biorefineries': biorefineries.__version__,
+        'platform': platform.platform(),
+    }
+
+def save_baseline(results, file):
+    """Save benchmark results as a baseline (JSON) along with package versions."""
+    with open(file, 'w') as f:
+        json.dump({'versions': get_versions(), 'results': results}, f, indent=4)
+
+def load_baseline(file):
+    """Return benchmark results of a baseline (JSON) by case."""
+    with open(file) as f: return json.load(f)['results']
+
+def compare_to_baseline(results, baseline, threshold=0.2, min_changes=None):
+    """
+    Return a list of regressions of benchmark results with respect to the
+    baseline, each a tuple of case, metric, baseline value, and new value.
+    A metric regressed if it increased by more than the relative
+    threshold and by more than its minimum absolute change. Cases that fail
+    but did not fail in the baseline are also regressions (with the 'Error'
+    metric).
+
+    Parameters
+    ----------
+    results : dict[str, dict]
+        Benchmark results by case.
+    baseline : dict[str, dict]
+        Baseline benchmark results by case.
+    threshold : float, optional
+        Relative increase flagged as a regression. Defaults to 0.2.
+    min_changes : dict[str, float], optional
+        Minimum absolute change of each metric flagged as a regression.
+        Defaults to `compared_metrics`.
+
+    """
+    if min_changes is None: min_changes = compared_metrics
+    regressions = []
+    for case, case_results in results.items():
+        if case not in baseline: continue
+        case_baseline = baseline[case]
+        if 'Error' in case_results and 'Error' not in case_baseline:
+            regressions.append((case, 'Error', None, case_results['Error']))
+        for metric, min_change in min_changes.items():
+            old = case_baseline.get(metric)
+            new = case_results.get(metric)
+            if old is None or new is None: continue
+            if new > old * (1 + threshold) and new - old > min_change:
+                regressions.append((case, metric, old, new))
+    return regressions
+
+def _main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading, simulating, and evaluating biorefineries.'
+    )
+    parser.add_argument('cases', nargs='*', help='benchmark cases (all by default)')
+    parser.add_argument('--case', help=argparse.SUPPRESS) # Run a case in this process
+    parser.add_argument('--save', metavar='FILE', help='save results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare results to a baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative increase flagged as a regression (default 0.2)')
+    parser.add_argument('--warm-repeats', type=int, default=1,
+                        help='warm simulations to take the fastest of (default 1)')
+    parser.add_argument('--timeout', type=float, default=3600,
+                        help='maximum time per case in seconds (default 3600)')
+    args = parser.parse_args(argv)
+    if args.case:
+        results = benchmark_case(args.case, args.warm_repeats)
+        print(_results_marker + json.dumps(results))
+        return 0
+    results = run_benchmarks(args.cases or None, args.warm_repeats, args.timeout)
+    if args.save: save_baseline(results, args.save)
+    if args.compare:
+        regressions = compare_to_baseline(results, load_baseline(args.compare), args.threshold)
+        for case, metric, old, new in regressions:
+            print(f'REGRESSION {case} - {metric}: {old} -> {new}')
+        if regressions: return 1
+        print('No regressions.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main())
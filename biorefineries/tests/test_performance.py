@@ -0,0 +1,983 @@
+# -*- coding: utf-8 -*-
+# BioSTEAM: The Biorefinery Simulation and Techno-Economic Analysis Modules
+# Copyright (C) 2020, Yoel Cortes-Pena <yoelcortes@gmail.com>
+#
+# This module is under the UIUC open-source license. See
+# github.com/BioSTEAMDevelopmentGroup/biosteam/blob/master/LICENSE.txt
+# for license details.
+"""
+Regression benchmarks for the faster alternatives to the original
+(slower) algorithms. Each test checks that both paths give the same results
+and prints the time taken by each.
+"""
+import os
+os.environ["NUMBA_DISABLE_JIT"] = '1' # In case numba or numba cache not working properly
+import inspect
+import numpy as np
+import pytest
+from time import perf_counter
+
+__all__ = (
+    'test_IC_separate_solver',
+    'test_stoichiometry_arrays',
+    'test_batched_cashflow',
+    'test_cost_only_reuse',
+    'test_cost_only_dependent_setters',
+    'test_recycle_warm_start',
+    'test_parallel_evaluation',
+    'test_monte_carlo_tables',
+    'test_esterification_integration',
+    'test_BDO_Ks_surrogate',
+    'test_auto_waste_management_stream_index',
+    'test_HP_LCA_across_productivity',
+    'test_HP_LCA_cache',
+    'test_grid_evaluation',
+    'test_adaptive_grid_evaluation',
+    'test_compiled_load_statements',
+    'test_dirty_unit_tracker',
+    'test_convergence_recovery',
+    'test_biorefinery_snapshot',
+    'test_lazy_imports',
+    'test_perturbation_engine',
+    'test_BMP_shared_upstream',
+    'test_BMP_shared_upstream_small_system',
+    'test_titer_solver',
+    'test_ABM_TEA_batch',
+    'test_steam_injection',
+    'test_benchmark_biorefineries',
+    'test_unit_profiler',
+)
+
+def import_time_report(statement):
+    """
+    Return the modules imported by the statement in a new Python process and
+    their cumulative import time in microseconds (as reported by
+    `python -X importtime`).
+    
+    """
+    import sys
+    import subprocess
+    import biorefineries
+    env = os.environ.copy()
+    root = os.path.dirname(os.path.dirname(biorefineries.__file__))
+    env['PYTHONPATH'] = os.pathsep.join([root, env.get('PYTHONPATH', '')])
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                             env=env, capture_output=True, text=True, check=True)
+    report = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+        self_time, cumulative, module = line[12:].split('|')
+        report[module.strip()] = int(cumulative)
+    return report
+
+def timed(f, *args, **kwargs):
+    time = perf_counter()
+    value = f(*args, **kwargs)
+    return value, perf_counter() - time
+
+def test_IC_separate_solver():
+    wwt = pytest.importorskip('biorefineries.wwt', exc_type=ImportError)
+    try: wwt.load() # Submodules are imported lazily
+    except ImportError as e: pytest.skip(str(e))
+    IC = wwt.InternalCirculationRx
+    rng = np.random.default_rng(0)
+    time_sympy = time_analytical = 0.
+    for i in range(5):
+        Qi = rng.uniform(50, 500)
+        Qe = 0.99 * Qi
+        Si = rng.uniform(5, 40)
+        Se = Si * rng.uniform(0.02, 0.5)
+        run_inputs = (Qi, Si, rng.uniform(0.01, 5), Qe, Se, Qi*Si/rng.uniform(0.5, 5),
+                      rng.uniform(0.02, 0.2), rng.uniform(0.005, 0.05), 0.00083,
+                      rng.uniform(0.001, 0.5), rng.uniform(0.01, 0.5))
+        sympy_results, time = timed(IC._solve_separate_sympy, run_inputs)
+        time_sympy += time
+        analytical_results, time = timed(IC._solve_separate_analytical, run_inputs)
+        time_analytical += time
+        key = lambda result: result[3]
+        sympy_results = sorted([[float(j) for j in i] for i in sympy_results], key=key)
+        analytical_results = sorted(analytical_results, key=key)
+        assert len(sympy_results) == len(analytical_results)
+        if sympy_results: assert np.allclose(sympy_results, analytical_results, rtol=1e-6)
+    print(f'IC separate solver (sympy): {time_sympy:.3g} s')
+    print(f'IC separate solver (analytical): {time_analytical:.3g} s')
+
+def test_stoichiometry_arrays():
+    import thermosteam as tmo
+    from chemicals.elements import molecular_weight
+    from biorefineries.wwt import _utils
+    # New chemicals (not cached) and thermo so that chemicals of other biorefineries are not compiled
+    chemicals = tmo.Chemicals(['Water', 'Glucose', 'AceticAcid', 'Ethanol', 'NH3', 'CO2'])
+    thermo = tmo.Thermo(chemicals)
+    chemicals = thermo.chemicals
+    stream = tmo.Stream(None, Water=1000, Glucose=2, AceticAcid=3, Ethanol=1, NH3=0.5,
+                        CO2=0.2, units='kmol/hr', thermo=thermo)
+    # Original (uncached) algorithms
+    iCOD = np.array([-_utils.get_COD_stoichiometry(i)['O2'] for i in stream.chemicals])
+    COD = (stream.mol*iCOD).sum()*molecular_weight({'O': 2}) / stream.F_vol
+    C = sum([(i.atoms.get('C') or 0.)*12*stream.imol[i.ID] for i in stream.chemicals if i.formula])
+    N = sum([(i.atoms.get('N') or 0.)*14*stream.imol[i.ID] for i in stream.chemicals if i.formula])
+    assert np.allclose(_utils.compute_stream_COD(stream), COD, rtol=1e-12)
+    assert np.allclose(_utils.get_CN_ratio(stream), C/N, rtol=1e-12)
+    breakdown = _utils.get_COD_breakdown(stream)
+    assert set(breakdown['ID']) == {'Glucose', 'AceticAcid', 'Ethanol'}
+    assert np.allclose(breakdown['COD [mg/L]'].sum(), 1000 * COD, rtol=1e-12)
+    assert np.allclose(breakdown['ratio'].sum(), 1.)
+    assert [i.ID for i in _utils.get_digestable_chemicals(chemicals)] == [
+        i.ID for i in chemicals if _utils.get_COD_stoichiometry(i)['O2'] != 0
+    ]
+    BMP_stoichiometry = _utils.get_stoichiometry_arrays(chemicals)['BMP stoichiometry']
+    assert BMP_stoichiometry == {i.ID: _utils.get_BMP_stoichiometry(i) for i in chemicals}
+    assert _utils.get_stoichiometry_arrays(chemicals) is _utils.get_stoichiometry_arrays(chemicals)
+
+def test_batched_cashflow():
+    from biorefineries import cane
+    from biorefineries.tea import get_cashflow_inputs, BatchedCashFlowAnalysis
+    br = cane.Biorefinery('S1')
+    tea = br.tea
+    ethanol = br.ethanol
+    income_tax = tea.income_tax
+    price = ethanol.price
+    inputs = [get_cashflow_inputs(tea, ethanol)]
+    try:
+        for tea.income_tax in (0.21, 0.35):
+            batch = BatchedCashFlowAnalysis.from_inputs(tea, 10 * inputs)
+            assert np.allclose(batch.NPV, tea.NPV, rtol=1e-6, atol=1.)
+            assert np.allclose(batch.solve_price(), tea.solve_price(ethanol), rtol=1e-6)
+            ethanol.price = price
+            assert np.allclose(batch.solve_IRR(), tea.solve_IRR(), rtol=1e-5)
+        batch = BatchedCashFlowAnalysis.from_inputs(
+            tea, 10000 * inputs, income_tax=np.linspace(0.21, 0.35, 10000)
+        )
+        prices, time = timed(batch.solve_price)
+        print(f'Batched price solve (10000 samples): {time:.3g} s')
+        assert np.isfinite(prices).all()
+    finally:
+        tea.income_tax = income_tax
+        ethanol.price = price
+
+def test_cost_only_reuse():
+    from biorefineries import cane
+    derivative_disabled = cane.Biorefinery._derivative_disabled
+    cane.Biorefinery.disable_derivative()
+    br = cane.Biorefinery('S1')
+    model = br.model
+    reuse_condition = model.reuse_condition
+    cost = model.cost_mask
+    np.random.seed(0)
+    samples = np.repeat(model.sample(2, rule='L'), 3, axis=0)
+    samples[:, cost] = model.sample(6, rule='L')[:, cost]
+    samples = samples[[0, 3, 1, 4, 2, 5]]
+    N_parameters = len(model.parameters)
+    try:
+        model.load_samples(samples)
+        model.reset_counters()
+        _, time_reuse = timed(model.evaluate)
+        assert model.simulations == 2 and model.simulations_avoided == 4
+        reused = model.table.values[:, N_parameters:].copy()
+        model.reuse_condition = lambda: False
+        _, time_simulate = timed(model.evaluate)
+        simulated = model.table.values[:, N_parameters:]
+        assert np.allclose(reused, simulated, rtol=1e-3, equal_nan=True)
+    finally:
+        model.reuse_condition = reuse_condition
+        cane.Biorefinery._derivative_disabled = derivative_disabled
+    print(f'Cost-only samples (simulated): {time_simulate:.3g} s')
+    print(f'Cost-only samples (reused): {time_reuse:.3g} s')
+
+def test_cost_only_dependent_setters():
+    import biosteam as bst
+    from biorefineries import cane
+    bst.main_flowsheet.set_flowsheet('cost_only_dependent_setters')
+    thermo = bst.Thermo(bst.Chemicals(['Water'])) # Keep the thermo of other tests
+    feed = bst.Stream('feed', Water=100, thermo=thermo)
+    M1 = bst.Mixer('M1', feed, thermo=thermo)
+    sys = bst.System('sys', path=(M1,))
+    prices = {'crude': 0.}
+    model = cane.CostAwareModel(sys, [bst.Metric('Feed price', lambda: feed.price)])
+    @model.parameter(kind='coupled')
+    def set_flow(F_mol): feed.imol['Water'] = F_mol
+    @model.parameter(kind='cost')
+    def set_crude_price(price): prices['crude'] = price
+    @model.parameter(kind='cost')
+    def set_feed_price_offset(offset): feed.price = prices['crude'] + offset # Correlated to crude
+    model.load_samples(np.array([[100., 1., 0.5], [100., 5., 0.5], [100., 5., 1.]]))
+    model.evaluate()
+    assert model.simulations == 1 and model.simulations_avoided == 2
+    assert np.allclose(model.table.values[:, -1], [1.5, 5.5, 6.])
+
+def test_recycle_warm_start():
+    from biorefineries import cane
+    br = cane.Biorefinery('S1')
+    model = br.model
+    np.random.seed(0)
+    model.load_samples(model.sample(5, rule='L'))
+    N_parameters = len(model.parameters)
+    cache = cane.RecycleDataCache(br.sys, model.parameters, feedstock=br.feedstock)
+    _, time_cold = timed(model.evaluate, convergence_model=cache)
+    cold = model.table.values[:, N_parameters:].copy()
+    _, time_warm = timed(model.evaluate, convergence_model=cache)
+    warm = model.table.values[:, N_parameters:]
+    iterations = np.array(cache.iterations)
+    assert (iterations[5:] < iterations[:5]).all()
+    assert np.allclose(cold, warm, rtol=1e-3, equal_nan=True)
+    print(f'Recycle iterations (last solution): {iterations[:5].sum()} in {time_cold:.3g} s')
+    print(f'Recycle iterations (nearest sample): {iterations[5:].sum()} in {time_warm:.3g} s')
+
+def test_parallel_evaluation():
+    from biorefineries import cane
+    br = cane.Biorefinery('S1')
+    model = br.model
+    model.retry_evaluation = True
+    np.random.seed(1)
+    samples = model.sample(4, rule='L')
+    metrics = [i.index for i in model.metrics]
+    warm_start = cane.create_convergence_model(br, deterministic=True) # Shared with workers
+    model.load_samples(samples[::-1].copy())
+    model.evaluate(convergence_model=warm_start)
+    reversed_order = model.table[metrics].values[::-1].copy()
+    model.load_samples(samples)
+    _, time_serial = timed(model.evaluate, convergence_model=warm_start)
+    serial = model.table[metrics].values.copy()
+    model.load_samples(samples[:3]) # Samples are loaded again before saving results
+    table, time_parallel = timed(
+        cane.evaluate_samples_in_parallel, 'S1', samples, 2, deterministic=True
+    )
+    parallel = table[metrics].values
+    assert np.allclose(serial, reversed_order, rtol=1e-8, equal_nan=True)
+    assert np.allclose(serial, parallel, rtol=1e-8, equal_nan=True)
+    assert (table[[i.index for i in model.parameters]].values == samples).all()
+    # By default, workers simulate from their last converged state (agrees to convergence tolerance)
+    table = cane.evaluate_samples_in_parallel('S1', samples, 2)
+    assert np.allclose(serial, table[metrics].values, rtol=1e-3, equal_nan=True)
+    print(f'Deterministic evaluation (serial): {time_serial:.3g} s')
+    print(f'Deterministic evaluation (2 processes): {time_parallel:.3g} s')
+
+def test_monte_carlo_tables(tmp_path):
+    import pandas as pd
+    from pandas.testing import assert_frame_equal
+    from biorefineries import cane
+    np.random.seed(0)
+    columns = pd.MultiIndex.from_tuples(
+        [('Biorefinery', 'Crude oil price [USD/barrel]'), 
+         ('Oilcane', 'Oil content [dry wt. %]'),
+         ('Biorefinery', 'MFPP [USD/MT]'),
+         ('Biorefinery', 'GWP [kg*CO2-eq/MT]')],
+    )
+    table = pd.DataFrame(np.random.rand(1000, 4), columns=columns)
+    table.iloc[3, 2] = np.nan
+    file = str(tmp_path / 'S1.xlsx') # Only the .npy and .json files are written
+    cane.save_table(table, file)
+    assert not os.path.exists(file)
+    loaded, time_all = timed(cane.load_table, file)
+    assert_frame_equal(loaded, table)
+    subset = [('Biorefinery', 'GWP [kg*CO2-eq/MT]'), ('Oilcane', 'Oil content [dry wt. %]')]
+    loaded, time_subset = timed(cane.load_table, file, subset)
+    assert_frame_equal(loaded, table[subset])
+    with pytest.raises(KeyError):
+        cane.load_table(file, [('Biorefinery', 'ROI [%]')])
+    print(f'Monte Carlo table (all columns): {time_all:.3g} s; ({len(subset)} columns): {time_subset:.3g} s')
+
+def test_esterification_integration():
+    from biorefineries import lactic
+    lactic.load()
+    R402 = lactic.flowsheet.unit.R402
+    results = {}
+    times = {}
+    try:
+        for integration in ('ode', 'euler'):
+            R402.integration = integration
+            R402.X1 = R402._tau = None
+            _, times[integration] = timed(R402._run)
+            results[integration] = (R402.X1, R402.tau)
+    finally:
+        R402.integration = 'euler'
+    assert np.allclose(results['euler'], results['ode'], rtol=1e-3)
+    print(f"Esterification X1 and tau (euler): {times['euler']:.3g} s")
+    print(f"Esterification X1 and tau (ode): {times['ode']:.3g} s")
+
+def test_BDO_Ks_surrogate():
+    import importlib.util
+    import biorefineries
+    from scipy.interpolate import RBFInterpolator
+    # Load the module by file as BDO chemicals may fail to load with some thermosteam versions
+    file = os.path.join(os.path.dirname(biorefineries.__file__), 'BDO', 'BDO_interp.py')
+    module_spec = importlib.util.spec_from_file_location('BDO_interp', file)
+    BDO_interp = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(BDO_interp)
+    KsSurrogate = BDO_interp.KsSurrogate
+    oleyl_alcohol_ratio_mass_water = np.linspace(7., 24., 30)
+    glycerol_mf = np.linspace(1e-6, 0.157, 30)
+    X, Y = np.meshgrid(oleyl_alcohol_ratio_mass_water, glycerol_mf)
+    f = lambda x, y: np.stack([np.exp(-0.1*x) * (1 + y), 1 / (1 + x*y), 2 + y*y, 1e-5 * x * np.exp(y)], -1)
+    Ks = f(X, Y)
+    surrogate = KsSurrogate(oleyl_alcohol_ratio_mass_water, glycerol_mf, Ks)
+    rbf = RBFInterpolator(np.stack([X.ravel(), Y.ravel()], -1), Ks.reshape([-1, 4]))
+    rng = np.random.default_rng(0)
+    points = np.stack([rng.uniform(7., 24., 1000), rng.uniform(0., 0.157, 1000)], -1)
+    Ks_rbf, time_rbf = timed(rbf, points)
+    Ks_surrogate, time_surrogate = timed(surrogate, points)
+    Ks_exact = f(*points.T)
+    error = lambda Ks: np.abs(Ks / Ks_exact - 1).max(0)
+    assert (error(Ks_surrogate) < 1e-4).all()
+    assert (error(Ks_surrogate) <= error(Ks_rbf)).all()
+    assert np.allclose(surrogate(*points[0]), Ks_surrogate[0])
+    assert surrogate._rbf is None # Not needed within the grid
+    # Splines are clamped out of range; these points are extrapolated as before
+    points = np.array([[5., 0.05], [30., 0.05], [10., 0.2], [26., -0.01]])
+    assert surrogate.out_of_range(*points.T).all()
+    assert np.allclose(surrogate(points), rbf(points), rtol=1e-9, atol=1e-12)
+    assert np.allclose(surrogate(*points[1]), rbf(points[1:2])[0], rtol=1e-9, atol=1e-12)
+    points = np.array([[5., 0.05], [10., 0.05]])
+    Ks_mixed = surrogate(points)
+    assert np.allclose(Ks_mixed[0], rbf(points[:1])[0], rtol=1e-9, atol=1e-12)
+    assert np.allclose(Ks_mixed[1], surrogate(*points[1]))
+    print(f'BDO Ks interpolation (RBF): {time_rbf:.3g} s')
+    print(f'BDO Ks interpolation (spline): {time_surrogate:.3g} s')
+
+def test_auto_waste_management_stream_index():
+    import biosteam as bst
+    from biorefineries.make_a_biorefinery.auto_waste_management import AutoWasteManagement
+    bst.main_flowsheet.set_flowsheet('auto_waste_management_stream_index')
+    thermo = bst.Thermo(bst.Chemicals(['Water', 'Ethanol'])) # Keep the thermo of other tests
+    bst.Stream('S101_to_WWT', Water=10, thermo=thermo)
+    bst.Stream('S102_to_boiler', Ethanol=1, thermo=thermo)
+    M501 = bst.Mixer('M501', ins='mixed_wastewater', thermo=thermo)
+    M505 = bst.Mixer('M505', ins='mixed_solids', thermo=thermo)
+    thermo_default = getattr(bst.settings, '_thermo', None)
+    bst.settings.set_thermo(thermo) # The facility is created with the default thermo
+    try:
+        AWM = AutoWasteManagement('AWM', M501, M505, 'to_WWT', 'to_boiler')
+    finally:
+        if thermo_default is None: del bst.settings._thermo
+        else: bst.settings.set_thermo(thermo_default)
+    sys = bst.System('sys', path=(M501, M505), facilities=(AWM,))
+    loads = []
+    load_stream_index = AWM._load_stream_index
+    def count_loads():
+        loads.append(None)
+        load_stream_index()
+    AWM._load_stream_index = count_loads
+    sys.simulate()
+    assert len(loads) == 1
+    assert M501.outs[0].imol['Water'] == 10. and M505.outs[0].imol['Ethanol'] == 1.
+    sys.simulate()
+    assert len(loads) == 1 # Reused
+    stream = bst.Stream('S103_to_WWT', Water=5, thermo=thermo)
+    sys.simulate()
+    assert len(loads) == 2 # Rebuilt with the new stream
+    assert M501.outs[0].imol['Water'] == 15.
+    stream.ID = 'S103_recycled'
+    sys.simulate()
+    assert len(loads) == 3 # Rebuilt with the renamed stream
+    assert M501.outs[0].imol['Water'] == 10.
+    sys.simulate()
+    assert len(loads) == 3
+
+def test_HP_LCA_across_productivity():
+    try:
+        from biorefineries.HP import system_light_lle_vacuum_distillation as HP
+    except Exception: # HP chemicals may fail to load with some thermosteam versions
+        pytest.skip('HP biorefinery not available')
+    spec, HP_lca = HP.spec, HP.HP_lca
+    metrics = [lambda: HP_lca.GWP, lambda: HP_lca.FEC]
+    try:
+        (GWP_low, GWP_high), (FEC_low, FEC_high) = spec.evaluate_across_productivity(metrics, [0.2, 1.5])
+        HP_lca.invalidate()
+        assert GWP_low != GWP_high and FEC_low != FEC_high # Reactor power changes with productivity
+        assert HP_lca.GWP == GWP_high and HP_lca.FEC == FEC_high
+    finally:
+        spec.load_spec_3(spec.baseline_productivity)
+        spec.reactor._summary()
+        HP_lca.invalidate()
+
+def test_HP_LCA_cache():
+    import importlib.util
+    import biosteam as bst
+    import biorefineries
+    # Load the LCA module by file as the HP package may fail to import (see above)
+    file = os.path.join(os.path.dirname(biorefineries.__file__), 'HP', 'lca.py')
+    module_spec = importlib.util.spec_from_file_location('HP_lca', file)
+    lca_module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(lca_module)
+    bst.main_flowsheet.set_flowsheet('HP_LCA_cache')
+    thermo = bst.Thermo(bst.Chemicals(['Water', 'Glucose', 'Ethanol'])) # Keep the thermo of other tests
+    IDs = [i.ID for i in thermo.chemicals]
+    sugar = bst.Stream('sugar', Water=90, Glucose=10, units='kg/hr', price=0.1, thermo=thermo)
+    ethanol = bst.Stream('ethanol', Ethanol=5, units='kg/hr', price=0.5, thermo=thermo)
+    M1 = bst.Mixer('M1', (sugar, ethanol), 'product', thermo=thermo)
+    product = M1.outs[0]
+    product.price = 1.
+    sys = bst.System('sys', path=(M1,))
+    glucose = [10.]
+    def load_glucose(): sugar.imass['Glucose'] = glucose[0]
+    sys.add_specification(load_glucose, simulate=True)
+    # Only the attributes used by material GWP (the HP LCA needs the full biorefinery)
+    lca = lca_module.LCA.__new__(lca_module.LCA)
+    lca.system = sys
+    lca.BT_sys = None
+    lca.chem_IDs = IDs
+    lca.LCA_stream = bst.Stream(None, thermo=thermo)
+    lca.GWP_CF_stream = bst.Stream(None, Water=0.1, Glucose=2., Ethanol=3., units='kg/hr', thermo=thermo)
+    lca.main_product = product
+    lca._setup_cache(sys)
+    assert sys.specifications[0].f == lca._new_simulation_version # Runs before other specifications
+    def material_GWP(): # Original algorithm (sum by chemical)
+        stream = bst.Stream(None, thermo=thermo)
+        stream.mix_from([sugar, ethanol])
+        return sum([stream.imass[i] * lca.GWP_CF_stream.imass[i] for i in IDs]) / product.F_mass
+    sys.simulate()
+    assert lca.simulation_version == 1
+    GWP = lca.material_GWP
+    misses = lca.cache_misses
+    assert lca.material_GWP == GWP and lca.cache_misses == misses # Reused
+    assert np.allclose(GWP, material_GWP())
+    breakdown = lca.material_GWP_breakdown
+    breakdown.clear()
+    assert lca.material_GWP_breakdown # Copies are returned
+    glucose[0] = 20.
+    sys.simulate()
+    assert lca.simulation_version == 2
+    assert lca.material_GWP != GWP and np.allclose(lca.material_GWP, material_GWP())
+    GWP = lca.material_GWP
+    lca.GWP_CF_stream.imass['Glucose'] = 4. # Not simulated (e.g., only the reactor is updated)
+    assert lca.material_GWP == GWP
+    lca.invalidate()
+    assert lca.material_GWP != GWP and np.allclose(lca.material_GWP, material_GWP())
+
+class GridSpecification:
+    # Mimics the bookkeeping of ProcessSpecification objects in TRY analyses
+    
+    def __init__(self):
+        self.count = self.count_exceptions = 0
+        self.HXN_intolerable_points = []
+        self.exceptions_dict = {}
+    
+    def evaluate_at_point(self, system, spec_1, spec_2, metrics, spec_3):
+        self.count += 1
+        if spec_1 > spec_2: raise RuntimeError('infeasible point')
+        if spec_1 == spec_2: 
+            self.HXN_intolerable_points.append((spec_1, spec_2))
+            return np.nan * np.ones([len(metrics), len(spec_3)])
+        return np.array([[i(spec_1, spec_2, j) for j in spec_3] for i in metrics])
+
+grid_metrics = [lambda x, y, z: x * y + z, lambda x, y, z: x - y * z]
+
+def load_grid_specification():
+    return GridSpecification(), None, grid_metrics
+
+def test_grid_evaluation(tmp_path):
+    from biorefineries.process_tools import GridEvaluation
+    spec_1, spec_2 = np.meshgrid(np.linspace(0, 1, 6), np.linspace(0, 1, 6))
+    spec_3 = np.array([1., 2.])
+    expected = np.array(
+        [[[[i(x, y, z) for z in spec_3] for i in grid_metrics] 
+          for x, y in zip(r1, r2)] for r1, r2 in zip(spec_1, spec_2)]
+    )
+    expected[spec_1 >= spec_2] = np.nan
+    serial = GridEvaluation(GridSpecification(), None, spec_1, spec_2, grid_metrics, spec_3)
+    assert np.allclose(serial.evaluate(), expected, equal_nan=True)
+    path = str(tmp_path / 'TRY')
+    spec = GridSpecification()
+    parallel = GridEvaluation(spec, None, spec_1, spec_2, grid_metrics, spec_3, 
+                              path=path, loader=load_grid_specification)
+    assert np.allclose(parallel.evaluate(processes=2), expected, equal_nan=True)
+    telemetry = parallel.telemetry()
+    assert telemetry['Failed'] == 15 and telemetry['Infeasible'] == 6
+    assert len(parallel.errors) == 15 and spec.count == 36
+    assert sorted(spec.HXN_intolerable_points) == sorted(zip(np.diag(spec_1), np.diag(spec_2)))
+    # Resume (only failed points are evaluated again)
+    resumed = GridEvaluation(GridSpecification(), None, spec_1, spec_2, grid_metrics, spec_3, path=path)
+    assert resumed.pending.size == 15
+    resumed.evaluate()
+    assert resumed.spec.count == 15
+    assert np.allclose(np.load(path + '.npy'), expected, equal_nan=True)
+    with pytest.raises(ValueError):
+        GridEvaluation(GridSpecification(), None, spec_1, spec_2, grid_metrics, 2 * spec_3, path=path)
+
+class SugarLimitedSpecification:
+    # Infeasible sugar concentrations at low yields and high titers
+    
+    def __init__(self, last_infeasible_simulation):
+        self.last_infeasible_simulation = last_infeasible_simulation
+    
+    def evaluate_at_point(self, system, spec_1, spec_2, metrics, spec_3):
+        if spec_2 > 50 + 300 * spec_1 ** 2:
+            self.last_infeasible_simulation[:] = (spec_1, spec_2)
+            return np.nan * np.ones([len(metrics), len(spec_3)])
+        return np.array([[i(spec_1, spec_2, j) for j in spec_3] for i in metrics])
+
+def test_adaptive_grid_evaluation():
+    from biorefineries.process_tools import GridEvaluation, AdaptiveGridEvaluation
+    spec_1, spec_2 = np.meshgrid(np.linspace(0.05, 0.95, 40), np.linspace(5, 330, 40))
+    spec_3 = np.array([1.])
+    metrics = [lambda x, y, z: 1000 / (x * y ** 0.5) + z, lambda x, y, z: x * y + z]
+    levels = np.arange(0, 2000, 100)
+    last_infeasible_simulation = []
+    spec = SugarLimitedSpecification(last_infeasible_simulation)
+    full = GridEvaluation(spec, None, spec_1, spec_2, metrics, spec_3).evaluate()
+    evaluation = AdaptiveGridEvaluation(
+        spec, None, spec_1, spec_2, metrics, spec_3, levels=[levels, None],
+        infeasible_simulations=last_infeasible_simulation,
+    )
+    adaptive = evaluation.evaluate()
+    assert adaptive.shape == full.shape
+    feasible = ~np.isnan(full[..., 0, 0])
+    assert (feasible == ~np.isnan(adaptive[..., 0, 0])).all()
+    assert (np.digitize(adaptive[..., 0, 0][feasible], levels) 
+            == np.digitize(full[..., 0, 0][feasible], levels)).all()
+    assert np.allclose(adaptive[..., 1, 0], full[..., 1, 0], equal_nan=True) # Bilinear
+    report = evaluation.report()
+    assert report['Inferred infeasible'] > 0 and report['Fraction saved'] > 0.5
+    print(f"Adaptive TRY grid: {report['Simulations']} of {report['Points']} points simulated")
+
+def test_compiled_load_statements():
+    import pandas as pd
+    from biorefineries.TAL.model_utils import EasyInputModel
+    class Element: a = b = 0.
+    element = Element()
+    namespace_dict = {'element': element}
+    distributions = pd.DataFrame({
+        'Parameter name': ['A', 'B'], 'Element': ['Element', 'Element'], 
+        'Kind': ['coupled', 'coupled'], 'Units': ['-', '-'], 'Baseline': [1., 2.],
+        'Shape': ['Uniform', 'Triangular'], 'Lower': [0., 1.], 'Midpoint': [0.5, 2.], 
+        'Upper': [1., 3.], 'Load Statements': ['element.a = x', 'y = 2 * x\nelement.b = y + max(x, 0)'],
+    })
+    model = EasyInputModel(None, namespace_dict=namespace_dict)
+    model.load_parameter_distributions(distributions)
+    for i in model.parameters: i.setter(3.)
+    assert element.a == 3. and element.b == 9.
+    distributions.loc[1, 'Load Statements'] = 'element.b = z * x'
+    with pytest.raises(NameError, match='B: z'):
+        EasyInputModel(None, namespace_dict=namespace_dict).load_parameter_distributions(distributions)
+    setter = model.parameters[1].setter
+    def exec_statement(x):
+        namespace_dict['x'] = x
+        exec('y = 2 * x;element.b = y + max(x, 0)', namespace_dict)
+    _, time_exec = timed(lambda: [exec_statement(1.) for i in range(5000)])
+    _, time_compiled = timed(lambda: [setter(1.) for i in range(5000)])
+    print(f'Load statements (exec source): {time_exec:.3g} s')
+    print(f'Load statements (compiled): {time_compiled:.3g} s')
+
+def test_dirty_unit_tracker():
+    import biosteam as bst
+    from biosteam.evaluation import Model
+    from biorefineries.process_tools import DirtyUnitTracker
+    bst.main_flowsheet.set_flowsheet('dirty_unit_tracker')
+    bst.settings.set_thermo(['Water', 'Ethanol'], cache=True)
+    feed = bst.Stream('feed', Water=100, Ethanol=10)
+    other_feed = bst.Stream('other_feed', Water=50)
+    H1 = bst.HXutility('H1', feed, T=350)
+    M1 = bst.Mixer('M1', (H1-0, other_feed))
+    H2 = bst.HXutility('H2', M1-0, T=300)
+    sys = bst.System('sys', path=(H1, M1, H2))
+    model = Model(sys)
+    @model.parameter(element=H1, bounds=(330, 360), baseline=350)
+    def set_H1_temperature(T): H1.T = T
+    @model.parameter(element=other_feed, bounds=(25, 75), baseline=50)
+    def set_other_feed_water(water): other_feed.imol['Water'] = water
+    model.metric(lambda: H2.outs[0].F_mass, 'Outlet flow')
+    model.metric(lambda: H2.net_duty, 'H2 duty')
+    tracker = DirtyUnitTracker(model, sys.units, log=True)
+    model.specification = lambda: [tracker.simulate_dirty_units(), sys.simulate()]
+    samples = np.array([[340, 25], [340, 50], [340, 75], [355, 75]])
+    model.load_samples(samples)
+    _, time_tracked = timed(model.evaluate)
+    tracked = model.table.values[:, 2:].copy()
+    assert [i['Skipped'] for i in tracker.records] == [[], ['H1'], ['H1'], []]
+    model.specification = lambda: [[i.simulate() for i in sys.units], sys.simulate()]
+    _, time_full = timed(model.evaluate)
+    assert np.allclose(tracked, model.table.values[:, 2:])
+    print(f'Pre-simulated units (all): {time_full:.3g} s')
+    print(f'Pre-simulated units (dirty only): {time_tracked:.3g} s, {tracker.report()}')
+
+def test_convergence_recovery():
+    from biorefineries.process_tools import ConvergenceRecovery
+    class System: # Only converges with aitken above a titer of 100 g/L
+        converge_method = 'wegstein'
+        simulations = 0
+        titer = 50
+        def reset_cache(self): pass
+        def empty_recycles(self): pass
+        def simulate(self):
+            self.simulations += 1
+            if self.titer > 100 and self.converge_method != 'aitken':
+                raise RuntimeError('recycle did not converge')
+    def load(titer): system.titer = titer
+    def barrage(system, titer): # Original bugfix barrage
+        for method in ('wegstein', 'fixedpoint', 'aitken'):
+            system.converge_method = method
+            try:
+                if method == 'wegstein': system.titer = 50; system.simulate()
+                load(titer); system.simulate()
+            except RuntimeError: continue
+            else: break
+        system.converge_method = 'wegstein'
+    titers = np.linspace(110, 150, 10)
+    system = System()
+    for titer in titers: barrage(system, titer)
+    simulations_barrage = system.simulations
+    system = System()
+    recovery = ConvergenceRecovery(verbose=False)
+    for titer in titers:
+        recovery.recover(system, lambda: load(titer), [0.5, titer], lambda: load(50))
+        assert system.converge_method == 'wegstein' and system.titer == titer
+    simulations_recovery = system.simulations
+    report = recovery.report()
+    assert report['Recovered'] == 10 and report['Attempts'] == 12
+    assert simulations_recovery < simulations_barrage
+    with pytest.raises(RuntimeError):
+        ConvergenceRecovery([('reset', 'fixedpoint')], verbose=False).recover(
+            system, lambda: load(120)
+        )
+    assert system.converge_method == 'wegstein'
+    # Points with an array of productivities (as in evaluate_across_specs)
+    productivities = np.array([0.76, 1.5])
+    for titer in titers:
+        recovery.recover(system, lambda: load(titer), (0.5, titer, productivities), lambda: load(50))
+    assert recovery.history[-1][0] == (0.5, titers[-1], 0.76, 1.5)
+    print(f'Bugfix barrage simulations (fixed order): {simulations_barrage}')
+    print(f'Bugfix barrage simulations (learned order): {simulations_recovery}')
+
+def test_biorefinery_snapshot(tmp_path):
+    import pickle
+    from biorefineries import cane
+    cane.Biorefinery('S1', cache=None) # Load thermodynamic property caches
+    br, time_cold = timed(cane.Biorefinery, 'S1', cache=None, snapshot_folder=tmp_path)
+    iterations_cold = cane.get_recycle_iterations(br.sys)
+    cold = br.model.metrics_at_baseline()
+    file, = tmp_path.glob('*.pkl')
+    br, time_warm = timed(cane.Biorefinery, 'S1', cache=None, snapshot_folder=tmp_path)
+    iterations_warm = cane.get_recycle_iterations(br.sys)
+    warm = br.model.metrics_at_baseline()
+    assert iterations_warm < iterations_cold
+    assert np.allclose(cold, warm, rtol=1e-2, equal_nan=True)
+    file.write_bytes(b'corrupted') # Invalid snapshots are simulated cold and saved again
+    br = cane.Biorefinery('S1', cache=None, snapshot_folder=tmp_path)
+    assert isinstance(pickle.loads(file.read_bytes()), cane.BiorefinerySnapshot)
+    income_tax_range = cane.Biorefinery.default_income_tax_range
+    cane.Biorefinery.default_income_tax_range = [25, 28] # Changed defaults do not load stale snapshots
+    try: cane.Biorefinery('S1', cache=None, snapshot_folder=tmp_path)
+    finally: cane.Biorefinery.default_income_tax_range = income_tax_range
+    assert len(list(tmp_path.glob('*.pkl'))) == 2
+    print(f'Biorefinery S1 (cold): {time_cold:.3g} s, {iterations_cold} recycle iterations')
+    print(f'Biorefinery S1 (snapshot): {time_warm:.3g} s, {iterations_warm} recycle iterations')
+
+def test_lazy_imports():
+    for package, heavy in [('biorefineries.cane', 'biosteam'),
+                           ('biorefineries.wwt', 'thermosteam')]:
+        report = import_time_report(f'import {package}')
+        assert heavy not in report
+        print(f'{package} (lazy): {report[package] / 1e6:.3g} s')
+    report = import_time_report('from biorefineries import cane; cane.Biorefinery')
+    assert 'biosteam' in report and 'biorefineries.cane.biorefinery' in report
+    slowest = sorted(report.items(), key=lambda x: x[1], reverse=True)[:10]
+    print('biorefineries.cane (loaded):')
+    for module, cumulative in slowest: print(f'  {module}: {cumulative / 1e6:.3g} s')
+
+def test_perturbation_engine():
+    from biorefineries import cane
+    derivative_disabled = cane.Biorefinery._derivative_disabled
+    cane.Biorefinery.enable_derivative()
+    br = cane.Biorefinery('O3')
+    br.ROI_target = 10.
+    model = br.model
+    engine = br.perturbation_engine
+    metrics = {(i.name, i.element): i for i in model.metrics}
+    cost = model.cost_mask
+    np.random.seed(0)
+    samples = np.repeat(model.sample(2, rule='L'), 2, axis=0)
+    samples[:, cost] = model.sample(4, rule='L')[:, cost]
+    N_parameters = len(model.parameters)
+    try:
+        model.load_samples(samples)
+        _, time_shared = timed(model.evaluate)
+        report = engine.report()
+        assert report['Evaluations'] == 4 and report['Simulations'] == 4 # Cost-only samples reuse perturbed states
+        shared = model.table.values[:, N_parameters:].copy()
+        derivative = shared[-1, model.metrics.index(metrics['MFPP derivative', None])]
+        MFPP = metrics['MFPP', None]
+        perturbation = engine.perturbations['Oil content']
+        perturbation.apply() # Original algorithm (perturb and simulate from the last state)
+        try:
+            _, time_perturbed = timed(br.sys.simulate)
+            assert np.allclose(MFPP.getter() - MFPP.cache, derivative, rtol=0.05)
+        finally:
+            perturbation.revert()
+        cane.Biorefinery.disable_derivative()
+        br.ROI_target = None
+        model.evaluate()
+        unperturbed = model.table.values[:, N_parameters:]
+        for key in [('ROI', None), ('Breakeven IRR', None), ('MFPP', None)]: # Base state is restored
+            index = model.metrics.index(metrics[key])
+            assert np.allclose(shared[:, index], unperturbed[:, index], rtol=1e-3)
+    finally:
+        cane.Biorefinery._derivative_disabled = derivative_disabled
+    print(f'Oil content perturbation (original, per sample): {time_perturbed:.3g} s')
+    print(f'Shared perturbations (4 samples): {report["Time [s]"]:.3g} s of {time_shared:.3g} s')
+    for name, summary in report['By perturbation'].items():
+        print(f'  {name}: {summary["Simulations"]} simulations, '
+              f'{summary["Time per value [s]"]:.3g} s per value')
+
+def test_BMP_shared_upstream():
+    wwt = pytest.importorskip('biorefineries.wwt', exc_type=ImportError)
+    try: wwt.load() # Submodules are imported lazily
+    except ImportError as e: pytest.skip(str(e))
+    from biorefineries.wwt._model import set_BMP
+    from biorefineries.wwt.sugarcane1g import create_sc1g_comparison_models
+    exist_model, new_model = create_sc1g_comparison_models()
+    new_sys_wwt = new_model.system.flowsheet.system.new_sys_wwt
+    BMPs = (0.5, 0.9)
+    new_model.load_samples(new_model.sample(N=3, seed=3221, rule='L'))
+    N_parameters = len(new_model.parameters)
+    tables, time_shared = timed(wwt.evaluate_across_BMP, new_model, new_sys_wwt, BMPs)
+    time_full = 0.
+    for BMP, table in zip(BMPs, tables):
+        set_BMP(new_sys_wwt, BMP)
+        _, time = timed(new_model.evaluate)
+        time_full += time
+        shared = table.values[:, N_parameters:].astype(float)
+        full = new_model.table.values[:, N_parameters:].astype(float)
+        assert np.allclose(shared, full, rtol=1e-2, equal_nan=True)
+    print(f'BMP evaluation (full system): {time_full:.3g} s')
+    print(f'BMP evaluation (shared upstream): {time_shared:.3g} s')
+
+def test_BMP_shared_upstream_small_system():
+    import biosteam as bst
+    from chaospy import distributions as shape
+    from biorefineries.wwt import _utils # Unlike the WWT systems, it does not need WastewaterSystemCost
+    bst.main_flowsheet.set_flowsheet('BMP_shared_upstream')
+    thermo = bst.Thermo(bst.Chemicals(['Water', 'Glucose', 'Ethanol'])) # Keep the thermo of other tests
+    class Digester(bst.Unit): # Converts a fraction (i.e., the BMP) of glucose
+        _N_ins = _N_outs = 1
+        Y_biogas = 0.5
+        def _refresh_rxns(self): pass
+        def _run(self):
+            effluent, = self.outs
+            effluent.copy_like(self.ins[0])
+            converted = self.Y_biogas * effluent.imol['Glucose']
+            effluent.imol['Glucose'] -= converted
+            effluent.imol['Ethanol'] += 2 * converted
+    feed = bst.Stream('feed', Water=1000, Glucose=10, T=350., thermo=thermo)
+    recycle = bst.Stream('recycle', thermo=thermo)
+    M1 = bst.Mixer('M1', (feed, recycle), thermo=thermo)
+    S1 = bst.Splitter('S1', M1-0, ('to_wwt', recycle), split=0.5, thermo=thermo)
+    upstream_runs = []
+    @S1.add_specification(run=True)
+    def count_runs(): upstream_runs.append(S1)
+    R1 = Digester('R1', S1-0, thermo=thermo)
+    H1 = bst.HXutility('H1', R1-0, T=310., thermo=thermo)
+    S2 = bst.Splitter('S2', H1-0, split=0.9, thermo=thermo)
+    upstream_sys = bst.System('upstream_sys', path=(M1, S1), recycle=recycle)
+    wwt_sys = bst.System('wwt_sys', path=(R1,))
+    sys = bst.System('sys', path=(upstream_sys, wwt_sys, H1), facilities=(S2,))
+    model = bst.Model(sys, [
+        bst.Metric('Ethanol', lambda: H1.outs[0].imol['Ethanol'], 'kmol/hr'),
+        bst.Metric('Duty', lambda: H1.Hnet, 'kJ/hr'),
+        bst.Metric('Split ethanol', lambda: S2.outs[0].imol['Ethanol'], 'kmol/hr'), # Facility
+    ])
+    @model.parameter(distribution=shape.Uniform(5, 20), units='kmol/hr')
+    def set_glucose(glucose): feed.imol['Glucose'] = glucose
+    assert _utils.get_wwt_tail(sys, wwt_sys) == [H1]
+    np.random.seed(0)
+    model.load_samples(model.sample(3, rule='L'))
+    BMPs = (0.5, 0.9)
+    tables = _utils.evaluate_across_BMP(model, wwt_sys, BMPs)
+    runs_shared = len(upstream_runs)
+    upstream_runs.clear()
+    for BMP, table in zip(BMPs, tables):
+        _utils.set_BMP(wwt_sys, BMP)
+        model.evaluate()
+        assert np.allclose(table.values[:, 1:], model.table.values[:, 1:], rtol=1e-6)
+    assert runs_shared == len(upstream_runs) / 2 # Upstream units only converged at the first BMP
+    assert not np.allclose(tables[0].values, tables[1].values)
+
+def test_titer_solver():
+    import biosteam as bst
+    import flexsolve as flx
+    from biorefineries import cane
+    br = cane.Biorefinery('S1')
+    units = br.sys.units
+    R301, = [i for i in units if hasattr(i, 'get_titer')]
+    F301, = [i for i in R301.get_upstream_units() if isinstance(i, bst.MultiEffectEvaporator)]
+    path = F301.path_until(R301, inclusive=True)
+    stats = R301.titer_solver_stats
+    titer = R301.titer
+    path_runs = []
+    def f(V): 
+        path_runs.append(V)
+        F301.V = V
+        for i in path: i._run() if i is F301 else i.run()
+        return R301.titer - R301.get_titer()
+    try:
+        for R301.titer in (100., titer, 130.):
+            _, time_solver = timed(F301.run)
+            V = F301.V
+            path_evaluations = stats['Last path evaluations']
+            assert abs(R301.get_titer() - R301.titer) < 1e-3
+            assert path_evaluations <= 5
+            path_runs.clear()
+            V_original, time_original = timed( # Original algorithm (bracketed solver with path runs)
+                flx.IQ_interpolation, f, 0., 0.5, ytol=1e-3, xtol=1e-9, maxiter=20, checkiter=False
+            )
+            assert np.allclose(V, V_original, rtol=1e-3)
+            print(f'Titer of {R301.titer:.0f} g/L: {len(path_runs)} path runs with '
+                  f'a bracketed solver in {time_original:.3g} s; {path_evaluations} '
+                  f'with the titer solver in {time_solver:.3g} s')
+    finally:
+        R301.titer = titer
+        br.sys.simulate()
+
+def test_ABM_TEA_batch():
+    try:
+        from biorefineries.abm import cornstover as abm
+    except Exception: # The ABM model may fail to load with some biosteam versions
+        pytest.skip('ABM cornstover module not available')
+    abm.ABM_TEA_function(1.0) # Converge from the same state
+    abm.mass_balance_points.clear()
+    scenarios = [
+        dict(cornstover_fraction=1.0, price_cornstover=0.06, IRR=0.15),
+        dict(cornstover_fraction=1.0, price_ethanol=0.9, start_year=2010),
+        dict(cornstover_fraction=0.5, operating_days=330, plant_capacity=8e8),
+    ]
+    kwargs = {i: [j.get(i, k.default) for j in scenarios] 
+              for i, k in inspect.signature(abm.ABM_TEA_batch).parameters.items()
+              if i != 'cornstover_fractions'}
+    metrics, time_batch = timed(abm.ABM_TEA_batch, **kwargs)
+    assert len(abm.mass_balance_points) == 2 # One simulation per mass balance point
+    time_original = 0.
+    for i, scenario in enumerate(scenarios): # Original algorithm (simulate each scenario)
+        scenario['duration'] = (scenario.pop('start_year', 2007), 2037)
+        original, time = timed(abm.ABM_TEA_function, **scenario)
+        time_original += time
+        for name, value in original.items():
+            assert np.allclose(metrics[name][i], value, rtol=5e-3) # Within convergence tolerance
+    # Interpolated metrics match at the cornstover fractions simulated
+    interpolated = abm.ABM_TEA_batch(**kwargs, cornstover_fractions=[0., 0.5, 1.])
+    assert np.allclose(interpolated, metrics)
+    assert len(abm.mass_balance_points) == 2 # No new simulations
+    interpolated = abm.ABM_TEA_batch([0.5, 0.75, 1.], cornstover_fractions=[0.5, 1.])
+    linear = interpolated[['TCI', 'VOC', 'FOC', 'Production']] # Not solved at the feedstock price
+    assert np.allclose(linear.iloc[1], linear.iloc[[0, 2]].mean())
+    N = 10000
+    np.random.seed(0)
+    _, time_queries = timed(
+        abm.ABM_TEA_batch,
+        cornstover_fraction=np.random.uniform(0, 1, N),
+        price_cornstover=np.random.uniform(0.04, 0.07, N),
+        IRR=np.random.uniform(0.05, 0.15, N),
+        cornstover_fractions=np.linspace(0, 1, 11),
+    )
+    print(f'ABM TEA (3 scenarios): {time_original:.3g} s original; {time_batch:.3g} s batched')
+    print(f'ABM TEA ({N} queries, {len(abm.mass_balance_points)} simulations): {time_queries:.3g} s')
+
+def test_steam_injection():
+    import biosteam as bst
+    import flexsolve as flx
+    from biorefineries.corn import units
+    from biorefineries.corn.chemicals import create_chemicals
+    from biorefineries.process_tools import SteamInjection
+    bst.settings.set_thermo(create_chemicals())
+    feed = bst.Stream(None, Water=2700, Starch=300, Fiber=40, units='kmol/hr', T=360., P=2e6)
+    high_pressure_steam = bst.HeatUtility.get_agent('high_pressure_steam')
+    steam = bst.Stream(None, Water=1, phase='g', T=high_pressure_steam.T, P=high_pressure_steam.P)
+    E313 = units.JetCooker(None, (feed, steam))
+    effluent, = E313.outs
+    feed_temperatures = np.linspace(330., 370., 50)
+    def T_at_flow(steam_mol):
+        steam.imol['Water'] = abs(steam_mol)
+        effluent.mol[:] = steam.mol + feed.mol
+        effluent.H = feed.H + steam.H
+        return effluent.T - E313.T
+    def original(): # Original algorithm (secant method on temperature)
+        steam_mol = feed.F_mol / 100.
+        effluent.T = E313.T
+        return flx.aitken_secant(T_at_flow, steam_mol, 1/8 * steam_mol + 1.,
+                                 1e-4, 1e-4, checkroot=False)
+    times = {}
+    flows = {}
+    for name, f in [('original', original), ('Newton', E313._run)]:
+        flows[name] = []
+        time = perf_counter()
+        for feed.T in feed_temperatures:
+            f()
+            flows[name].append(steam.F_mol)
+            assert abs(effluent.T - E313.T) < 1e-3
+        times[name] = perf_counter() - time
+    assert np.allclose(flows['original'], flows['Newton'], rtol=1e-6)
+    assert E313.steam_injection.solutions['Secant'] == 0
+    # Steam mixers (constant latent heat of steam; outlet at the saturation temperature)
+    P = 5.5 * 101325
+    T = feed.chemicals.Water.Tsat(P)
+    def P_at_flow(mol_water):
+        steam.imol['Water'] = mol_water
+        effluent.mol[:] = steam.mol + feed.mol
+        effluent.H = feed.H + mol_water * 40798
+        return P - feed.chemicals.Water.Psat(effluent.T)
+    feed.T = 350.
+    steam_mol = flx.aitken_secant(P_at_flow, 100., 100.1, 1e-4, 1e-4)
+    assert np.allclose(SteamInjection(steam_enthalpy=40798)(feed, steam, effluent, T), steam_mol, rtol=1e-6)
+    print(f'Jet cooker ({feed_temperatures.size} runs): {times["original"]:.3g} s original; '
+          f'{times["Newton"]:.3g} s with Newton steps')
+
+def test_benchmark_biorefineries(tmp_path):
+    from biorefineries.tests import benchmark_biorefineries as bb
+    results = bb.run_benchmarks(['cornstover'], verbose=False)
+    cornstover = results['cornstover']
+    if 'Error' in cornstover: pytest.skip(f"cornstover not available: {cornstover['Error']}")
+    for metric in ('Import [s]', 'Build [s]', 'First simulate [s]', 'Warm simulate [s]',
+                   'First simulate recycle iterations', 'Peak RSS [MB]'):
+        assert cornstover[metric] > 0
+    file = str(tmp_path / 'baseline.json')
+    bb.save_baseline(results, file)
+    baseline = bb.load_baseline(file)
+    assert baseline == results
+    assert not bb.compare_to_baseline(results, baseline)
+    slower = {'cornstover': {**cornstover, 'First simulate [s]': 2 * cornstover['First simulate [s]'] + 1}}
+    assert bb.compare_to_baseline(slower, baseline) == [
+        ('cornstover', 'First simulate [s]', cornstover['First simulate [s]'],
+         slower['cornstover']['First simulate [s]'])
+    ]
+    assert not bb.compare_to_baseline(slower, baseline, threshold=10)
+    failed = {'cornstover': {'Error': 'RuntimeError: failed', 'Peak RSS [MB]': cornstover['Peak RSS [MB]']}}
+    assert bb.compare_to_baseline(failed, baseline) == [
+        ('cornstover', 'Error', None, 'RuntimeError: failed')
+    ]
+    print('Cornstover benchmark:', cornstover)
+
+def test_unit_profiler(tmp_path):
+    import biosteam as bst
+    from biorefineries.process_tools import UnitProfiler
+    bst.main_flowsheet.set_flowsheet('unit_profiler')
+    bst.settings.set_thermo(['Water', 'Ethanol'], cache=True)
+    feed = bst.Stream('feed', Water=100, Ethanol=10)
+    recycle = bst.Stream('recycle')
+    M1 = bst.Mixer('M1', (feed, recycle))
+    H1 = bst.HXutility('H1', M1-0, T=350)
+    S1 = bst.Splitter('S1', H1-0, outs=('product', recycle), split=0.5)
+    @H1.add_specification(run=True)
+    def adjust_temperature(): H1.T = 340 + 0.1 * feed.imol['Ethanol']
+    sys = bst.System('sys', path=(M1, H1, S1), recycle=recycle)
+    def adjust_feed(): feed.imol['Ethanol'] = 10
+    sys.add_specification(adjust_feed, simulate=True)
+    profiler = UnitProfiler(sys)
+    _, time_profiled = timed(profiler.profile, sys.simulate)
+    table = profiler.table()
+    iterations = table.loc[('sys', 'System', 'recycle iteration'), 'Calls']
+    assert iterations > 1
+    for unit in sys.units:
+        assert table.loc[(unit.ID, type(unit).__name__, '_run'), 'Calls'] == iterations
+        assert table.loc[(unit.ID, type(unit).__name__, '_design'), 'Calls'] == 1
+        assert '_run' not in unit.__dict__ # Methods are restored
+    assert table.loc[('H1', 'HXutility', 'specification adjust_temperature'), 'Calls'] == iterations
+    assert H1._specifications[0].f is adjust_temperature
+    assert table.loc[('sys', 'System', 'specification adjust_feed'), 'Calls'] == 1
+    assert sys._specifications[0].f is adjust_feed
+    total = table.loc[('sys', 'System', 'total'), 'Time [s]']
+    assert np.allclose(table['Self time [s]'].sum(), total)
+    file = tmp_path / 'sys.folded'
+    profiler.save_folded_stacks(file)
+    stacks = file.read_text().splitlines()
+    assert 'sys;sys recycle iteration;H1 specification adjust_temperature' in [i.rsplit(' ', 1)[0] for i in stacks]
+    _, time = timed(sys.simulate)
+    print(f'Recycle system simulation: {time:.3g} s; {time_profiled:.3g} s profiled')
@@ -8,8 +8,19 @@
 # for license details.
 
 
-# Units of measure
-from thermosteam.units_of_measure import AbsoluteUnitsOfMeasure as auom
+"""
+Submodules are imported lazily: importing the package is cheap and all
+submodules are loaded (as if star-imported, in order) the first time any
+other attribute is accessed.
+
+"""
+import sys as _sys
+
+def _import_submodule(name):
+    # Unlike importlib.import_module, __import__ is reported by `python -X importtime`
+    name = f'{__name__}.{name}'
+    __import__(name)
+    return _sys.modules[name]
 
 # Path
 import os
@@ -21,41 +32,53 @@ if not os.path.isdir(results_path): os.mkdir(results_path)
 if not os.path.isdir(figures_path): os.mkdir(figures_path)
 del os
 
-from ._chemicals import *
-from ._utils import *
-from ._internal_circulation_rx import *
-from ._wwt_pump import *
-from ._polishing_filter import *
-from ._membrane_bioreactor import *
-from ._sludge_handling import *
-from ._wwt_process import *
-from ._system import *
-from ._model import *
-
-from . import (
-    _chemicals,
-    _utils,
-    _internal_circulation_rx,
-    _wwt_pump,
-    _polishing_filter,
-    _membrane_bioreactor,
-    _sludge_handling,
-    _wwt_process,
-    _system,
-    _model,
-    )
-
-
-__all__ = (
-    'auom', 'wwt_path', 'results_path',
-    *_chemicals.__all__,
-    *_utils.__all__,
-    *_internal_circulation_rx.__all__,
-    *_wwt_pump.__all__,
-    *_polishing_filter.__all__,
-    *_membrane_bioreactor.__all__,
-    *_sludge_handling.__all__,
-    *_wwt_process.__all__,
-    *_system.__all__,
-    *_model.__all__,
-    )
\ No newline at end of file
+_submodules = (
+    '_chemicals',
+    '_utils',
+    '_internal_circulation_rx',
+    '_wwt_pump',
+    '_polishing_filter',
+    '_membrane_bioreactor',
+    '_sludge_handling',
+    '_wwt_process',
+    '_system',
+    '_model',
+)
+
+_loaded = _loading = False
+
+def load():
+    """Import all submodules and their public names into the package."""
+    global _loaded, _loading
+    if _loaded or _loading: return
+    _loading = True
+    try:
+        dct = globals()
+        # Units of measure
+        from thermosteam.units_of_measure import AbsoluteUnitsOfMeasure as auom
+        dct['auom'] = auom
+        # Submodules depend on names of previous submodules (e.g., `from . import select_pipe`)
+        modules = []
+        for name in _submodules:
+            module = _import_submodule(name)
+            dct.update({i: getattr(module, i) for i in module.__all__})
+            modules.append(module)
+        dct['__all__'] = (
+            'auom', 'wwt_path', 'results_path',
+            *[j for i in modules for j in i.__all__],
+        )
+        _loaded = True
+    finally:
+        _loading = False
+
+def __getattr__(name):
+    if name in _submodules: return _import_submodule(name)
+    if not _loaded and not _loading:
+        load()
+        dct = globals()
+        if name in dct: return dct[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__():
+    load()
+    return list(globals())
@@ -17,7 +17,7 @@ TODO:
     - Check with Brian's AnMBR paper and see the COD<1300 mg/L not preferable thing
 '''
 
-import sympy as sp, biosteam as bst
+import numpy as np, sympy as sp, biosteam as bst
 from biosteam.exceptions import DesignError
 from . import (
     get_BD_dct,
@@ -91,6 +91,11 @@ class InternalCirculationRx(bst.MixTank):
     T : float
         Temperature of the reactor.
         Will not control temperature if provided as None.
+    separate_solver : str
+        Solver for the mass balances of the "separate" method,
+        either "analytical" to use the closed-form solution (much faster,
+        recommended for uncertainty analyses) or "sympy" to symbolically
+        solve the balances in each run.
     kwargs : dict
         Other keyword arguments (e.g., Fxb, Fxt).
 
@@ -118,6 +123,7 @@ class InternalCirculationRx(bst.MixTank):
     _Fxb = 0.0032
     _Fxt = 0.0281
     _Y = 0.05
+    _separate_solver = 'analytical'
 
     # Related to cost algorithm
     _default_vessel_type = 'IC'
@@ -245,6 +251,22 @@ class InternalCirculationRx(bst.MixTank):
 
     def _run_separate(self, run_inputs):
         Qi, Si, Xi, Qe, Se, Vliq, Y, mu_max, b, Fxb, Fxt = run_inputs
+        parameters = (Qi, Qe, Si, Se, Vliq)
+        if self.separate_solver == 'analytical' and Xi*Fxb != 0:
+            results = self._solve_separate_analytical(run_inputs)
+        else:
+            results = self._solve_separate_sympy(run_inputs)
+
+        Xb, Xe, Sb, Vb = self._filter_results('separate', parameters, results)
+
+        Vt = Vliq - Vb # volume of the top rx, m3
+        self._Vb, self._Vt = Vb, Vt
+        return Xb, Xe
+
+
+    @staticmethod
+    def _solve_separate_sympy(run_inputs):
+        Qi, Si, Xi, Qe, Se, Vliq, Y, mu_max, b, Fxb, Fxt = run_inputs
 
         Qw = Qi - Qe
         Xb, Xe, Sb, Vb = sp.symbols('Xb, Xe, Sb, Vb', real=True)
@@ -256,19 +278,53 @@ class InternalCirculationRx(bst.MixTank):
         substrate_b = Qi*(Si-Sb) - mu_max*(Xb*Vb/Y)
         substrate_t = Qe*(Sb-Se) - mu_max*((Vliq-Vb)*Xe/Y)
 
-        parameters = (Qi, Qe, Si, Se, Vliq)
-
         results = sp.solve(
             (sp.Eq(biomass_b, 0),
              sp.Eq(biomass_t, 0),
              sp.Eq(substrate_b, 0),
              sp.Eq(substrate_t, 0)), (Xb, Xe, Sb, Vb))
+        return results
 
-        Xb, Xe, Sb, Vb = self._filter_results('separate', parameters, results)
 
-        Vt = Vliq - Vb # volume of the top rx, m3
-        self._Vb, self._Vt = Vb, Vt
-        return Xb, Xe
+    @staticmethod
+    def _solve_separate_analytical(run_inputs):
+        r'''
+        Solve the mass balances of the "separate" method in closed form.
+
+        With :math:`k = \mu_{max}-b`, the biomass balances give
+        :math:`X_b = Q_iX_i/D_b` and :math:`X_e = Q_eF_{xb}X_b/D_t`, where
+        :math:`D_b = Q_eF_{xb}+Q_w-kV_b` and :math:`D_t = Q_eF_{xt}-k(V_{liq}-V_b)`.
+        Substituting them into the substrate balances leaves a quadratic in
+        :math:`V_b`:
+
+        .. math::
+            Y(S_i-S_e)D_bD_t - \mu_{max}X_iV_bD_t - \mu_{max}F_{xb}Q_iX_i(V_{liq}-V_b) = 0
+
+        Only valid when both :math:`X_i` and :math:`F_{xb}` are nonzero
+        (otherwise the denominators can vanish and the sympy solver should be used).
+        '''
+        Qi, Si, Xi, Qe, Se, Vliq, Y, mu_max, b, Fxb, Fxt = run_inputs
+        Qw = Qi - Qe
+        k = mu_max - b
+        Db = np.array([-k, Qe*Fxb+Qw]) # polynomial coefficients in Vb
+        Dt = np.array([k, Qe*Fxt-k*Vliq])
+        Vt = np.array([-1., Vliq])
+        Vb = np.array([1., 0.])
+        poly = np.polysub(
+            np.polysub(Y*(Si-Se)*np.polymul(Db, Dt),
+                       mu_max*Xi*np.polymul(Vb, Dt)),
+            mu_max*Fxb*Qi*Xi*Vt)
+        poly = np.trim_zeros(poly, 'f')
+        if poly.size < 2: return []
+        results = []
+        for root in np.roots(poly):
+            if abs(root.imag) > 1e-9*max(1., abs(root.real)): continue
+            Vb = root.real
+            Xb = Qi*Xi / (Qe*Fxb+Qw-k*Vb)
+            Xe = Qe*Fxb*Xb / (Qe*Fxt-k*(Vliq-Vb))
+            Sb = Si - mu_max*Xb*Vb/(Y*Qi)
+            results.append((Xb, Xe, Sb, Vb))
+        return results
 
 
     @staticmethod
@@ -298,6 +354,8 @@ class InternalCirculationRx(bst.MixTank):
             index = Xbs.index(min(Xbs)) # choose the one with lowest effluent biomass
             return solutions[index]
 
+        return solutions[0]
+
 
     _units = {
         'HRT': 'hr',
@@ -344,6 +402,19 @@ class InternalCirculationRx(bst.MixTank):
                              f'not "{i}".')
         self._method = i.lower()
 
+    @property
+    def separate_solver(self):
+        '''
+        [str] Solver for the "separate" method, can be "analytical" or "sympy".
+        '''
+        return self._separate_solver
+    @separate_solver.setter
+    def separate_solver(self, i):
+        if not i.lower() in ('analytical', 'sympy'):
+            raise ValueError('`separate_solver` can only be "analytical", or "sympy", '
+                             f'not "{i}".')
+        self._separate_solver = i.lower()
+
     @property
     def OLRall(self):
         '''[float] Overall organic loading rate, [kg COD/m3/hr].'''
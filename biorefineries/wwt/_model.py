@@ -12,11 +12,13 @@ from math import ceil
 from biosteam import Stream, Metric, WastewaterSystemCost, ReverseOsmosis
 from biosteam.utils import ignore_docking_warnings
 from chaospy import distributions as shape
-from . import results_path, get_combustion_energy, compute_stream_COD as get_COD, prices
+from . import results_path, get_combustion_energy, compute_stream_COD as get_COD, prices, \
+    set_BMP, evaluate_across_BMP
 
 __all__ = (
     'get_default_distribution', 'Setter', 'AttrGetter', 'copy_samples',
-    'create_comparison_models', 'save_model_results', 'evaluate_models',
+    'create_comparison_models', 'save_model_results',
+    'evaluate_models',
     )
 
 
@@ -1036,19 +1038,38 @@ def run_uncertainty(exist_model, new_model, abbr, percentiles, seed, N,
     return exist_model, new_model
 
 
-def run_across_BMP(exist_model, new_model, abbr, percentiles, seed, N, BMPs):
+def run_across_BMP(exist_model, new_model, abbr, percentiles, seed, N, BMPs,
+                   share_upstream=True):
     dir_path = os.path.join(results_path, 'BMPs')
     if not os.path.isdir(dir_path): os.mkdir(dir_path)
-    for BMP in BMPs:
-        print(f'\n\n BMP = {BMP} g CH4/g COD')
-        for unit in new_model.system.flowsheet.system.new_sys_wwt.units:
-            if hasattr(unit, 'Y_biogas'):
-                unit.Y_biogas = BMP
-                unit._refresh_rxns()
+    new_sys_wwt = new_model.system.flowsheet.system.new_sys_wwt
+    if not share_upstream:
+        for BMP in BMPs:
+            print(f'\n\n BMP = {BMP} g CH4/g COD')
+            set_BMP(new_sys_wwt, BMP)
+            BMP_path = os.path.join(dir_path, str(round(100*BMP)))
+            run_uncertainty(
+                exist_model, new_model, abbr, percentiles, seed, N,
+                skip_exist=True, dir_path=BMP_path) # no need to run the exist systems
+        return
+
+    # Same samples as `run_uncertainty`, the upstream of the WWT system
+    # is shared across BMPs (no need to run the exist systems)
+    np.random.seed(seed)
+    exist_samples = exist_model.sample(N=N, seed=seed, rule='L')
+    exist_model.load_samples(exist_samples)
+    new_samples = new_model.sample(N=N, seed=seed, rule='L')
+    new_model.load_samples(new_samples)
+    copy_samples(exist_model, new_model)
+
+    print(f'\n\n New model for {abbr} across BMPs {BMPs} g CH4/g COD: N = {N}')
+    tables = evaluate_across_BMP(new_model, new_sys_wwt, BMPs, notify=ceil(N/10))
+    for BMP, table in zip(BMPs, tables):
         BMP_path = os.path.join(dir_path, str(round(100*BMP)))
-        run_uncertainty(
-            exist_model, new_model, abbr, percentiles, seed, N,
-            skip_exist=True, dir_path=BMP_path) # no need to run the exist systems
+        if not os.path.isdir(BMP_path): os.mkdir(BMP_path)
+        new_model.table = table
+        new_path = os.path.join(BMP_path, f'{abbr}_new_{N}.xlsx')
+        save_model_results(new_model, new_path, percentiles)
 
 
 def evaluate_models(
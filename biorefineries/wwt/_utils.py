@@ -33,6 +33,8 @@
 
 
 import numpy as np, pandas as pd
+from time import perf_counter
+from weakref import WeakKeyDictionary
 from chemicals.elements import molecular_weight
 import thermosteam as tmo, biosteam as bst
 from thermosteam.reaction import (
@@ -59,6 +61,7 @@ __all__ = (
     # Digestion
     'get_BD_dct',
     'get_digestable_chemicals',
+    'get_stoichiometry_arrays',
     'compute_stream_COD', 'get_COD_breakdown',
     'get_CN_ratio',
     'get_digestion_rxns',
@@ -67,6 +70,8 @@ __all__ = (
     'remove_undefined_chemicals', 'get_split_dct',
     'kph_to_tpd',
     'rename_storage_units',
+    # Evaluation across BMPs
+    'set_BMP', 'get_wwt_tail', 'simulate_facilities', 'evaluate_across_BMP',
     # TEA/LCA
     'prices', 'update_cane_price', 'update_product_prices',
     'IRR_at_ww_price', 'ww_price_at_IRR', 'get_MPSP',
@@ -80,11 +85,12 @@ __all__ = (
 # Combustion
 # =============================================================================
 
-cs_chems = create_cs_chemicals()
+_cs_chems = None # Corn stover chemicals (created when first needed)
 def get_combustion_energy(stream, combustion_eff=0.8):
     '''
     Estimate the amount of energy generated from combustion of incoming streams.
     '''
+    global _cs_chems
     chems = stream.chemicals
     to_add = []
     combustion_chemicals = ('O2', 'H2O', 'CO2', 'N2', 'P4O10', 'SO2', 'Ash')
@@ -92,8 +98,9 @@ def get_combustion_energy(stream, combustion_eff=0.8):
         if not hasattr(chems, ID):
             to_add.append(ID)
     if to_add:
+        if _cs_chems is None: _cs_chems = create_cs_chemicals()
         for ID in to_add:
-            to_add.append(getattr(cs_chems, to_add.pop(ID)))
+            to_add.append(getattr(_cs_chems, to_add.pop(ID)))
         new_chems = tmo.Chemicals(to_add)
         new_chems.compile()
         tmo.settings.set_thermo(new_chems)
@@ -288,12 +295,6 @@ def get_COD_stoichiometry(chemical):
     return dct
 
 
-def get_digestable_chemicals(chemicals):
-    chems = [chemicals[i.ID] for i in chemicals
-             if get_COD_stoichiometry(i)['O2']!=0]
-    return chems
-
-
 def get_BMP_stoichiometry(chemical):
     r'''
     Compute the theoretical biochemical methane potential (BMP) in
@@ -322,6 +323,37 @@ def get_BMP_stoichiometry(chemical):
     return dct
 
 
+# Cache of the stoichiometry arrays, keyed by the compiled chemicals
+_stoichiometry_arrays = WeakKeyDictionary()
+
+def get_stoichiometry_arrays(chemicals):
+    '''
+    Return a dict of the stoichiometry arrays of the given compiled chemicals,
+    which are only computed for the first call and cached for the later ones.
+
+    The dict includes:
+        - "C" and "N": number of C and N atoms of all chemicals with formulas.
+        - "COD": mol O2 demand/mol chemical.
+        - "BMP stoichiometry": dict of the BMP stoichiometry of each chemical.
+    '''
+    arrays = _stoichiometry_arrays.get(chemicals)
+    if arrays is None:
+        get_atom = lambda chemical, atom: (chemical.atoms.get(atom) or 0.) if chemical.formula else 0.
+        arrays = _stoichiometry_arrays[chemicals] = {
+            'C': np.array([get_atom(i, 'C') for i in chemicals]),
+            'N': np.array([get_atom(i, 'N') for i in chemicals]),
+            'COD': np.array([-get_COD_stoichiometry(i)['O2'] for i in chemicals]),
+            'BMP stoichiometry': {i.ID: get_BMP_stoichiometry(i) for i in chemicals},
+            }
+    return arrays
+
+
+def get_digestable_chemicals(chemicals):
+    iCOD = get_stoichiometry_arrays(chemicals)['COD']
+    chems = [chemicals[i.ID] for i, COD in zip(chemicals, iCOD) if COD!=0]
+    return chems
+
+
 # Note that these biodegradabilities will then be multiplied by the yield
 # of biogas/cell mass (0.86 is the default)
 def get_BD_dct(chemicals, default_BD=1, **kwargs):
@@ -355,6 +387,7 @@ def get_BD_dct(chemicals, default_BD=1, **kwargs):
     return BD_dct
 
 
+_MW_O2 = molecular_weight({'O': 2})
 def compute_stream_COD(stream):
     r'''
     Compute the chemical oxygen demand (COD) of a given stream in kg-O2/m3
@@ -363,40 +396,32 @@ def compute_stream_COD(stream):
     .. math::
         COD [\frac{kg}{m^3}] = mol_{chemical} [\frac{kmol}{m^3}] * \frac{g O_2}{mol chemical}
     '''
-    chems = stream.chemicals
-    mol = stream.mol
-    if stream.F_vol == 0: return 0
-    iCOD = np.array([-get_COD_stoichiometry(i)['O2'] for i in chems])
-    COD = (mol*iCOD).sum()*molecular_weight({'O': 2}) / stream.F_vol
+    F_vol = stream.F_vol
+    if F_vol == 0: return 0
+    iCOD = get_stoichiometry_arrays(stream.chemicals)['COD']
+    COD = stream.mol.dot(iCOD)*_MW_O2 / F_vol
     return COD
 
 
 def get_COD_breakdown(stream):
     '''
     Print the estimated breakdown of COD resulting from each chemical
-    by creating a new mock stream with the same water flowrate as
-    the original stream, then copying the flowrate of each chemical
-    at a time and calculate the COD.
+    (i.e., the COD contributed by the flow of each chemical
+    in the volumetric flow of the stream).
     '''
     chems = stream.chemicals
-    COD = compute_stream_COD(stream)
-    print(f'\nTotal COD of {stream.ID}: {round(COD*1000, 2)} mg/L:')
-    foo = tmo.Stream()
-    foo.imass['Water'] = stream.imass['Water']
-    COD_dct = {}
-    for chem in chems:
-        if chem is chems.Water: continue
-        chem_ID = chem.ID
-        foo.copy_flow(stream, (chem_ID,))
-        chem_COD = compute_stream_COD(foo)
-        if chem_COD == 0: continue
-        COD_dct[chem_ID] = chem_COD
-        foo.imass[chem_ID] = 0
+    F_vol = stream.F_vol
+    print(f'\nTotal COD of {stream.ID}: {round(compute_stream_COD(stream)*1000, 2)} mg/L:')
+    if F_vol == 0: CODs = np.zeros(chems.size)
+    else: CODs = stream.mol*get_stoichiometry_arrays(chems)['COD']*_MW_O2/F_vol
+    CODs[chems.index('Water')] = 0
+    index = CODs.nonzero()[0]
+    CODs = CODs[index]
     df = pd.DataFrame({
-        'ID': COD_dct.keys(),
-        'COD [mg/L]': COD_dct.values(),
+        'ID': [chems.IDs[i] for i in index],
+        'COD [mg/L]': CODs,
         })
-    df['ratio'] = df.iloc[:,1]/COD
+    df['ratio'] = df.iloc[:,1]/CODs.sum()
     df.iloc[:,1] *= 1000
     df = df.sort_values(by='ratio', ascending=False)
     print(df)
@@ -404,10 +429,10 @@ def get_COD_breakdown(stream):
 
 
 def get_CN_ratio(stream):
-    C = sum([(i.atoms.get('C') or 0.)*12*stream.imol[i.ID]
-             for i in stream.chemicals if i.formula])
-    N = sum([(i.atoms.get('N') or 0.)*14*stream.imol[i.ID]
-             for i in stream.chemicals if i.formula])
+    arrays = get_stoichiometry_arrays(stream.chemicals)
+    mol = stream.mol
+    C = mol.dot(arrays['C']) * 12
+    N = mol.dot(arrays['N']) * 14
     return C/N if N !=0 else 'NA'
 
 
@@ -421,6 +446,7 @@ def get_digestion_rxns(stream, BD, X_biogas, X_growth, biomass_ID):
         raise ValueError('Sum of `X_biogas`/`X_decomp` and `X_biogas` is '
                          f'{X_biogas+X_growth}, larger than 100%.')
 
+    BMP_stoichiometry = get_stoichiometry_arrays(stream.chemicals)['BMP stoichiometry']
     biogas_rxns = []
     growth_rxns = []
     for i in chems:
@@ -428,7 +454,7 @@ def get_digestion_rxns(stream, BD, X_biogas, X_growth, biomass_ID):
         if not X:
             continue # assume no entry means not biodegradable
 
-        biogas_stoyk = get_BMP_stoichiometry(i)
+        biogas_stoyk = BMP_stoichiometry[i.ID]
         if not biogas_stoyk.get(i.ID): # no conversion of this chemical
             continue
 
@@ -526,6 +552,122 @@ def rename_storage_units(sys, storage):
         bst.rename_units([i for i in sys.units if bst.is_storage_unit(i)], storage)
 
 
+# %%
+
+# =============================================================================
+# Evaluation across biochemical methane potentials (BMPs)
+# =============================================================================
+
+def set_BMP(wwt_system, BMP):
+    for unit in wwt_system.units:
+        if hasattr(unit, 'Y_biogas'):
+            unit.Y_biogas = BMP
+            unit._refresh_rxns()
+
+
+def _get_connected_units(units, stop, downstream):
+    # Facilities are simulated after the path (as in `System.simulate`),
+    # so the search stops at them
+    connected = set()
+    front = list(units)
+    while front:
+        unit = front.pop()
+        if downstream: others = [i.sink for i in unit.outs]
+        else: others = [i.source for i in unit.ins]
+        for i in others:
+            if i is None or i in connected: continue
+            connected.add(i)
+            if i not in stop: front.append(i)
+    return connected
+
+
+def get_wwt_tail(system, wwt_system):
+    '''
+    Return units downstream of the WWT system (other than facilities)
+    in simulation order, or None if any of them is also upstream of the
+    WWT system (i.e., the WWT system is in a recycle loop with the upstream units).
+    '''
+    wwt_units = set(wwt_system.units)
+    facilities = set(system.facilities)
+    stop = facilities | wwt_units
+    downstream = _get_connected_units(wwt_units, stop, True) - stop
+    upstream = _get_connected_units(wwt_units, stop, False) - stop
+    if downstream & upstream: return None
+    return [i for i in system.units if i in downstream]
+
+
+def simulate_facilities(system):
+    '''
+    Simulate the facilities of the system as `System._summary` does:
+    boiler turbogenerators are simulated again after all other facilities
+    so that their electricity production accounts for the power of the
+    facilities simulated after them.
+    '''
+    isa = isinstance
+    facilities = system.facilities
+    for i in facilities:
+        if isa(i, bst.Unit): i.simulate()
+        elif isa(i, bst.System):
+            i.converge()
+            i._summary()
+        else: i() # Assume it is a function
+    for i in facilities:
+        if isa(i, bst.BoilerTurbogenerator): i.simulate()
+
+
+def evaluate_across_BMP(model, wwt_system, BMPs, notify=0):
+    '''
+    Evaluate the loaded samples of the model at each BMP (biochemical methane potential,
+    i.e., `Y_biogas` of the digestion units) and return the resulting tables
+    (same layout as `model.table`).
+
+    The whole system is only converged at the first BMP of each sample.
+    For the other BMPs, the inlets of the WWT system are restored and only
+    the WWT system, units downstream of it (e.g., BT), and facilities are simulated.
+    The whole system is simulated at every BMP if the WWT system is in
+    a recycle loop with the upstream units or if the shared simulation fails.
+    '''
+    samples = model._samples
+    if samples is None: raise RuntimeError('must load samples before evaluating')
+    system = model.system
+    metrics = model.metrics
+    tail = get_wwt_tail(system, wwt_system)
+    values = [[None]*samples.shape[0] for BMP in BMPs]
+    start = perf_counter()
+    for count, i in enumerate(model._index, 1):
+        sample = samples[i]
+        shared = False
+        for BMP, BMP_values in zip(BMPs, values):
+            set_BMP(wwt_system, BMP)
+            if shared:
+                try:
+                    for stream, data in inlets: stream.set_data(data)
+                    wwt_system.simulate()
+                    for unit in tail: unit.simulate()
+                    simulate_facilities(system)
+                    BMP_values[i] = [metric() for metric in metrics]
+                    continue
+                except Exception:
+                    shared = False
+            try:
+                model._update_state(sample)
+                BMP_values[i] = [metric() for metric in metrics]
+            except Exception: # Retry and handle exceptions as the model would
+                BMP_values[i] = model._evaluate_sample(sample)
+            else:
+                shared = tail is not None
+                inlets = [(stream, stream.get_data()) for stream in wwt_system.ins]
+        if notify and not count % notify:
+            print(f'[{count}] Elapsed time: {perf_counter()-start:.0f} sec')
+    N_parameters = len(model.parameters)
+    tables = []
+    for BMP_values in values:
+        table = model.table.copy()
+        table[table.columns[N_parameters:]] = np.array(BMP_values, dtype=float)
+        tables.append(table)
+    return tables
+
+
 # %%
 
 # =============================================================================